@@ -0,0 +1,351 @@
+import gc
+import gzip
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from unittest import mock
+
+import numpy as np
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from ..services import route_calculator
+from ..services.departure_sweep import departure_times, sweep_departures
+from ..services.eld_calculator import calculate_eld_entries, plan_eld_entries
+from ..services.http_client import FetchResult
+from ..services.log_generator import LogColumns, generate_daily_logs
+from ..services.polyline import encode_polyline
+from ..services.route_cache import RouteCache
+from ..services.route_calculator import (
+    _normalize_osrm_route,
+    build_route_data,
+    calculate_fuel_stops,
+    get_point_along_geometry,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+RESULTS_VERSION = 1
+
+# (miles, vertices) of the synthetic routes.
+SYNTHETIC_SIZES = [(100, 100), (500, 1_000), (1_000, 5_000), (2_500, 20_000), (5_000, 50_000)]
+# About New York to Los Angeles with OSRM's full overview geometry.
+COAST_TO_COAST = (2_800, 60_000)
+START_TIME = "2024-01-15T08:00:00Z"
+CYCLE_USED = 10.0
+POINT_RATIOS = [i / 10 for i in range(11)]
+SWEEP_DEPARTURES = 96
+METERS_PER_MILE = 1609.344
+EARTH_RADIUS_M = 6_371_000
+
+
+class RouteCase:
+    """One route to benchmark: the waypoints and the raw OSRM response."""
+
+    def __init__(self, name: str, waypoints: List[Tuple[float, float]], response: Dict):
+        self.name = name
+        self.waypoints = waypoints
+        self.response = response
+        self.route = FetchResult(url="benchmark", ok=True, data=_normalize_osrm_route(response))
+        stops = [{"location": f"{lon},{lat}", "type": "pickup"} for lon, lat in waypoints[1:-1]]
+        stops.append({"location": f"{waypoints[-1][0]},{waypoints[-1][1]}", "type": "dropoff"})
+        self.current_location = f"{waypoints[0][0]},{waypoints[0][1]}"
+        self.stops = stops
+
+    def route_data(self) -> Dict:
+        return build_route_data(self.current_location, self.stops, self.waypoints, self.route)
+
+    def request_body(self) -> Dict:
+        return {
+            "current_location": self.current_location,
+            "stops": self.stops,
+            "current_cycle_used": CYCLE_USED,
+            "start_time": START_TIME,
+        }
+
+
+def _segment_lengths(coords: np.ndarray) -> np.ndarray:
+    lon = np.radians(coords[:, 0])
+    lat = np.radians(coords[:, 1])
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def synthetic_case(miles: float, vertices: int) -> RouteCase:
+    """A two-leg route (start, pickup at 10%, dropoff) shaped like a highway.
+
+    The path follows an arc of an ellipse over the continental US, with a
+    small meander; the longest route covers most of the ellipse. The
+    response is shaped like OSRM's for ``OSRM_PARAMS``: a polyline6 overview
+    geometry and per-edge ``annotation.duration`` on every leg; speeds vary
+    along the route as they would between highways and town.
+    """
+    center_lon, center_lat, radius_lon, radius_lat = -98.0, 38.0, 20.0, 8.0
+    t = np.linspace(0, 1, vertices)
+    # About 5,500 miles around; the meander makes the path a little longer.
+    angle = t * 2 * math.pi * min(0.9, miles / 5_500)
+    lon = center_lon + radius_lon * np.cos(angle) + 0.02 * np.sin(t * vertices / 7)
+    lat = center_lat + radius_lat * np.sin(angle)
+    coords = np.round(np.column_stack((lon, lat)), 6)
+
+    lengths = _segment_lengths(coords)
+    # Scale the reported distances so the route measures exactly ``miles``.
+    lengths *= miles * METERS_PER_MILE / lengths.sum()
+    # 20 to 30 m/s (45 to 67 mph).
+    durations = lengths / (25 + 5 * np.sin(t[1:] * 2 * math.pi * 7))
+    pickup = max(1, vertices // 10)
+    legs = []
+    for first, last in ((0, pickup), (pickup, vertices - 1)):
+        distance = float(lengths[first:last].sum())
+        legs.append({
+            "distance": distance,
+            "duration": float(durations[first:last].sum()),
+            "annotation": {"duration": durations[first:last].tolist()},
+        })
+    coordinate_list = coords.tolist()
+    waypoints = [coordinate_list[0], coordinate_list[pickup], coordinate_list[-1]]
+    response = {
+        "code": "Ok",
+        "routes": [{
+            "distance": float(lengths.sum()),
+            "duration": float(durations.sum()),
+            "geometry": encode_polyline(coords, precision=6),
+            "legs": legs,
+        }],
+        "waypoints": [{"location": location} for location in waypoints],
+    }
+    return RouteCase(f"synthetic-{miles}mi-{vertices}v", [tuple(point) for point in waypoints], response)
+
+
+def recorded_cases() -> List[RouteCase]:
+    cases = []
+    if not os.path.isdir(FIXTURES_DIR):
+        return cases
+    for file_name in sorted(os.listdir(FIXTURES_DIR)):
+        if file_name.endswith(".json.gz"):
+            with gzip.open(os.path.join(FIXTURES_DIR, file_name), "rt", encoding="utf-8") as f:
+                fixture = json.load(f)
+            cases.append(RouteCase(
+                f"osrm-{file_name[:-len('.json.gz')]}",
+                [tuple(point) for point in fixture["waypoints"]],
+                fixture["response"]
+            ))
+    return cases
+
+
+def record_fixture(name: str, waypoints: List[Tuple[float, float]]) -> str:
+    """Fetch a route from OSRM and save it as a fixture; returns the file path."""
+    url = route_calculator._osrm_url(waypoints)
+    result = route_calculator.fetch_json(url, params=route_calculator.OSRM_PARAMS)
+    if not result.ok or not isinstance(result.data, dict) or result.data.get("code") != "Ok":
+        raise ValueError(f"OSRM request failed: {result.error or result.data}")
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, f"{name}.json.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"waypoints": [list(point) for point in waypoints], "response": result.data}, f,
+                  separators=(",", ":"))
+    return path
+
+
+def _benchmarks(case: RouteCase) -> Dict[str, Callable[[], object]]:
+    route_data = case.route_data()
+    entries = calculate_eld_entries(route_data, CYCLE_USED, START_TIME)
+    columns = LogColumns(entries)
+    first_day = int(columns.day.min()) if len(columns.day) else 0
+    cutoffs = sorted({max(first_day, day - offset) for day in set(columns.day.tolist()) for offset in (7, 4)})
+    geometry = case.route.data["geometry"]
+    segments = route_data["segments"]
+    sweep_times = departure_times(START_TIME, SWEEP_DEPARTURES, 15)
+    factory = RequestFactory()
+    body = json.dumps(case.request_body())
+
+    def view():
+        from ..views import calculate_route_view
+        response = calculate_route_view(
+            factory.post("/api/calculate-route/", data=body, content_type="application/json")
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"calculate-route returned {response.status_code}")
+        return response
+
+    return {
+        "calculate_eld_entries": lambda: calculate_eld_entries(route_data, CYCLE_USED, START_TIME),
+        "plan_eld_entries_optimized": lambda: plan_eld_entries(route_data, CYCLE_USED, START_TIME, "optimized"),
+        "sweep_departures": lambda: sweep_departures(route_data, CYCLE_USED, sweep_times),
+        "generate_daily_logs": lambda: generate_daily_logs(
+            entries, case.current_location, case.stops[0]["location"], case.stops[-1]["location"]
+        ),
+        "recap": lambda: columns.on_duty_since(cutoffs),
+        "get_point_along_geometry": lambda: [get_point_along_geometry(geometry, ratio) for ratio in POINT_RATIOS],
+        "calculate_fuel_stops": lambda: calculate_fuel_stops(segments),
+        "view": view,
+    }
+
+
+def _time(function: Callable[[], object], repeat: int, min_time: float) -> Dict:
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    samples = [elapsed / number] + [sample / number for sample in timer.repeat(repeat - 1, number)]
+    return {
+        "min_us": round(min(samples) * 1e6, 3),
+        "median_us": round(statistics.median(samples) * 1e6, 3),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _memory_status() -> Optional[Tuple[int, int]]:
+    """``(resident, peak resident)`` bytes of this process, from ``/proc`` (Linux only)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            fields = dict(line.split(":", 1) for line in f)
+    except OSError:
+        return None
+    return int(fields["VmRSS"].split()[0]) * 1024, int(fields["VmHWM"].split()[0]) * 1024
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def measure_request_memory(case: RouteCase, repeat: int = 3) -> Dict:
+    """Peak memory of one ``calculate-route`` request for ``case``.
+
+    Routing is answered with the case's OSRM response as JSON text, so
+    parsing and normalizing it count toward the request, and the route and
+    plan caches are off. ``peak_rss_bytes`` is how far the resident set's
+    high-water mark rises above where the request started (Linux only, null
+    elsewhere). It is taken on the first request for ``case``, after a short
+    warm-up route, because memory freed by a request stays in the process
+    and would hide the next one's growth. ``peak_traced_bytes`` is the
+    median over ``repeat`` requests of tracemalloc's peak of the Python and
+    NumPy allocations.
+    """
+    from ..views import calculate_route_view
+
+    factory = RequestFactory()
+    route_case = case
+
+    def fetch_json(*args, **kwargs):
+        return FetchResult(url="benchmark", ok=True, data=json.loads(response_text))
+
+    def request():
+        body = json.dumps(route_case.request_body())
+        response = calculate_route_view(
+            factory.post("/api/calculate-route/", data=body, content_type="application/json")
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"calculate-route returned {response.status_code}")
+        return len(response.content)
+
+    peak_rss = None
+    traced_peaks = []
+    with mock.patch.object(route_calculator, "fetch_json", side_effect=fetch_json), \
+            mock.patch.object(route_calculator, "get_route_cache", return_value=RouteCache(None)), \
+            override_settings(PLAN_CACHE={"ALIAS": "benchmark-disabled"}, ROUTER_BACKENDS=["osrm"]):
+        # Warm up imports and per-process singletons on a small route.
+        route_case = synthetic_case(100, 100)
+        response_text = json.dumps(route_case.response)
+        request()
+
+        route_case = case
+        response_text = json.dumps(case.response)
+        gc.collect()
+        status = _memory_status()
+        if status is not None and _reset_peak_rss():
+            response_bytes = request()
+            peak_rss = _memory_status()[1] - status[0]
+        else:
+            response_bytes = request()
+        for _ in range(repeat):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                request()
+                traced_peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+    return {
+        "case": case.name,
+        "vertices": len(case.route.data["geometry"]["coordinates"]),
+        "response_bytes": response_bytes,
+        "peak_rss_bytes": peak_rss,
+        "peak_traced_bytes": int(statistics.median(traced_peaks)),
+        "repeat": repeat,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(cases: List[RouteCase], repeat: int = 5, min_time: float = 0.1,
+              name_filter: Optional[str] = None, progress: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    """Time every benchmark on every case; returns the JSON-ready results document.
+
+    Nothing touches the network: the view benchmark gets each case's route in
+    place of the routing call, with the plan cache switched off.
+    """
+    results = {}
+    disabled_plan_cache = {"ALIAS": "benchmark-disabled"}
+    with mock.patch.object(route_calculator, "fetch_route"), \
+            override_settings(PLAN_CACHE=disabled_plan_cache):
+        for case in cases:
+            route_calculator.fetch_route.return_value = case.route
+            for benchmark, function in _benchmarks(case).items():
+                key = f"{benchmark}/{case.name}"
+                if name_filter and name_filter not in key:
+                    continue
+                results[key] = _time(function, repeat, min_time)
+                if progress:
+                    progress(key, results[key])
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float, metric: str = "min_us") -> Dict:
+    """Benchmarks present in both runs, split by whether they moved beyond ``threshold``."""
+    rows = []
+    for key in sorted(set(baseline["results"]) & set(current["results"])):
+        before = baseline["results"][key][metric]
+        after = current["results"][key][metric]
+        ratio = after / before if before else float("inf")
+        status = "regression" if ratio > 1 + threshold else "improvement" if ratio < 1 - threshold else "ok"
+        rows.append({"benchmark": key, "before": before, "after": after, "ratio": ratio, "status": status})
+    return {
+        "rows": rows,
+        "regressions": [row for row in rows if row["status"] == "regression"],
+        "missing": sorted(set(baseline["results"]) - set(current["results"])),
+        "added": sorted(set(current["results"]) - set(baseline["results"])),
+    }
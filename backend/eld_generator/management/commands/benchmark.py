@@ -0,0 +1,127 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_generator.benchmarks.suite import (
+    COAST_TO_COAST,
+    SYNTHETIC_SIZES,
+    compare_results,
+    measure_request_memory,
+    record_fixture,
+    recorded_cases,
+    run_suite,
+    synthetic_case,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "HOS and log generation micro-benchmarks. 'run' writes timings as JSON, 'compare' "
+        "fails when a run is slower than a baseline beyond a threshold, 'record' saves an "
+        "OSRM route as a fixture, 'memory' reports the peak memory of one request."
+    )
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest="action", required=True)
+
+        run = actions.add_parser("run", help="Run the suite")
+        run.add_argument("--output", default=None, help="Write the results JSON here")
+        run.add_argument("--repeat", type=int, default=5, help="Samples per benchmark (default 5)")
+        run.add_argument("--min-time", type=float, default=0.1,
+                         help="Minimum seconds per sample; calls are looped until reached")
+        run.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this")
+        run.add_argument("--max-miles", type=int, default=None, help="Skip larger synthetic routes")
+
+        compare = actions.add_parser("compare", help="Compare two result files")
+        compare.add_argument("baseline")
+        compare.add_argument("current")
+        compare.add_argument("--threshold", type=float, default=0.15,
+                             help="Allowed slowdown as a fraction (default 0.15)")
+        # The fastest sample is the least noisy on a shared machine.
+        compare.add_argument("--metric", choices=["min_us", "median_us"], default="min_us")
+
+        memory = actions.add_parser("memory", help="Peak memory of one calculate-route request")
+        memory.add_argument("--repeat", type=int, default=3, help="Requests measured (default 3)")
+        memory.add_argument("--fixture", default=None,
+                            help="Recorded fixture to route instead of the synthetic coast-to-coast trip")
+
+        record = actions.add_parser("record", help="Record an OSRM route fixture")
+        record.add_argument("name", help="Fixture name")
+        record.add_argument("waypoints", help="'lon,lat;lon,lat;...' with at least two points")
+
+    def handle(self, *args, **options):
+        getattr(self, f"_{options['action']}")(options)
+
+    def _run(self, options):
+        sizes = [size for size in SYNTHETIC_SIZES
+                 if options["max_miles"] is None or size[0] <= options["max_miles"]]
+        cases = [synthetic_case(miles, vertices) for miles, vertices in sizes] + recorded_cases()
+
+        def progress(key, result):
+            self.stdout.write(f"{key:<60} {result['median_us']:>14,.1f} us")
+
+        results = run_suite(cases, options["repeat"], options["min_time"], options["filter"], progress)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results['results'])} results to {options['output']}"))
+
+    def _compare(self, options):
+        try:
+            with open(options["baseline"], encoding="utf-8") as f:
+                baseline = json.load(f)
+            with open(options["current"], encoding="utf-8") as f:
+                current = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        comparison = compare_results(baseline, current, options["threshold"], options["metric"])
+        for row in comparison["rows"]:
+            line = (f"{row['benchmark']:<60} {row['before']:>12,.1f} {row['after']:>12,.1f} "
+                    f"{row['ratio']:>6.2f}x  {row['status']}")
+            if row["status"] == "regression":
+                line = self.style.ERROR(line)
+            elif row["status"] == "improvement":
+                line = self.style.SUCCESS(line)
+            self.stdout.write(line)
+        for key in comparison["missing"]:
+            self.stdout.write(self.style.WARNING(f"{key}: missing from {options['current']}"))
+
+        regressions = comparison["regressions"]
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} benchmark(s) slower than {options['threshold']:.0%} over baseline"
+            )
+        self.stdout.write(self.style.SUCCESS(f"No regressions beyond {options['threshold']:.0%}"))
+
+    def _memory(self, options):
+        if options["fixture"]:
+            cases = [case for case in recorded_cases()
+                     if case.name in (options["fixture"], f"osrm-{options['fixture']}")]
+            if not cases:
+                raise CommandError(f"No recorded fixture named {options['fixture']}")
+            case = cases[0]
+        else:
+            case = synthetic_case(*COAST_TO_COAST)
+
+        result = measure_request_memory(case, options["repeat"])
+        peak_rss = result["peak_rss_bytes"]
+        self.stdout.write(f"{result['case']}: {result['vertices']:,} vertices, "
+                          f"{result['response_bytes'] / 2 ** 20:,.1f} MiB response")
+        self.stdout.write(f"peak RSS growth  "
+                          f"{'n/a (needs /proc)' if peak_rss is None else f'{peak_rss / 2 ** 20:,.1f} MiB'}")
+        self.stdout.write(f"peak traced      {result['peak_traced_bytes'] / 2 ** 20:,.1f} MiB")
+
+    def _record(self, options):
+        try:
+            waypoints = [tuple(float(value) for value in point.split(","))
+                         for point in options["waypoints"].split(";")]
+        except ValueError:
+            raise CommandError("Waypoints must look like 'lon,lat;lon,lat'")
+        if len(waypoints) < 2 or any(len(point) != 2 for point in waypoints):
+            raise CommandError("Waypoints must look like 'lon,lat;lon,lat'")
+        try:
+            path = record_fixture(options["name"], waypoints)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Recorded {path}"))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_generator.services.gazetteer import build_gazetteer_from_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the offline gazetteer index from a CSV of places. "
+        "Columns: name, state, zip, kind, lon, lat, rank (name/zip plus lon/lat are required)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Source CSV file")
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Index file to write (defaults to settings.GAZETTEER_PATH)"
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"] or getattr(settings, "GAZETTEER_PATH", None)
+        if not output:
+            raise CommandError("No output path given and GAZETTEER_PATH is not set")
+
+        try:
+            summary = build_gazetteer_from_csv(options["csv_path"], str(output))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {summary['records']} places / {summary['keys']} keys "
+            f"({summary['bytes']} bytes) to {output}"
+        ))
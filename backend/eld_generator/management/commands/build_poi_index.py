@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_generator.services.poi_index import DEFAULT_CELL_DEGREES, build_poi_index_from_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the truck stop / fuel / rest area index that fuel and rest stops snap to. "
+        "Columns: name, state, kind (truck_stop, fuel or rest_area), lon, lat; other kinds are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Source CSV file")
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Index file to write (defaults to settings.POI_INDEX_PATH)"
+        )
+        parser.add_argument(
+            "--cell-degrees",
+            type=float,
+            default=DEFAULT_CELL_DEGREES,
+            help="Size of the grid cells facilities are bucketed in"
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"] or getattr(settings, "POI_INDEX_PATH", None)
+        if not output:
+            raise CommandError("No output path given and POI_INDEX_PATH is not set")
+        if options["cell_degrees"] <= 0:
+            raise CommandError("--cell-degrees must be positive")
+
+        try:
+            summary = build_poi_index_from_csv(options["csv_path"], str(output), options["cell_degrees"])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {summary['facilities']} facilities ({summary['bytes']} bytes) to {output}"
+        ))
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_generator.services.road_graph import DEFAULT_CELL_DEGREES, build_road_graph_from_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the local road graph used by the offline router from node and edge CSVs. "
+        "Nodes: id, lon, lat. Edges: source, target, and optionally geometry, length_m, "
+        "speed_mph, duration_s, oneway."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("nodes_path", help="Node CSV file")
+        parser.add_argument("edges_path", help="Edge CSV file")
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Graph file to write (defaults to settings.ROAD_GRAPH_PATH)"
+        )
+        parser.add_argument(
+            "--cell-degrees",
+            type=float,
+            default=DEFAULT_CELL_DEGREES,
+            help="Size of the spatial index cells used to snap coordinates to nodes"
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"] or getattr(settings, "ROAD_GRAPH_PATH", None)
+        if not output:
+            raise CommandError("No output path given and ROAD_GRAPH_PATH is not set")
+        if options["cell_degrees"] <= 0:
+            raise CommandError("--cell-degrees must be positive")
+
+        try:
+            summary = build_road_graph_from_csv(
+                options["nodes_path"], options["edges_path"], str(output), options["cell_degrees"]
+            )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {summary['nodes']} nodes / {summary['edges']} edges "
+            f"({summary['bytes']} bytes) to {output}"
+        ))
@@ -0,0 +1,67 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eld_generator.services.log_sheet_renderer import (
+    LOG_SHEET_FORMATS,
+    daily_logs_by_trip,
+    render_pdf,
+    render_svgs,
+    svg_file_names,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Render daily log sheets from saved API responses. Each JSON file may hold a "
+        "calculate-route response, a batch response or a bare list of daily logs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("json_paths", nargs="+", help="JSON files to export")
+        parser.add_argument("--format", choices=LOG_SHEET_FORMATS, default="pdf", dest="output_format")
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="PDF file (default eld-logs.pdf) or SVG directory (default eld-logs-svg)"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes rendering pages in parallel (default: one per CPU)"
+        )
+
+    def handle(self, *args, **options):
+        trips = []
+        for path in options["json_paths"]:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    trips.extend(daily_logs_by_trip(json.load(f)))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"{path}: {e}")
+
+        daily_logs = [daily_log for trip_logs in trips for daily_log in trip_logs]
+        workers = max(1, min(options["workers"], len(daily_logs)))
+        chunksize = max(1, len(daily_logs) // (workers * 4))
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            def mapper(function, items):
+                return executor.map(function, items, chunksize=chunksize)
+
+            if options["output_format"] == "pdf":
+                output = options["output"] or "eld-logs.pdf"
+                with open(output, "wb") as f:
+                    f.write(render_pdf(daily_logs, mapper))
+            else:
+                output = options["output"] or "eld-logs-svg"
+                os.makedirs(output, exist_ok=True)
+                for name, svg in zip(svg_file_names(trips), render_svgs(daily_logs, mapper)):
+                    with open(os.path.join(output, name), "w", encoding="utf-8") as f:
+                        f.write(svg)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {len(daily_logs)} log sheets from {len(trips)} trips to {output}"
+        ))
@@ -0,0 +1,40 @@
+import os
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from eld_generator.services.job_queue import work
+
+
+class Command(BaseCommand):
+    help = (
+        "Run trip planning jobs from the database queue. Use with TRIP_JOB_WORKERS=0 "
+        "on the web processes to keep planning out of them entirely."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "TRIP_JOBS", {}).get("WORKERS", 2) or 1,
+            help="Worker threads in this process"
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+        threads = [
+            threading.Thread(target=work, args=(f"{os.getpid()}-{index}", stop), name=f"trip-job-{index}")
+            for index in range(options["workers"])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(self.style.SUCCESS(f"Running {len(threads)} trip job workers; Ctrl-C to stop"))
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+        self.stdout.write("Stopped")
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:53
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('stage', models.CharField(blank=True, default='', max_length=32)),
+                ('progress', models.JSONField(default=dict)),
+                ('request', models.JSONField()),
+                ('result', models.BinaryField(null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('error_status', models.PositiveSmallIntegerField(null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('heartbeat_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='eld_generat_status_958e23_idx'), models.Index(fields=['finished_at'], name='eld_generat_finishe_ff1ebf_idx')],
+            },
+        ),
+    ]
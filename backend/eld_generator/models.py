@@ -1,2 +1,46 @@
+import uuid
+
 from django.db import models
 
+
+class TripJob(models.Model):
+    """A queued ``calculate-route`` request, planned in the background.
+
+    The finished response is kept as the zlib-compressed JSON body, the same
+    bytes the synchronous endpoint would have sent.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    stage = models.CharField(max_length=32, blank=True, default="")
+    progress = models.JSONField(default=dict)
+    request = models.JSONField()
+    result = models.BinaryField(null=True, editable=False)
+    error = models.TextField(blank=True, default="")
+    error_status = models.PositiveSmallIntegerField(null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=64, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    heartbeat_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["finished_at"]),
+        ]
+
+    def __str__(self):
+        return f"TripJob {self.id} ({self.status})"
@@ -0,0 +1,28 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_line(record) -> bytes:
+    return json.dumps(record, cls=JSONEncoder, separators=(",", ":")).encode() + b"\n"
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON.
+
+    Views stream their records themselves with a ``StreamingHttpResponse``;
+    this renderer lets content negotiation accept the media type and renders
+    plain responses (validation errors) as a single line.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return ndjson_line(data)
@@ -1,10 +1,84 @@
 from rest_framework import serializers
 
+from .services.eld_calculator import HOS_PLANNERS, load_hos_state
+from .services.log_sheet_renderer import LOG_SHEET_FORMATS, daily_logs_by_trip
+from .services.polyline import POLYLINE_FORMATS
+
+MAX_TRIP_STOPS = 25
+MAX_BATCH_TRIPS = 500
+MAX_LOG_SHEET_PAGES = 2000
+MAX_SWEEP_DEPARTURES = 2016
+
+
+class StopSerializer(serializers.Serializer):
+    location = serializers.CharField(max_length=500)
+    type = serializers.ChoiceField(choices=["pickup", "dropoff"])
+
 
 class TripRequestSerializer(serializers.Serializer):
     current_location = serializers.CharField(max_length=500)
-    pickup_location = serializers.CharField(max_length=500)
-    dropoff_location = serializers.CharField(max_length=500)
-    current_cycle_used = serializers.FloatField(min_value=0, max_value=70)
+    pickup_location = serializers.CharField(max_length=500, required=False)
+    dropoff_location = serializers.CharField(max_length=500, required=False)
+    stops = StopSerializer(many=True, required=False, max_length=MAX_TRIP_STOPS)
+    current_cycle_used = serializers.FloatField(min_value=0, max_value=70, required=False)
+    hos_state = serializers.CharField(max_length=4096, required=False)
     start_time = serializers.CharField(required=False, allow_blank=True)
+    map_zoom = serializers.FloatField(min_value=0, max_value=22, required=False)
+    polyline_format = serializers.ChoiceField(choices=POLYLINE_FORMATS, default="geojson")
+    hos_planner = serializers.ChoiceField(choices=HOS_PLANNERS, default="greedy")
+
+    def validate(self, data):
+        if "current_cycle_used" not in data and "hos_state" not in data:
+            raise serializers.ValidationError("Provide either 'current_cycle_used' or 'hos_state'.")
+        if "hos_state" in data:
+            try:
+                load_hos_state(data["hos_state"])
+            except ValueError as e:
+                raise serializers.ValidationError({"hos_state": str(e)})
+        if not data.get("stops"):
+            if not data.get("pickup_location") or not data.get("dropoff_location"):
+                raise serializers.ValidationError(
+                    "Provide either 'stops' or both 'pickup_location' and 'dropoff_location'."
+                )
+            data["stops"] = [
+                {"location": data["pickup_location"], "type": "pickup"},
+                {"location": data["dropoff_location"], "type": "dropoff"},
+            ]
+        return data
+
+
+class SweepRequestSerializer(TripRequestSerializer):
+    # The sweep returns a table, not logs or a map.
+    map_zoom = None
+    polyline_format = None
+    hos_planner = None
+    departures = serializers.IntegerField(min_value=1, max_value=MAX_SWEEP_DEPARTURES, default=96)
+    interval_minutes = serializers.IntegerField(min_value=1, max_value=24 * 60, default=15)
+
+
+class BatchTripRequestSerializer(serializers.Serializer):
+    # Each trip is validated separately with TripRequestSerializer so that
+    # one bad trip does not reject the whole batch.
+    trips = serializers.ListField(
+        child=serializers.DictField(), min_length=1, max_length=MAX_BATCH_TRIPS
+    )
+
+
+class LogSheetRequestSerializer(serializers.Serializer):
+    daily_logs = serializers.ListField(child=serializers.DictField(), required=False)
+    trips = serializers.ListField(child=serializers.DictField(), required=False, max_length=MAX_BATCH_TRIPS)
+    output_format = serializers.ChoiceField(choices=LOG_SHEET_FORMATS, default="pdf")
 
+    def validate(self, data):
+        if "daily_logs" not in data and "trips" not in data:
+            raise serializers.ValidationError("Provide either 'daily_logs' or 'trips'.")
+        try:
+            trips = daily_logs_by_trip(
+                {"daily_logs": data["daily_logs"]} if "daily_logs" in data else {"trips": data["trips"]}
+            )
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        if sum(len(daily_logs) for daily_logs in trips) > MAX_LOG_SHEET_PAGES:
+            raise serializers.ValidationError(f"At most {MAX_LOG_SHEET_PAGES} log sheets per request.")
+        data["log_sheets"] = trips
+        return data
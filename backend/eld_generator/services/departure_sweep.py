@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .eld_calculator import _initial_state, parse_datetime
+from .hos_engine import TASK_DRIVE, HOSState, trip_tasks
+from .hos_rules import (
+    BREAK_REQUIRED_AFTER_SECONDS,
+    CYCLE_DAYS,
+    DAY,
+    HOUR,
+    MAX_CYCLE_SECONDS,
+    MAX_DRIVING_SECONDS,
+    MAX_WINDOW_SECONDS,
+    MIN_OFF_DUTY_SECONDS,
+    REQUIRED_BREAK_SECONDS,
+    RESTART_SECONDS,
+)
+
+SWEEP_COLUMNS = ("departure", "arrival", "trip_hours", "on_duty_hours", "cycle_hours", "rests", "breaks", "restarts")
+
+
+def _roll(history: np.ndarray, day: np.ndarray, clock: np.ndarray, utc_offset: np.ndarray) -> np.ndarray:
+    """Clear the ring-buffer slots of days that have started since ``day``; returns the new day."""
+    today = (clock + utc_offset) // DAY
+    passed = today - day
+    for age in range(1, CYCLE_DAYS + 1):
+        rolled = passed >= age
+        if not rolled.any():
+            break
+        history[rolled, (day[rolled] + age) % CYCLE_DAYS] = 0
+    return today
+
+
+def simulate_departures(route_data: Dict, states: List[HOSState]) -> Dict[str, np.ndarray]:
+    """:func:`simulate_trip` for many starting states at once, keeping only the totals.
+
+    Every departure walks the same task list, so the greedy loop runs in
+    lockstep with one array element per departure: each pass takes the next
+    rest, break, restart or stretch of work for all of them. On-duty time
+    is charged to a ring buffer of the last 8 days per departure. Stops are
+    not snapped to facilities.
+
+    Returns ``arrival`` (Unix seconds), ``on_duty`` and ``cycle_used``
+    (seconds) and the ``rests``, ``breaks`` and ``restarts`` taken.
+    """
+    _, tasks = trip_tasks(route_data)
+    count = len(states)
+    task_count = len(tasks)
+    # A trailing sentinel keeps finished departures' lookups in range.
+    task_kinds = np.array([task[0] for task in tasks] + [TASK_DRIVE], dtype=np.int8)
+    task_seconds = np.array([task[1] for task in tasks] + [1], dtype=np.int64)
+
+    clock = np.array([state.clock for state in states], dtype=np.int64)
+    window_start = np.array([state.window_start for state in states], dtype=np.int64)
+    shift_driving = np.array([state.shift_driving for state in states], dtype=np.int64)
+    since_break = np.array([state.driving_since_break for state in states], dtype=np.int64)
+    utc_offset = np.array([state.utc_offset for state in states], dtype=np.int64)
+    day = (clock + utc_offset) // DAY
+    rows = np.arange(count)
+    history = np.zeros((count, CYCLE_DAYS), dtype=np.int64)
+    for age in range(CYCLE_DAYS):
+        # history[-1] is today's, history[0] the day seven days back.
+        history[rows, (day - age) % CYCLE_DAYS] = [state.history[-1 - age] for state in states]
+
+    task = np.zeros(count, dtype=np.int64)
+    offset = np.zeros(count, dtype=np.int64)
+    on_duty = np.zeros(count, dtype=np.int64)
+    rests = np.zeros(count, dtype=np.int64)
+    breaks = np.zeros(count, dtype=np.int64)
+    restarts = np.zeros(count, dtype=np.int64)
+
+    while True:
+        active = task < task_count
+        if not active.any():
+            break
+        kind = task_kinds[task]
+        remaining = task_seconds[task] - offset
+        cycle_used = history.sum(axis=1)
+        in_window = clock - window_start
+        driving = active & (kind == TASK_DRIVE)
+        working = active & (kind != TASK_DRIVE)
+
+        restart = driving & (cycle_used >= MAX_CYCLE_SECONDS)
+        rest = driving & ~restart & ((in_window >= MAX_WINDOW_SECONDS) | (shift_driving >= MAX_DRIVING_SECONDS))
+        take_break = driving & ~restart & ~rest & (since_break >= BREAK_REQUIRED_AFTER_SECONDS)
+        driving &= ~(restart | rest | take_break)
+
+        off_duty = restart * RESTART_SECONDS + rest * MIN_OFF_DUTY_SECONDS + take_break * REQUIRED_BREAK_SECONDS
+        clock += off_duty
+        reset = restart | rest
+        since_break[off_duty > 0] = 0
+        window_start[reset] = clock[reset]
+        shift_driving[reset] = 0
+        history[restart] = 0
+        restarts += restart
+        rests += rest
+        breaks += take_break
+        day = _roll(history, day, clock, utc_offset)
+        cycle_used = history.sum(axis=1)
+        in_window = clock - window_start
+
+        step = np.where(driving, np.minimum.reduce([
+            remaining, MAX_DRIVING_SECONDS - shift_driving, MAX_WINDOW_SECONDS - in_window,
+            BREAK_REQUIRED_AFTER_SECONDS - since_break, MAX_CYCLE_SECONDS - cycle_used
+        ]), np.where(working, remaining, 0))
+        # Split work at midnight so each day is charged its share.
+        step = np.minimum(step, (day + 1) * DAY - utc_offset - clock)
+        history[rows, day % CYCLE_DAYS] += step
+        clock += step
+        on_duty += step
+        driven = step * driving
+        shift_driving += driven
+        since_break += driven
+        offset += step
+        finished = (driving | working) & (step == remaining)
+        task += finished
+        offset[finished] = 0
+
+        day = _roll(history, day, clock, utc_offset)
+
+    return {
+        "arrival": clock,
+        "on_duty": on_duty,
+        "cycle_used": history.sum(axis=1),
+        "rests": rests,
+        "breaks": breaks,
+        "restarts": restarts,
+    }
+
+
+def departure_times(start_time_str: str, departures: int, interval_minutes: int) -> List[datetime]:
+    start_time = parse_datetime(start_time_str)
+    return [start_time + timedelta(minutes=interval_minutes * index) for index in range(departures)]
+
+
+def sweep_departures(route_data: Dict, current_cycle_used: Optional[float], start_times: List[datetime],
+                     hos_state: Optional[str] = None) -> Dict:
+    """Arrival, on-duty hours and stops for each departure in ``start_times``.
+
+    Starting states come from the same rules as a single plan, so a
+    checkpoint's off-duty gap is counted per departure. The result is a
+    table (``columns`` and one row per departure) plus the indexes of the
+    earliest arrival and of the fewest cycle hours used at arrival.
+    """
+    states = [_initial_state(current_cycle_used, start_time, hos_state) for start_time in start_times]
+    totals = simulate_departures(route_data, states)
+    arrivals = totals["arrival"]
+    departures = np.array([state.clock for state in states], dtype=np.int64)
+    trip_hours = np.round((arrivals - departures) / HOUR, 2)
+    on_duty_hours = np.round(totals["on_duty"] / HOUR, 2)
+    cycle_hours = np.round(totals["cycle_used"] / HOUR, 2)
+
+    rows = []
+    for index, start_time in enumerate(start_times):
+        tzinfo = start_time.tzinfo
+        rows.append([
+            datetime.fromtimestamp(int(departures[index]), tzinfo).isoformat().replace('+00:00', 'Z'),
+            datetime.fromtimestamp(int(arrivals[index]), tzinfo).isoformat().replace('+00:00', 'Z'),
+            float(trip_hours[index]),
+            float(on_duty_hours[index]),
+            float(cycle_hours[index]),
+            int(totals["rests"][index]),
+            int(totals["breaks"][index]),
+            int(totals["restarts"][index]),
+        ])
+    return {
+        "columns": list(SWEEP_COLUMNS),
+        "rows": rows,
+        "earliest_arrival": int(np.argmin(arrivals)) if rows else None,
+        "fewest_cycle_hours": int(np.argmin(totals["cycle_used"])) if rows else None,
+    }
@@ -0,0 +1,276 @@
+import csv
+import mmap
+import os
+import re
+import struct
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"ELDGAZ01"
+
+# magic, record count, key count, hash slot count, records/keys/slots/strings offsets
+HEADER = struct.Struct("<8sIII4xQQQQ")
+# lon, lat, display name offset, display name length, kind
+RECORD = struct.Struct("<ddIHB1x")
+# key offset, key length, record index
+KEY = struct.Struct("<IH2xI")
+# crc32 of the key, key index + 1 (0 marks an empty slot)
+SLOT = struct.Struct("<II")
+
+PLACE_KINDS = ["place", "city", "zip", "truck_stop", "fuel"]
+
+PREFIX_SCAN_LIMIT = 64
+
+STATE_CODES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "district of columbia": "dc",
+    "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il",
+    "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la",
+    "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny",
+    "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or",
+    "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc", "south dakota": "sd",
+    "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va",
+    "washington": "wa", "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+}
+
+COUNTRY_SUFFIXES = {"usa", "us", "u s a", "u s", "united states", "united states of america"}
+
+
+def _clean(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return text.strip()
+
+
+def normalize_place(text: str) -> str:
+    """Normalize a place query to the token form used as gazetteer keys.
+
+    Punctuation is dropped, a trailing state name collapses to its postal code
+    and a trailing country name is removed:
+    ``"Dallas, Texas, USA"`` and ``"dallas tx"`` both become ``"dallas tx"``.
+    """
+    parts = [_clean(part) for part in (text or "").split(",")]
+    parts = [part for part in parts if part]
+    while parts and parts[-1] in COUNTRY_SUFFIXES:
+        parts.pop()
+    tokens = " ".join(parts).split()
+    zip_code = tokens.pop() if len(tokens) > 1 and re.fullmatch(r"\d{5}", tokens[-1]) else None
+    # A trailing state name is only replaced when something precedes it, so
+    # "New York" stays a place name while "New York, New York" ends in "ny".
+    for size in (3, 2, 1):
+        if len(tokens) > size and " ".join(tokens[-size:]) in STATE_CODES:
+            tokens[-size:] = [STATE_CODES[" ".join(tokens[-size:])]]
+            break
+    if zip_code:
+        tokens.append(zip_code)
+    return " ".join(tokens)
+
+
+def _keys_for_row(name: str, state: str, zip_code: str) -> List[str]:
+    keys = []
+    name_key = _clean(name)
+    state_key = _clean(state)
+    state_key = STATE_CODES.get(state_key, state_key)
+    if name_key:
+        keys.append(f"{name_key} {state_key}".strip())
+        if zip_code:
+            keys.append(f"{name_key} {state_key} {zip_code}".strip())
+    if zip_code:
+        keys.append(zip_code)
+    return keys
+
+
+def build_gazetteer(rows: Iterable[Dict], output_path: str) -> Dict:
+    """Write a gazetteer index file from place rows.
+
+    Each row needs ``name``, ``lon`` and ``lat``; ``state``, ``zip``, ``kind`` and
+    ``rank`` are optional. When two rows produce the same key the one with the
+    lower ``rank`` (more important place) wins.
+    """
+    records = []
+    for row in rows:
+        try:
+            lon = float(row["lon"])
+            lat = float(row["lat"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+            continue
+        name = (row.get("name") or "").strip()
+        state = (row.get("state") or "").strip()
+        zip_code = (row.get("zip") or "").strip()[:5]
+        if not name and not zip_code:
+            continue
+        try:
+            rank = float(row.get("rank") or 0)
+        except ValueError:
+            rank = 0
+        kind = (row.get("kind") or "place").strip().lower()
+        display = ", ".join(part for part in (name, state) if part) or zip_code
+        records.append((rank, name, state, zip_code, kind, display, lon, lat))
+
+    records.sort(key=lambda record: record[0])
+
+    strings = bytearray()
+    string_offsets: Dict[str, Tuple[int, int]] = {}
+
+    def intern(text: str) -> Tuple[int, int]:
+        if text not in string_offsets:
+            encoded = text.encode("utf-8")[:0xFFFF]
+            string_offsets[text] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return string_offsets[text]
+
+    record_bytes = bytearray()
+    keys: Dict[str, int] = {}
+    for index, (_, name, state, zip_code, kind, display, lon, lat) in enumerate(records):
+        display_offset, display_len = intern(display)
+        kind_code = PLACE_KINDS.index(kind) if kind in PLACE_KINDS else 0
+        record_bytes.extend(RECORD.pack(lon, lat, display_offset, display_len, kind_code))
+        for key in _keys_for_row(name, state, zip_code):
+            keys.setdefault(key, index)
+
+    sorted_keys = sorted(keys.items(), key=lambda item: item[0].encode("utf-8"))
+    key_bytes = bytearray()
+    for key, record_index in sorted_keys:
+        key_offset, key_len = intern(key)
+        key_bytes.extend(KEY.pack(key_offset, key_len, record_index))
+
+    slot_count = 1
+    while slot_count < max(2 * len(sorted_keys), 8):
+        slot_count <<= 1
+    slots = [(0, 0)] * slot_count
+    for key_index, (key, _) in enumerate(sorted_keys):
+        key_hash = zlib.crc32(key.encode("utf-8"))
+        slot = key_hash & (slot_count - 1)
+        while slots[slot][1]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = (key_hash, key_index + 1)
+    slot_bytes = b"".join(SLOT.pack(*slot) for slot in slots)
+
+    records_offset = HEADER.size
+    keys_offset = records_offset + len(record_bytes)
+    slots_offset = keys_offset + len(key_bytes)
+    strings_offset = slots_offset + len(slot_bytes)
+
+    # The default index paths live in backend/data/, which a fresh checkout does not have.
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records), len(sorted_keys), slot_count,
+                            records_offset, keys_offset, slots_offset, strings_offset))
+        f.write(record_bytes)
+        f.write(key_bytes)
+        f.write(slot_bytes)
+        f.write(strings)
+
+    return {"records": len(records), "keys": len(sorted_keys), "bytes": strings_offset + len(strings)}
+
+
+def build_gazetteer_from_csv(csv_path: str, output_path: str) -> Dict:
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return build_gazetteer(csv.DictReader(f), output_path)
+
+
+class Gazetteer:
+    """Read-only view over a gazetteer index file.
+
+    The file is memory-mapped, so every worker process that opens it shares the
+    same page-cache pages and nothing is parsed up front.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.record_count, self.key_count, self.slot_count, self._records_offset,
+         self._keys_offset, self._slots_offset, self._strings_offset) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a gazetteer index")
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _string(self, offset: int, length: int) -> bytes:
+        start = self._strings_offset + offset
+        return self._mm[start:start + length]
+
+    def _key(self, key_index: int) -> Tuple[bytes, int]:
+        key_offset, key_len, record_index = KEY.unpack_from(self._mm, self._keys_offset + key_index * KEY.size)
+        return self._string(key_offset, key_len), record_index
+
+    def _record(self, record_index: int) -> Dict:
+        lon, lat, name_offset, name_len, kind = RECORD.unpack_from(
+            self._mm, self._records_offset + record_index * RECORD.size
+        )
+        return {
+            "name": self._string(name_offset, name_len).decode("utf-8"),
+            "kind": PLACE_KINDS[kind] if kind < len(PLACE_KINDS) else "place",
+            "lon": lon,
+            "lat": lat,
+        }
+
+    def _exact(self, key: bytes) -> Optional[int]:
+        if not self.slot_count:
+            return None
+        key_hash = zlib.crc32(key)
+        mask = self.slot_count - 1
+        slot = key_hash & mask
+        while True:
+            slot_hash, key_ref = SLOT.unpack_from(self._mm, self._slots_offset + slot * SLOT.size)
+            if not key_ref:
+                return None
+            if slot_hash == key_hash:
+                stored_key, record_index = self._key(key_ref - 1)
+                if stored_key == key:
+                    return record_index
+            slot = (slot + 1) & mask
+
+    def _prefix_start(self, prefix: bytes) -> int:
+        lo, hi = 0, self.key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[0] < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _prefix_records(self, prefix: bytes, limit: int) -> List[int]:
+        found = []
+        key_index = self._prefix_start(prefix)
+        while key_index < self.key_count and len(found) < limit:
+            key, record_index = self._key(key_index)
+            if not key.startswith(prefix):
+                break
+            if record_index not in found:
+                found.append(record_index)
+            key_index += 1
+        return found
+
+    def lookup(self, query: str) -> Optional[Dict]:
+        """Resolve a place by exact key, else by whole-token prefix.
+
+        ``"Dallas"`` matches the key ``"dallas tx"``; ties go to the
+        best-ranked record. Partial tokens (``"dall"``) never match here,
+        use :meth:`suggest` for that.
+        """
+        key = normalize_place(query).encode("utf-8")
+        if not key:
+            return None
+        record_index = self._exact(key)
+        if record_index is None:
+            candidates = self._prefix_records(key + b" ", PREFIX_SCAN_LIMIT)
+            if not candidates:
+                return None
+            record_index = min(candidates)
+        return self._record(record_index)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        key = normalize_place(prefix).encode("utf-8")
+        if not key:
+            return []
+        return [self._record(index) for index in sorted(self._prefix_records(key, limit))]
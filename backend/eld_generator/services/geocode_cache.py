@@ -0,0 +1,210 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+DEFAULT_MEMORY_ENTRIES = 2048
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 3600
+
+
+def normalize_address(address: str) -> str:
+    """Canonical cache key: case-folded, punctuation-free, single-spaced."""
+    text = unicodedata.normalize("NFKC", address or "").casefold()
+    text = re.sub(r"[^\w\s\-.,#/]", " ", text)
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ,")
+
+
+class GeocodeCache:
+    """In-process LRU in front of a SQLite store of geocoding results.
+
+    A stored value of ``None`` is a negative result (the geocoder answered but
+    found nothing); it is kept for ``negative_ttl_seconds`` instead of ``ttl_seconds``.
+    """
+
+    def __init__(self, path: str, memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 negative_ttl_seconds: int = DEFAULT_NEGATIVE_TTL_SECONDS):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+
+        self._memory: "OrderedDict[str, Tuple[Optional[Tuple[float, float]], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_evict = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "stores": 0,
+            "evictions": 0,
+            "disk_errors": 0,
+        }
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self.path:
+            try:
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS geocode_cache ("
+                    "key TEXT PRIMARY KEY, lon REAL, lat REAL, "
+                    "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS geocode_cache_accessed ON geocode_cache (accessed_at)"
+                )
+                conn.commit()
+                self._conn = conn
+            except sqlite3.Error:
+                self._counters["disk_errors"] += 1
+                self.path = None
+        return self._conn
+
+    def _remember(self, key: str, value: Optional[Tuple[float, float]], expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def get(self, address: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """Return ``(found, coords)``; ``(True, None)`` is a cached "not found"."""
+        key = normalize_address(address)
+        now = time.time()
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                value, expires_at = cached
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    if value is None:
+                        self._counters["negative_hits"] += 1
+                    return True, value
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    row = conn.execute(
+                        "SELECT lon, lat, expires_at FROM geocode_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        lon, lat, expires_at = row
+                        if expires_at > now:
+                            value = (lon, lat) if lon is not None else None
+                            conn.execute(
+                                "UPDATE geocode_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                            )
+                            conn.commit()
+                            self._remember(key, value, expires_at)
+                            self._counters["disk_hits"] += 1
+                            if value is None:
+                                self._counters["negative_hits"] += 1
+                            return True, value
+                        conn.execute("DELETE FROM geocode_cache WHERE key = ?", (key,))
+                        conn.commit()
+                        self._counters["expired"] += 1
+                except sqlite3.Error:
+                    self._counters["disk_errors"] += 1
+
+            self._counters["misses"] += 1
+        return False, None
+
+    def set(self, address: str, coords: Optional[Tuple[float, float]]) -> None:
+        key = normalize_address(address)
+        now = time.time()
+        ttl = self.ttl_seconds if coords is not None else self.negative_ttl_seconds
+        expires_at = now + ttl
+        lon, lat = coords if coords is not None else (None, None)
+
+        with self._lock:
+            self._remember(key, coords, expires_at)
+            self._counters["stores"] += 1
+
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO geocode_cache (key, lon, lat, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, lon, lat, expires_at, now)
+                )
+                self._writes_since_evict += 1
+                if self._writes_since_evict >= max(1, self.max_entries // 100):
+                    self._evict_disk(conn, now)
+                conn.commit()
+            except sqlite3.Error:
+                self._counters["disk_errors"] += 1
+
+    def _evict_disk(self, conn: sqlite3.Connection, now: float) -> None:
+        self._writes_since_evict = 0
+        removed = conn.execute("DELETE FROM geocode_cache WHERE expires_at <= ?", (now,)).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            removed += conn.execute(
+                "DELETE FROM geocode_cache WHERE key IN ("
+                "SELECT key FROM geocode_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            ).rowcount
+        self._counters["evictions"] += max(0, removed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    conn.execute("DELETE FROM geocode_cache")
+                    conn.commit()
+                except sqlite3.Error:
+                    self._counters["disk_errors"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["memory_size"] = len(self._memory)
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        lookups = hits + counters["misses"]
+        counters["hits"] = hits
+        counters["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+        return counters
+
+
+_cache: Optional[GeocodeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_geocode_cache() -> GeocodeCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = getattr(settings, "GEOCODE_CACHE", {})
+                _cache = GeocodeCache(
+                    path=config.get("PATH"),
+                    memory_entries=config.get("MEMORY_ENTRIES", DEFAULT_MEMORY_ENTRIES),
+                    max_entries=config.get("MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+                    ttl_seconds=config.get("TTL_SECONDS", DEFAULT_TTL_SECONDS),
+                    negative_ttl_seconds=config.get("NEGATIVE_TTL_SECONDS", DEFAULT_NEGATIVE_TTL_SECONDS),
+                )
+    return _cache
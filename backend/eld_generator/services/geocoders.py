@@ -0,0 +1,205 @@
+import asyncio
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .gazetteer import Gazetteer
+from .geocode_cache import get_geocode_cache
+from .http_client import FetchResult, fetch_json, fetch_json_async
+from .rate_limiter import get_nominatim_rate_limiter
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+DEFAULT_BACKENDS = ["coordinates", "gazetteer", "nominatim"]
+
+
+def parse_coordinates(address: str) -> Optional[Tuple[float, float]]:
+    coords_pattern = r'(-?\d+\.?\d*),\s*(-?\d+\.?\d*)'
+    match = re.search(coords_pattern, address)
+    if match:
+        try:
+            val1 = float(match.group(1))
+            val2 = float(match.group(2))
+
+            if -90 <= val1 <= 90 and -180 <= val2 <= 180:
+                return (val2, val1)
+            elif -180 <= val1 <= 180 and -90 <= val2 <= 90:
+                return (val1, val2)
+            elif abs(val1) <= 180 and abs(val2) <= 90:
+                if abs(val1) > abs(val2):
+                    return (val1, val2)
+                else:
+                    return (val2, val1)
+        except ValueError:
+            pass
+    return None
+
+
+class Geocoder:
+    """Resolves a free-form address to ``(lon, lat)``.
+
+    ``geocode`` returns ``None`` when this backend cannot answer, which lets a
+    :class:`GeocoderChain` fall through to the next backend.
+    """
+
+    name = "base"
+
+    def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        raise NotImplementedError
+
+    async def geocode_async(self, address: str) -> Optional[Tuple[float, float]]:
+        # Local backends answer without I/O worth awaiting.
+        return self.geocode(address)
+
+
+class CoordinateGeocoder(Geocoder):
+    name = "coordinates"
+
+    def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        coords = parse_coordinates(address)
+        if coords:
+            lon, lat = coords
+            if -180 <= lon <= 180 and -90 <= lat <= 90:
+                return coords
+        return None
+
+
+class GazetteerGeocoder(Geocoder):
+    name = "gazetteer"
+
+    def __init__(self, gazetteer: Gazetteer):
+        self.gazetteer = gazetteer
+
+    def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        place = self.gazetteer.lookup(address)
+        if place:
+            return (place["lon"], place["lat"])
+        return None
+
+
+class NominatimGeocoder(Geocoder):
+    name = "nominatim"
+
+    @staticmethod
+    def _params(address: str) -> Dict:
+        return {
+            "q": address.strip(),
+            "format": "json",
+            "limit": 1,
+            "addressdetails": 0
+        }
+
+    @staticmethod
+    def _parse(cache, address: str, result: FetchResult) -> Optional[Tuple[float, float]]:
+        if not result.ok:
+            return None
+        try:
+            data = result.data
+            if data and len(data) > 0:
+                lon = float(data[0]["lon"])
+                lat = float(data[0]["lat"])
+                cache.set(address, (lon, lat))
+                return (lon, lat)
+            cache.set(address, None)
+        except (TypeError, ValueError, KeyError, IndexError):
+            pass
+        return None
+
+    def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        cache = get_geocode_cache()
+        found, cached_coords = cache.get(address)
+        if found:
+            return cached_coords
+
+        result = fetch_json(
+            NOMINATIM_URL,
+            params=self._params(address),
+            headers={"Accept-Language": "en"},
+            rate_limiter=get_nominatim_rate_limiter(),
+            service="nominatim"
+        )
+        return self._parse(cache, address, result)
+
+    async def geocode_async(self, address: str) -> Optional[Tuple[float, float]]:
+        # The cache reads and writes SQLite under a thread lock; keep that off the event loop.
+        loop = asyncio.get_running_loop()
+        cache = get_geocode_cache()
+        found, cached_coords = await loop.run_in_executor(None, cache.get, address)
+        if found:
+            return cached_coords
+
+        result = await fetch_json_async(
+            NOMINATIM_URL,
+            params=self._params(address),
+            headers={"Accept-Language": "en"},
+            rate_limiter=get_nominatim_rate_limiter(),
+            service="nominatim"
+        )
+        return await loop.run_in_executor(None, self._parse, cache, address, result)
+
+
+class GeocoderChain(Geocoder):
+    name = "chain"
+
+    def __init__(self, backends: List[Geocoder]):
+        self.backends = backends
+
+    def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        if not address or not address.strip():
+            return None
+        # Input that looks like coordinates is never sent on to name lookups.
+        if parse_coordinates(address):
+            for backend in self.backends:
+                if isinstance(backend, CoordinateGeocoder):
+                    return backend.geocode(address)
+        for backend in self.backends:
+            coords = backend.geocode(address)
+            if coords:
+                return coords
+        return None
+
+    async def geocode_async(self, address: str) -> Optional[Tuple[float, float]]:
+        if not address or not address.strip():
+            return None
+        if parse_coordinates(address):
+            for backend in self.backends:
+                if isinstance(backend, CoordinateGeocoder):
+                    return backend.geocode(address)
+        for backend in self.backends:
+            coords = await backend.geocode_async(address)
+            if coords:
+                return coords
+        return None
+
+
+def _build_backend(name: str) -> Optional[Geocoder]:
+    if name == "coordinates":
+        return CoordinateGeocoder()
+    if name == "gazetteer":
+        path = getattr(settings, "GAZETTEER_PATH", None)
+        if path and os.path.exists(path):
+            try:
+                return GazetteerGeocoder(Gazetteer(path))
+            except (OSError, ValueError):
+                return None
+        return None
+    if name == "nominatim":
+        return NominatimGeocoder()
+    raise ValueError(f"Unknown geocoder backend: {name}")
+
+
+_geocoder: Optional[GeocoderChain] = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> GeocoderChain:
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                names = getattr(settings, "GEOCODER_BACKENDS", DEFAULT_BACKENDS)
+                backends = [_build_backend(name) for name in names]
+                _geocoder = GeocoderChain([backend for backend in backends if backend])
+    return _geocoder
@@ -0,0 +1,364 @@
+from datetime import datetime, tzinfo
+from typing import Dict, List, Optional, Tuple
+
+from dateutil import tz
+
+from .hos_rules import (
+    BREAK_REQUIRED_AFTER_SECONDS,
+    CYCLE_DAYS,
+    DAY,
+    DRIVING,
+    DUTY_STATUS_NAMES,
+    FUEL_STOP_SECONDS,
+    MAX_CYCLE_SECONDS,
+    MAX_DRIVING_SECONDS,
+    MAX_WINDOW_SECONDS,
+    MIN_OFF_DUTY_SECONDS,
+    OFF_DUTY,
+    ON_DUTY_NOT_DRIVING,
+    PICKUP_DROPOFF_SECONDS,
+    REQUIRED_BREAK_SECONDS,
+    RESTART_SECONDS,
+    SLEEPER_BERTH,
+)
+from .poi_index import BREAK_KINDS, REST_KINDS, snap_stop
+from .route_geometry import point_on_segment, ratio_at_seconds, seconds_at_ratio
+
+RESTART_REASON = "70-hour cycle limit reached - 34-hour restart"
+
+TASK_DRIVE = 0
+TASK_DUTY = 1
+
+
+class DutyDays:
+    """On-duty seconds per day over the rolling 8-day cycle.
+
+    ``history`` holds the last :data:`CYCLE_DAYS` days, oldest first, ending
+    with ``day``, the day ``clock`` falls on. Days start at midnight
+    ``utc_offset`` seconds east of UTC, and ``cycle_used`` is their sum, so
+    hours worked eight days ago become available again as days roll over.
+    """
+
+    __slots__ = ()
+
+    def _roll(self) -> None:
+        day = (self.clock + self.utc_offset) // DAY
+        if day != self.day:
+            passed = min(day - self.day, CYCLE_DAYS)
+            self.cycle_used -= sum(self.history[:passed])
+            self.history = self.history[passed:] + [0] * passed
+            self.day = day
+
+    def work(self, seconds: int) -> None:
+        """Advance the clock through on-duty time, charging each day its share."""
+        while seconds > 0:
+            part = min(seconds, (self.day + 1) * DAY - self.utc_offset - self.clock)
+            self.history[-1] += part
+            self.cycle_used += part
+            self.clock += part
+            seconds -= part
+            self._roll()
+
+    def wait(self, seconds: int) -> None:
+        """Advance the clock through off-duty time."""
+        self.clock += seconds
+        self._roll()
+
+    def restart(self) -> None:
+        """A 34-hour restart: the cycle starts over."""
+        self.history = [0] * CYCLE_DAYS
+        self.cycle_used = 0
+
+
+class HOSState(DutyDays):
+    """Hours-of-service clocks, all in integer seconds.
+
+    ``clock`` and ``window_start`` are Unix timestamps; the other fields are
+    accumulated durations. Without a ``history``, ``cycle_used`` counts as
+    on-duty time on the starting day.
+    """
+
+    __slots__ = ("clock", "window_start", "shift_driving", "driving_since_break", "cycle_used",
+                 "history", "day", "utc_offset")
+
+    def __init__(self, clock: int, cycle_used: int = 0, window_start: Optional[int] = None,
+                 shift_driving: int = 0, driving_since_break: int = 0,
+                 history: Optional[List[int]] = None, utc_offset: int = 0):
+        self.clock = clock
+        self.window_start = clock if window_start is None else window_start
+        self.shift_driving = shift_driving
+        self.driving_since_break = driving_since_break
+        self.utc_offset = utc_offset
+        self.day = (clock + utc_offset) // DAY
+        self.history = [0] * (CYCLE_DAYS - 1) + [cycle_used] if history is None else list(history)
+        self.cycle_used = sum(self.history)
+
+    def copy(self) -> "HOSState":
+        return HOSState(self.clock, self.cycle_used, self.window_start, self.shift_driving,
+                        self.driving_since_break, self.history, self.utc_offset)
+
+    def off_duty(self, seconds: int) -> None:
+        """Spend ``seconds`` off duty, with the break, rest and restart resets that earns."""
+        self.wait(seconds)
+        if seconds >= REQUIRED_BREAK_SECONDS:
+            self.driving_since_break = 0
+        if seconds >= MIN_OFF_DUTY_SECONDS:
+            self.window_start = self.clock
+            self.shift_driving = 0
+        if seconds >= RESTART_SECONDS:
+            self.restart()
+
+
+class LogEvent:
+    __slots__ = ("start", "end", "status", "location", "miles", "reason", "coordinates")
+
+    def __init__(self, start: int, end: int, status: int, location: str, miles: float = 0,
+                 reason: Optional[str] = None, coordinates: Optional[Dict] = None):
+        self.start = start
+        self.end = end
+        self.status = status
+        self.location = location
+        self.miles = miles
+        self.reason = reason
+        self.coordinates = coordinates
+
+
+def _fuel_stops_by_segment(route_data: Dict, segments: List[Dict]) -> List[List[Dict]]:
+    by_segment: List[List[Dict]] = [[] for _ in segments]
+    for fuel_stop in route_data.get("fuel_stops", []):
+        seg_idx = fuel_stop.get("segment_index")
+        if seg_idx is not None and 0 <= seg_idx < len(segments):
+            by_segment[seg_idx].append(fuel_stop)
+    return by_segment
+
+
+def _fuel_times(segment: Dict, fuel_stops: List[Dict], segment_start_mile: float, distance: float,
+                duration: int) -> List[Tuple[int, float, Optional[str]]]:
+    """``(seconds of driving into the segment, mile marker, facility)`` for each fuel stop."""
+    fuel_times = []
+    for fuel_stop in fuel_stops:
+        offset = fuel_stop["mile_marker"] - segment_start_mile
+        if distance > 0 and 0 < offset <= distance:
+            fuel_times.append((min(duration, seconds_at_ratio(segment, offset / distance, duration)),
+                               fuel_stop["mile_marker"], fuel_stop.get("facility")))
+    fuel_times.sort()
+    return fuel_times
+
+
+def _stop_type(segments: List[Dict], seg_idx: int) -> Optional[str]:
+    """``"pickup"`` or ``"dropoff"`` when the segment ends at one, else None."""
+    stop_type = segments[seg_idx].get("stop_type")
+    if stop_type is None:
+        stop_type = "pickup" if seg_idx == 0 else "dropoff" if seg_idx == len(segments) - 1 else None
+    return stop_type if stop_type in ("pickup", "dropoff") else None
+
+
+def _fuel_location(mile_marker: float, facility: Optional[str] = None) -> str:
+    location = f"Fuel Stop at {mile_marker:.0f} miles"
+    if facility:
+        location += f" - {facility}"
+    return location
+
+
+def _fuel_event(state: HOSState, mile_marker: float, facility: Optional[str] = None) -> LogEvent:
+    event = LogEvent(
+        state.clock, state.clock + FUEL_STOP_SECONDS, ON_DUTY_NOT_DRIVING,
+        _fuel_location(mile_marker, facility), reason="Fueling"
+    )
+    state.work(FUEL_STOP_SECONDS)
+    return event
+
+
+def _off_duty_event(state: HOSState, seconds: int, location: str, reason: str,
+                    coordinates: Optional[Dict]) -> LogEvent:
+    """A break, rest or restart of ``seconds`` starting now."""
+    event = LogEvent(state.clock, state.clock + seconds, OFF_DUTY, location, reason=reason,
+                     coordinates=coordinates)
+    state.off_duty(seconds)
+    return event
+
+
+def _planned_stop(segment: Dict, duration: int, driven: int, limit_at: int, seconds: int,
+                  reason: str) -> Optional[Tuple[int, int, str, Dict]]:
+    """Stop early at the last facility before a limit: ``(seconds into segment, off-duty seconds, reason, facility)``."""
+    kinds = REST_KINDS if seconds >= MIN_OFF_DUTY_SECONDS else BREAK_KINDS
+    facility = snap_stop(segment, ratio_at_seconds(segment, limit_at, duration), kinds)
+    if facility is None:
+        return None
+    at = seconds_at_ratio(segment, facility["ratio"], duration)
+    if at <= driven:
+        return None
+    return at, seconds, reason, facility
+
+
+def simulate_trip(route_data: Dict, state: HOSState) -> List[LogEvent]:
+    """Greedy HOS schedule for ``route_data`` starting from ``state``.
+
+    Instead of stepping, each iteration drives until the nearest limiting event
+    (30-minute break due, 11-hour driving limit, 14-hour window, 70-hour cycle,
+    next fuel stop or segment end) and then handles that event; the 70-hour
+    cycle is met with a 34-hour restart. ``state`` is advanced in place, so it
+    describes the driver at the end of the trip.
+
+    With a facility index loaded, a rest or break that a limit forces mid-segment
+    is taken at the last truck stop or rest area before that point instead.
+    """
+    events: List[LogEvent] = []
+    segments = route_data.get("segments", [])
+    fuel_stops = _fuel_stops_by_segment(route_data, segments)
+    segment_start_mile = 0
+
+    for seg_idx, segment in enumerate(segments):
+        distance = segment["distance_miles"]
+        duration = round(segment["driving_time_hours"] * 3600)
+        start_label = segment.get("from", "")
+        end_label = segment.get("to", "")
+
+        fuel_times = _fuel_times(segment, fuel_stops[seg_idx], segment_start_mile, distance, duration)
+        segment_start_mile += distance
+        fuel_index = 0
+        driven = 0
+        # Share of ``distance`` covered after ``driven`` seconds.
+        driven_ratio = 0.0
+        planned_stop = None
+
+        while driven < duration:
+            label = start_label if driven == 0 else f"{start_label} to {end_label}"
+            if state.cycle_used >= MAX_CYCLE_SECONDS:
+                events.append(_off_duty_event(
+                    state, RESTART_SECONDS, label, RESTART_REASON, point_on_segment(segment, driven_ratio)
+                ))
+                continue
+
+            if planned_stop is not None and driven >= planned_stop[0]:
+                _, seconds, reason, facility = planned_stop
+                planned_stop = None
+                events.append(_off_duty_event(
+                    state, seconds, facility["name"], reason, {"lon": facility["lon"], "lat": facility["lat"]}
+                ))
+                continue
+
+            in_window = state.clock - state.window_start
+            if in_window >= MAX_WINDOW_SECONDS or state.shift_driving >= MAX_DRIVING_SECONDS:
+                reason = ("14-hour window exceeded" if in_window >= MAX_WINDOW_SECONDS
+                          else "11-hour driving limit reached")
+                events.append(_off_duty_event(
+                    state, MIN_OFF_DUTY_SECONDS, label, reason, point_on_segment(segment, driven_ratio)
+                ))
+                continue
+
+            if state.driving_since_break >= BREAK_REQUIRED_AFTER_SECONDS:
+                events.append(_off_duty_event(
+                    state, REQUIRED_BREAK_SECONDS, label, "30-minute break required",
+                    point_on_segment(segment, driven_ratio)
+                ))
+                continue
+
+            shift_left = min(MAX_DRIVING_SECONDS - state.shift_driving, MAX_WINDOW_SECONDS - in_window)
+            break_left = BREAK_REQUIRED_AFTER_SECONDS - state.driving_since_break
+            chunk = min(duration - driven, shift_left, break_left, MAX_CYCLE_SECONDS - state.cycle_used)
+            if fuel_index < len(fuel_times):
+                chunk = min(chunk, fuel_times[fuel_index][0] - driven)
+
+            if planned_stop is None and chunk < duration - driven and chunk in (shift_left, break_left):
+                if chunk == shift_left:
+                    reason = ("14-hour window exceeded" if MAX_WINDOW_SECONDS - in_window == shift_left
+                              else "11-hour driving limit reached")
+                    planned_stop = _planned_stop(segment, duration, driven, driven + chunk,
+                                                 MIN_OFF_DUTY_SECONDS, reason)
+                else:
+                    planned_stop = _planned_stop(segment, duration, driven, driven + chunk,
+                                                 REQUIRED_BREAK_SECONDS, "30-minute break required")
+                if planned_stop is not None:
+                    chunk = planned_stop[0] - driven
+
+            if chunk > 0:
+                end_ratio = ratio_at_seconds(segment, driven + chunk, duration)
+                events.append(LogEvent(
+                    state.clock, state.clock + chunk, DRIVING,
+                    end_label if driven + chunk == duration else start_label,
+                    miles=distance * (end_ratio - driven_ratio)
+                ))
+                state.work(chunk)
+                state.shift_driving += chunk
+                state.driving_since_break += chunk
+                driven += chunk
+                driven_ratio = end_ratio
+
+            while fuel_index < len(fuel_times) and fuel_times[fuel_index][0] <= driven:
+                events.append(_fuel_event(state, *fuel_times[fuel_index][1:]))
+                fuel_index += 1
+
+        while fuel_index < len(fuel_times):
+            events.append(_fuel_event(state, *fuel_times[fuel_index][1:]))
+            fuel_index += 1
+
+        stop_type = _stop_type(segments, seg_idx)
+        if stop_type is not None:
+            events.append(LogEvent(
+                state.clock, state.clock + PICKUP_DROPOFF_SECONDS, ON_DUTY_NOT_DRIVING,
+                end_label, reason=stop_type.title()
+            ))
+            state.work(PICKUP_DROPOFF_SECONDS)
+
+    return events
+
+
+def trip_tasks(route_data: Dict) -> Tuple[List[Dict], List[Tuple]]:
+    """The trip as driving and on-duty tasks, in the order :func:`simulate_trip` meets them.
+
+    Each task is ``(kind, seconds, segment index, seconds into the segment, payload)``;
+    on-duty tasks carry ``(location, reason)``.
+    """
+    segments = route_data.get("segments", [])
+    fuel_stops = _fuel_stops_by_segment(route_data, segments)
+    tasks = []
+    segment_start_mile = 0
+    for seg_idx, segment in enumerate(segments):
+        distance = segment["distance_miles"]
+        duration = round(segment["driving_time_hours"] * 3600)
+        at = 0
+        for fuel_at, mile_marker, facility in _fuel_times(segment, fuel_stops[seg_idx], segment_start_mile,
+                                                          distance, duration):
+            if fuel_at > at:
+                tasks.append((TASK_DRIVE, fuel_at - at, seg_idx, at, None))
+                at = fuel_at
+            tasks.append((TASK_DUTY, FUEL_STOP_SECONDS, seg_idx, at,
+                          (_fuel_location(mile_marker, facility), "Fueling")))
+        if duration > at:
+            tasks.append((TASK_DRIVE, duration - at, seg_idx, at, None))
+        segment_start_mile += distance
+
+        stop_type = _stop_type(segments, seg_idx)
+        if stop_type is not None:
+            tasks.append((TASK_DUTY, PICKUP_DROPOFF_SECONDS, seg_idx, duration,
+                          (segment.get("to", ""), stop_type.title())))
+    return segments, tasks
+
+
+def serialize_events(events: List[LogEvent], tzinfo: Optional[tzinfo] = None) -> List[Dict]:
+    """Render events as the API's log entry dicts; the only place ISO strings are built."""
+    tzinfo = tzinfo or tz.UTC
+    # Each event usually ends where the next one starts; format each instant once.
+    formatted: Dict[int, str] = {}
+
+    def iso(epoch: int) -> str:
+        text = formatted.get(epoch)
+        if text is None:
+            text = formatted[epoch] = datetime.fromtimestamp(epoch, tzinfo).isoformat().replace('+00:00', 'Z')
+        return text
+
+    entries = []
+    for event in events:
+        entry = {
+            "start_time": iso(event.start),
+            "end_time": iso(event.end),
+            "duty_status": DUTY_STATUS_NAMES[event.status],
+            "location": event.location,
+            "miles": event.miles,
+            "reason": event.reason,
+        }
+        if event.status in (OFF_DUTY, SLEEPER_BERTH):
+            entry["coordinates"] = event.coordinates
+        entries.append(entry)
+    return entries
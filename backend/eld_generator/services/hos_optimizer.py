@@ -0,0 +1,327 @@
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .hos_engine import (
+    RESTART_REASON,
+    TASK_DRIVE,
+    TASK_DUTY,
+    DutyDays,
+    HOSState,
+    LogEvent,
+    trip_tasks,
+)
+from .hos_rules import (
+    BREAK_REQUIRED_AFTER_SECONDS,
+    DRIVING,
+    HOUR,
+    MAX_CYCLE_SECONDS,
+    MAX_DRIVING_SECONDS,
+    MAX_WINDOW_SECONDS,
+    MIN_OFF_DUTY_SECONDS,
+    OFF_DUTY,
+    ON_DUTY_NOT_DRIVING,
+    REQUIRED_BREAK_SECONDS,
+    RESTART_SECONDS,
+    SLEEPER_BERTH,
+    SLEEPER_BERTH_SPLIT_SECONDS,
+)
+from .route_geometry import point_at_seconds, ratio_at_seconds
+
+DEFAULT_BUDGET_SECONDS = 0.25
+
+# Why the forward simulation stopped and a choice has to be made.
+_REST_DUE = 0
+_BREAK_DUE = 1
+_AFTER_DUTY = 2
+
+# Split periods: (seconds, duty status, is the sleeper-berth half).
+_SLEEPER_PERIODS = [(seconds, SLEEPER_BERTH, True)
+                    for seconds in sorted({sleeper for sleeper, _ in SLEEPER_BERTH_SPLIT_SECONDS}, reverse=True)]
+_OFF_DUTY_PERIODS = [(seconds, OFF_DUTY, False)
+                     for seconds in sorted({off for _, off in SLEEPER_BERTH_SPLIT_SECONDS})]
+_SHORTEST_SLEEPER = _SLEEPER_PERIODS[-1][0]
+_SHORTEST_OFF_DUTY = _OFF_DUTY_PERIODS[0][0]
+_BREAK = (REQUIRED_BREAK_SECONDS, OFF_DUTY, False)
+_RESET = (MIN_OFF_DUTY_SECONDS, OFF_DUTY, False)
+_RESTART = (RESTART_SECONDS, OFF_DUTY, False)
+
+
+def _split_reason(period: Tuple[int, int, bool], reason: str = "") -> str:
+    seconds, _, sleeper = period
+    label = f"{seconds // HOUR}-hour {'sleeper berth' if sleeper else 'off-duty'} rest (split)"
+    return f"{reason} - {label}" if reason else label
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class _Clocks(DutyDays):
+    """A driver's position on the trip and HOS clocks under the split-rest rules.
+
+    ``window_used`` is time charged against the 14-hour window. ``pending`` is
+    the last split period not yet paired, as ``(seconds, is sleeper berth,
+    driving since, window time since)``: when its counterpart is taken the
+    11- and 14-hour limits are recomputed from the end of that period.
+    """
+
+    __slots__ = ("clock", "cycle_used", "history", "day", "utc_offset", "shift_driving", "window_used",
+                 "since_break", "pending", "task", "offset")
+
+    def __init__(self, clock: int, history: List[int], day: int, utc_offset: int, shift_driving: int,
+                 window_used: int, since_break: int, pending: Optional[Tuple[int, bool, int, int]] = None,
+                 task: int = 0, offset: int = 0):
+        self.clock = clock
+        self.history = list(history)
+        self.cycle_used = sum(history)
+        self.day = day
+        self.utc_offset = utc_offset
+        self.shift_driving = shift_driving
+        self.window_used = window_used
+        self.since_break = since_break
+        self.pending = pending
+        self.task = task
+        self.offset = offset
+
+    def copy(self) -> "_Clocks":
+        return _Clocks(self.clock, self.history, self.day, self.utc_offset, self.shift_driving,
+                       self.window_used, self.since_break, self.pending, self.task, self.offset)
+
+    def key(self) -> Tuple:
+        # The clock is what is minimized, so it stays out of the key.
+        return (self.task, self.offset, self.shift_driving, self.window_used, self.since_break, self.pending,
+                tuple(self.history))
+
+    def blocked(self) -> bool:
+        return self.shift_driving >= MAX_DRIVING_SECONDS or self.window_used >= MAX_WINDOW_SECONDS
+
+
+def budget_seconds() -> float:
+    return float(getattr(settings, "HOS_OPTIMIZER_BUDGET_SECONDS", DEFAULT_BUDGET_SECONDS))
+
+
+class _Search:
+    """Depth-first branch and bound over where and how the driver rests.
+
+    At every point where the greedy simulation would rest, take a break or
+    carry on after an on-duty stop, each choice is tried: a 10-hour rest, a
+    30-minute break, or one half of a sleeper-berth split. On-duty stops of
+    30 minutes or more count as the break. Choices are tried greedy-first, so
+    the first schedule found is never worse than the greedy one; after that
+    the search stops at the deadline with the best schedule so far.
+    """
+
+    def __init__(self, route_data: Dict, deadline: float):
+        self.segments, self.tasks = trip_tasks(route_data)
+        self.durations = [round(segment["driving_time_hours"] * 3600) for segment in self.segments]
+        # Driving and on-duty seconds left from the start of each task.
+        self.drive_left = [0] * (len(self.tasks) + 1)
+        self.duty_left = [0] * (len(self.tasks) + 1)
+        for index in range(len(self.tasks) - 1, -1, -1):
+            kind, seconds = self.tasks[index][:2]
+            self.drive_left[index] = self.drive_left[index + 1] + (seconds if kind == TASK_DRIVE else 0)
+            self.duty_left[index] = self.duty_left[index + 1] + (seconds if kind == TASK_DUTY else 0)
+        self.deadline = deadline
+        self.path: List[LogEvent] = []
+        self.best: Optional[Tuple[_Clocks, List[LogEvent]]] = None
+        self.seen: Dict[Tuple, int] = {}
+        self.nodes = 0
+
+    def _work_left(self, clocks: _Clocks) -> Tuple[int, int]:
+        return self.drive_left[clocks.task] - clocks.offset, self.duty_left[clocks.task]
+
+    def _lower_bound(self, clocks: _Clocks) -> int:
+        drive_left, duty_left = self._work_left(clocks)
+        available = max(0, min(MAX_DRIVING_SECONDS - clocks.shift_driving, MAX_WINDOW_SECONDS - clocks.window_used))
+        rest = 0
+        excess = drive_left - available
+        if excess > 0:
+            # Each recomputation of the limits frees at most 11 hours of
+            # driving and needs a split half; consecutive ones need both halves.
+            recomputations = -(-excess // MAX_DRIVING_SECONDS)
+            rest = (recomputations + 1) // 2 * _SHORTEST_OFF_DUTY + recomputations // 2 * _SHORTEST_SLEEPER
+        return clocks.clock + drive_left + duty_left + rest
+
+    def _position(self, clocks: _Clocks) -> Tuple[str, Optional[Dict]]:
+        if clocks.task < len(self.tasks):
+            _, _, seg_idx, at, _ = self.tasks[clocks.task]
+            at += clocks.offset
+        else:
+            seg_idx = len(self.segments) - 1
+            at = self.durations[seg_idx]
+        segment = self.segments[seg_idx]
+        start_label = segment.get("from", "")
+        duration = self.durations[seg_idx]
+        if at >= duration:
+            label = segment.get("to", "")
+        else:
+            label = start_label if at == 0 else f"{start_label} to {segment.get('to', '')}"
+        return label, point_at_seconds(segment, at, duration)
+
+    def _advance(self, clocks: _Clocks) -> Optional[int]:
+        """Drive and work until a choice is due; None once the trip is done."""
+        tasks = self.tasks
+        while clocks.task < len(tasks):
+            kind, seconds, seg_idx, at, payload = tasks[clocks.task]
+            if kind == TASK_DUTY:
+                location, reason = payload
+                self.path.append(LogEvent(clocks.clock, clocks.clock + seconds, ON_DUTY_NOT_DRIVING,
+                                          location, reason=reason))
+                clocks.work(seconds)
+                clocks.window_used += seconds
+                if seconds >= REQUIRED_BREAK_SECONDS:
+                    clocks.since_break = 0
+                if clocks.pending is not None:
+                    pending = clocks.pending
+                    clocks.pending = (pending[0], pending[1], pending[2], pending[3] + seconds)
+                clocks.task += 1
+                # Driving on is not a choice when the stop used up the shift.
+                if clocks.task < len(tasks) and not (clocks.blocked() and tasks[clocks.task][0] == TASK_DRIVE):
+                    return _AFTER_DUTY
+                continue
+
+            if clocks.cycle_used >= MAX_CYCLE_SECONDS:
+                self._rest(clocks, _RESTART, RESTART_REASON)
+                continue
+            if clocks.blocked():
+                return _REST_DUE
+            if clocks.since_break >= BREAK_REQUIRED_AFTER_SECONDS:
+                return _BREAK_DUE
+
+            chunk = min(seconds - clocks.offset, MAX_DRIVING_SECONDS - clocks.shift_driving,
+                        MAX_WINDOW_SECONDS - clocks.window_used, BREAK_REQUIRED_AFTER_SECONDS - clocks.since_break,
+                        MAX_CYCLE_SECONDS - clocks.cycle_used)
+            segment = self.segments[seg_idx]
+            duration = self.durations[seg_idx]
+            self.path.append(LogEvent(
+                clocks.clock, clocks.clock + chunk, DRIVING,
+                segment.get("to", "") if at + clocks.offset + chunk == duration else segment.get("from", ""),
+                miles=segment["distance_miles"] * (ratio_at_seconds(segment, at + clocks.offset + chunk, duration)
+                                                   - ratio_at_seconds(segment, at + clocks.offset, duration))
+            ))
+            clocks.work(chunk)
+            clocks.shift_driving += chunk
+            clocks.window_used += chunk
+            clocks.since_break += chunk
+            if clocks.pending is not None:
+                pending = clocks.pending
+                clocks.pending = (pending[0], pending[1], pending[2] + chunk, pending[3] + chunk)
+            clocks.offset += chunk
+            if clocks.offset == seconds:
+                clocks.task += 1
+                clocks.offset = 0
+        return None
+
+    def _rest(self, clocks: _Clocks, period: Tuple[int, int, bool], reason: str) -> None:
+        seconds, status, sleeper = period
+        location, coordinates = self._position(clocks)
+        self.path.append(LogEvent(clocks.clock, clocks.clock + seconds, status, location, reason=reason,
+                                  coordinates=coordinates))
+        clocks.wait(seconds)
+        clocks.since_break = 0
+        if seconds >= MIN_OFF_DUTY_SECONDS:
+            clocks.shift_driving = 0
+            clocks.window_used = 0
+            clocks.pending = None
+            if seconds >= RESTART_SECONDS:
+                clocks.restart()
+        elif seconds >= _SHORTEST_OFF_DUTY:
+            pending = clocks.pending
+            if pending is not None and pending[1] != sleeper and pending[0] + seconds >= MIN_OFF_DUTY_SECONDS:
+                # The pair is complete: neither half counts, and the limits
+                # run from the end of the first one.
+                clocks.shift_driving, clocks.window_used = pending[2], pending[3]
+            else:
+                # Charged to the window until its counterpart turns up.
+                clocks.window_used += seconds
+            clocks.pending = (seconds, sleeper, 0, 0)
+        else:
+            clocks.window_used += seconds
+            if clocks.pending is not None:
+                pending = clocks.pending
+                clocks.pending = (pending[0], pending[1], pending[2], pending[3] + seconds)
+
+    def _choices(self, decision: int, clocks: _Clocks) -> List[Tuple[Optional[Tuple[int, int, bool]], str]]:
+        """``(period, reason)`` for each option, the greedy simulation's first; None carries on."""
+        if decision == _REST_DUE:
+            reason = ("14-hour window exceeded" if clocks.window_used >= MAX_WINDOW_SECONDS
+                      else "11-hour driving limit reached")
+            return [(_RESET, reason)] + [(period, _split_reason(period, reason))
+                                         for period in _SLEEPER_PERIODS + _OFF_DUTY_PERIODS]
+        if decision == _BREAK_DUE:
+            reason = "30-minute break required"
+            return [(_BREAK, reason)] + [(period, _split_reason(period, reason))
+                                         for period in _OFF_DUTY_PERIODS + _SLEEPER_PERIODS] + [(_RESET, reason)]
+        return [(None, "")] + [(period, _split_reason(period)) for period in _OFF_DUTY_PERIODS + _SLEEPER_PERIODS]
+
+    def search(self, clocks: _Clocks) -> None:
+        self.nodes += 1
+        if self.best is not None and perf_counter() > self.deadline:
+            raise _OutOfTime()
+        mark = len(self.path)
+        decision = self._advance(clocks)
+
+        if decision is None:
+            if self.best is None or clocks.clock < self.best[0].clock:
+                self.best = (clocks, list(self.path))
+            del self.path[mark:]
+            return
+
+        if self.best is not None and self._lower_bound(clocks) >= self.best[0].clock:
+            del self.path[mark:]
+            return
+        key = clocks.key()
+        seen = self.seen.get(key)
+        if seen is not None and seen <= clocks.clock:
+            del self.path[mark:]
+            return
+        self.seen[key] = clocks.clock
+
+        for period, reason in self._choices(decision, clocks):
+            branch = clocks.copy()
+            branch_mark = len(self.path)
+            if period is not None:
+                self._rest(branch, period, reason)
+                # A split half that leaves the driver unable to drive is a
+                # 10-hour rest taken the long way round.
+                if period is not _RESET and branch.blocked() and self.tasks[branch.task][0] == TASK_DRIVE:
+                    del self.path[branch_mark:]
+                    continue
+            self.search(branch)
+            del self.path[branch_mark:]
+        del self.path[mark:]
+
+
+def optimize_trip(route_data: Dict, state: HOSState,
+                  budget: Optional[float] = None) -> Tuple[List[LogEvent], Dict]:
+    """Earliest-arrival HOS schedule for ``route_data`` starting from ``state``.
+
+    Returns the events and a summary of the search: nodes visited, whether it
+    ran to completion within ``budget`` seconds and how long it took. Like
+    :func:`simulate_trip`, ``state`` is advanced in place to the end of the
+    trip; a split rest still waiting for its other half is not carried over.
+    """
+    started = perf_counter()
+    search = _Search(route_data, started + (budget_seconds() if budget is None else budget))
+    clocks = _Clocks(state.clock, state.history, state.day, state.utc_offset, state.shift_driving,
+                     state.clock - state.window_start, state.driving_since_break)
+    complete = True
+    try:
+        search.search(clocks)
+    except _OutOfTime:
+        complete = False
+    clocks, events = search.best
+    state.clock = clocks.clock
+    state.window_start = clocks.clock - clocks.window_used
+    state.shift_driving = clocks.shift_driving
+    state.driving_since_break = clocks.since_break
+    state.history = list(clocks.history)
+    state.day = clocks.day
+    state.cycle_used = clocks.cycle_used
+    return events, {
+        "nodes": search.nodes,
+        "complete": complete,
+        "elapsed_ms": round((perf_counter() - started) * 1000, 1),
+    }
@@ -0,0 +1,34 @@
+MAX_DRIVING_HOURS = 11
+MAX_14_HOUR_WINDOW = 14
+MIN_OFF_DUTY_HOURS = 10
+MAX_CYCLE_HOURS = 70
+CYCLE_DAYS = 8
+RESTART_HOURS = 34
+REQUIRED_BREAK_MINUTES = 30
+BREAK_REQUIRED_AFTER_HOURS = 8
+PICKUP_DROPOFF_DURATION_HOURS = 1
+FUEL_STOP_DURATION_HOURS = 0.5
+# Sleeper-berth split: (sleeper berth hours, other off-duty hours) pairs that
+# together stand in for the 10-hour rest.
+SLEEPER_BERTH_SPLITS = ((8, 2), (7, 3))
+
+HOUR = 3600
+DAY = 24 * HOUR
+MAX_DRIVING_SECONDS = MAX_DRIVING_HOURS * HOUR
+MAX_WINDOW_SECONDS = MAX_14_HOUR_WINDOW * HOUR
+MIN_OFF_DUTY_SECONDS = MIN_OFF_DUTY_HOURS * HOUR
+MAX_CYCLE_SECONDS = MAX_CYCLE_HOURS * HOUR
+RESTART_SECONDS = RESTART_HOURS * HOUR
+REQUIRED_BREAK_SECONDS = REQUIRED_BREAK_MINUTES * 60
+BREAK_REQUIRED_AFTER_SECONDS = BREAK_REQUIRED_AFTER_HOURS * HOUR
+PICKUP_DROPOFF_SECONDS = PICKUP_DROPOFF_DURATION_HOURS * HOUR
+FUEL_STOP_SECONDS = int(FUEL_STOP_DURATION_HOURS * HOUR)
+SLEEPER_BERTH_SPLIT_SECONDS = tuple((sleeper * HOUR, off * HOUR) for sleeper, off in SLEEPER_BERTH_SPLITS)
+
+OFF_DUTY = 0
+SLEEPER_BERTH = 1
+DRIVING = 2
+ON_DUTY_NOT_DRIVING = 3
+
+DUTY_STATUS_NAMES = ("off_duty", "sleeper_berth", "driving", "on_duty_not_driving")
+DUTY_STATUS_CODES = {name: code for code, name in enumerate(DUTY_STATUS_NAMES)}
@@ -0,0 +1,256 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .metrics import EXTERNAL_ATTEMPTS, EXTERNAL_REQUESTS, EXTERNAL_SECONDS
+from .rate_limiter import TokenBucket
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+DEFAULT_CONFIG = {
+    "POOL_CONNECTIONS": 4,
+    "POOL_MAXSIZE": 16,
+    "CONNECT_TIMEOUT": 5.0,
+    "READ_TIMEOUT": 15.0,
+    "MAX_RETRIES": 2,
+    "BACKOFF_BASE": 0.5,
+    "BACKOFF_MAX": 8.0,
+    "ASYNC_MAX_CONNECTIONS": 100,
+}
+
+USER_AGENT = "ELD-Log-Generator/1.0"
+
+
+@dataclass
+class FetchResult:
+    """Outcome of one logical request, including every retry it took."""
+
+    url: str
+    ok: bool
+    status: Optional[int] = None
+    data: Any = None
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    cached: bool = False
+
+    def as_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "ok": self.ok,
+            "status": self.status,
+            "error": self.error,
+            "attempts": self.attempts,
+            "elapsed": round(self.elapsed, 3),
+            "cached": self.cached,
+        }
+
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# httpx.AsyncClient pools are tied to the event loop they first ran on.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _config() -> Dict:
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, "HTTP_CLIENT", {}))
+    return config
+
+
+def get_session(url: str) -> requests.Session:
+    """Return the keep-alive session for ``url``'s host, creating it once."""
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                config = _config()
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=config["POOL_CONNECTIONS"],
+                    pool_maxsize=config["POOL_MAXSIZE"],
+                    max_retries=0
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"User-Agent": USER_AGENT})
+                _sessions[host] = session
+    return session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the keep-alive async client for the running event loop, creating it once."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _sessions_lock:
+            client = _async_clients.get(loop)
+            if client is None:
+                config = _config()
+                client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=config["ASYNC_MAX_CONNECTIONS"],
+                        max_keepalive_connections=config["POOL_MAXSIZE"]
+                    ),
+                    headers={"User-Agent": USER_AGENT}
+                )
+                _async_clients[loop] = client
+    return client
+
+
+def _backoff_delay(attempt: int, config: Dict, retry_after: Optional[str]) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), config["BACKOFF_MAX"])
+        except ValueError:
+            pass
+    delay = config["BACKOFF_BASE"] * (2 ** attempt)
+    return min(delay * random.uniform(0.5, 1.5), config["BACKOFF_MAX"])
+
+
+def _record_metrics(result: FetchResult, service: Optional[str]) -> None:
+    service = service or urlsplit(result.url).netloc
+    if result.ok:
+        outcome = "ok"
+    elif result.error == "Timed out":
+        outcome = "timeout"
+    elif result.status is not None and result.status >= 400:
+        outcome = "http_error"
+    else:
+        outcome = "error"
+    EXTERNAL_REQUESTS.inc(service=service, outcome=outcome)
+    EXTERNAL_ATTEMPTS.inc(result.attempts, service=service)
+    EXTERNAL_SECONDS.observe(result.elapsed, service=service)
+
+
+def fetch_json(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+               timeout: Union[float, Tuple[float, float], None] = None,
+               max_retries: Optional[int] = None,
+               rate_limiter: Optional[TokenBucket] = None,
+               service: Optional[str] = None) -> FetchResult:
+    """GET ``url`` and decode JSON, retrying 429/5xx and transport errors.
+
+    Retries use jittered exponential backoff (``Retry-After`` wins when the
+    server sends one). Nothing is raised: the returned :class:`FetchResult`
+    says whether it worked and why not. ``service`` labels the call in the
+    metrics (default: the host).
+    """
+    config = _config()
+    if timeout is None:
+        timeout = (config["CONNECT_TIMEOUT"], config["READ_TIMEOUT"])
+    if max_retries is None:
+        max_retries = config["MAX_RETRIES"]
+
+    session = get_session(url)
+    result = FetchResult(url=url, ok=False)
+    started = time.monotonic()
+
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        result.attempts = attempt + 1
+        retry_after = None
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout)
+            result.status = response.status_code
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                result.error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+            elif response.status_code >= 400:
+                result.error = f"HTTP {response.status_code}"
+                try:
+                    result.data = response.json()
+                except ValueError:
+                    pass
+                break
+            else:
+                try:
+                    result.data = response.json()
+                    result.ok = True
+                    result.error = None
+                except ValueError:
+                    result.error = "Invalid JSON in response"
+                break
+        except requests.exceptions.Timeout:
+            result.error = "Timed out"
+        except requests.exceptions.RequestException as e:
+            result.error = f"{type(e).__name__}: {e}"
+
+        if attempt < max_retries:
+            time.sleep(_backoff_delay(attempt, config, retry_after))
+
+    result.elapsed = time.monotonic() - started
+    _record_metrics(result, service)
+    return result
+
+
+async def fetch_json_async(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                           timeout: Union[float, Tuple[float, float], None] = None,
+                           max_retries: Optional[int] = None,
+                           rate_limiter: Optional[TokenBucket] = None,
+                           service: Optional[str] = None) -> FetchResult:
+    """:func:`fetch_json` for the event loop: same retries and result, but waits without blocking."""
+    config = _config()
+    if timeout is None:
+        timeout = (config["CONNECT_TIMEOUT"], config["READ_TIMEOUT"])
+    if isinstance(timeout, tuple):
+        timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+    if max_retries is None:
+        max_retries = config["MAX_RETRIES"]
+
+    client = get_async_client()
+    result = FetchResult(url=url, ok=False)
+    started = time.monotonic()
+
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            await rate_limiter.acquire_async()
+        result.attempts = attempt + 1
+        retry_after = None
+        try:
+            response = await client.get(url, params=params, headers=headers, timeout=timeout)
+            result.status = response.status_code
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                result.error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+            elif response.status_code >= 400:
+                result.error = f"HTTP {response.status_code}"
+                try:
+                    result.data = response.json()
+                except ValueError:
+                    pass
+                break
+            else:
+                try:
+                    result.data = response.json()
+                    result.ok = True
+                    result.error = None
+                except ValueError:
+                    result.error = "Invalid JSON in response"
+                break
+        except httpx.TimeoutException:
+            result.error = "Timed out"
+        except httpx.HTTPError as e:
+            result.error = f"{type(e).__name__}: {e}"
+
+        if attempt < max_retries:
+            await asyncio.sleep(_backoff_delay(attempt, config, retry_after))
+
+    result.elapsed = time.monotonic() - started
+    _record_metrics(result, service)
+    return result
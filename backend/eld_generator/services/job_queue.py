@@ -0,0 +1,245 @@
+import json
+import os
+import threading
+import zlib
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ..models import TripJob
+from .plan_cache import canonical_trip, get_cached_plan, plan_cache_key, store_plan
+from .route_calculator import build_route_data, check_geocoded, fetch_route, geocode_many
+from .trip_planner import build_trip_response, generate_logs
+
+STAGES = ["geocode", "route", "logs", "response"]
+
+DEFAULT_CONFIG = {
+    "WORKERS": 2,
+    "POLL_SECONDS": 1.0,
+    "STALE_SECONDS": 300,
+    "HEARTBEAT_SECONDS": 30,
+    "MAX_ATTEMPTS": 3,
+    "RETENTION_SECONDS": 24 * 3600,
+}
+
+_workers: List[threading.Thread] = []
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def _config() -> Dict:
+    config = dict(DEFAULT_CONFIG)
+    config.update(getattr(settings, "TRIP_JOBS", {}))
+    return config
+
+
+def submit_job(data: Dict) -> TripJob:
+    """Queue a validated :class:`TripRequestSerializer` payload.
+
+    Only touches the database: a trip already in the plan cache is stored as
+    succeeded straight away, anything else waits for a worker.
+    """
+    trip = canonical_trip(data)
+    job = TripJob(request=trip, progress={stage: "pending" for stage in STAGES})
+    body = get_cached_plan(plan_cache_key(trip))
+    if body is not None:
+        job.status = TripJob.SUCCEEDED
+        job.progress = {stage: "done" for stage in STAGES}
+        job.result = zlib.compress(body, 6)
+        job.finished_at = timezone.now()
+    job.save()
+    if job.status == TripJob.QUEUED:
+        _wakeup.set()
+    return job
+
+
+def job_result(job: TripJob) -> Optional[Dict]:
+    if job.result is None:
+        return None
+    return json.loads(zlib.decompress(bytes(job.result)))
+
+
+class JobLost(Exception):
+    """The job was requeued or failed by :func:`recover_stale_jobs` while this worker ran it."""
+
+
+def _owned(job: TripJob):
+    """``job`` as long as this claim still holds it; a reclaim changes the worker or attempt count."""
+    return TripJob.objects.filter(id=job.id, status=TripJob.RUNNING, worker=job.worker, attempts=job.attempts)
+
+
+def _keep_alive(job: TripJob, stop: threading.Event) -> None:
+    """Refresh the job's heartbeat until ``stop`` is set, so a slow stage is not taken for a dead worker."""
+    try:
+        while not stop.wait(_config()["HEARTBEAT_SECONDS"]):
+            try:
+                _owned(job).update(heartbeat_at=timezone.now())
+            except Exception:
+                # A locked database; the next beat tries again.
+                pass
+    finally:
+        connection.close()
+
+
+def _set_stage(job: TripJob, stage: str) -> None:
+    progress = dict(job.progress)
+    if job.stage:
+        progress[job.stage] = "done"
+    progress[stage] = "running"
+    if not _owned(job).update(stage=stage, progress=progress, heartbeat_at=timezone.now()):
+        raise JobLost(str(job.id))
+    job.stage = stage
+    job.progress = progress
+
+
+def run_job(job: TripJob) -> None:
+    """Plan a claimed job, recording progress per stage and the outcome.
+
+    A heartbeat thread keeps the claim alive while a stage runs. Every write
+    is conditional on still holding the claim, so a worker whose job was
+    recovered from under it stops without touching the job again.
+    """
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_keep_alive, args=(job, stop), name=f"trip-job-heartbeat-{job.id}",
+                                 daemon=True)
+    heartbeat.start()
+    try:
+        _run_stages(job)
+    except JobLost:
+        pass
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def _run_stages(job: TripJob) -> None:
+    trip = job.request
+    locations = [trip["current_location"]] + [stop["location"] for stop in trip["stops"]]
+    try:
+        _set_stage(job, "geocode")
+        resolved = geocode_many(locations)
+        coordinates = [resolved[location] for location in locations]
+        check_geocoded(trip["current_location"], trip["stops"], coordinates)
+
+        _set_stage(job, "route")
+        route_data = build_route_data(
+            trip["current_location"], trip["stops"], coordinates, fetch_route(coordinates)
+        )
+
+        _set_stage(job, "logs")
+        log_entries, daily_logs, hos = generate_logs(
+            route_data, trip["current_location"], trip["stops"], trip["current_cycle_used"], trip["start_time"],
+            trip.get("hos_planner", "greedy"), trip.get("hos_state")
+        )
+
+        _set_stage(job, "response")
+        response = build_trip_response(
+            route_data, trip["stops"], log_entries, daily_logs, trip["polyline_format"], trip["map_zoom"],
+            hos=hos
+        )
+        body = JSONRenderer().render(response)
+        store_plan(plan_cache_key(trip), body, response)
+    except JobLost:
+        raise
+    except ValueError as e:
+        _finish(job, TripJob.FAILED, error=str(e), error_status=400)
+    except Exception as e:
+        _finish(job, TripJob.FAILED, error=f"An error occurred processing your request: {e}", error_status=500)
+    else:
+        _finish(job, TripJob.SUCCEEDED, result=zlib.compress(body, 6))
+
+
+def _finish(job: TripJob, status: str, result: Optional[bytes] = None, error: str = "",
+            error_status: Optional[int] = None) -> None:
+    progress = dict(job.progress)
+    if job.stage:
+        progress[job.stage] = "done" if status == TripJob.SUCCEEDED else "failed"
+    finished = _owned(job).update(
+        status=status, progress=progress, result=result, error=error, error_status=error_status,
+        finished_at=timezone.now()
+    )
+    if not finished:
+        raise JobLost(str(job.id))
+
+
+def claim_next_job(worker: str) -> Optional[TripJob]:
+    """Atomically take the oldest queued job; safe across threads and processes."""
+    while True:
+        job_id = (TripJob.objects.filter(status=TripJob.QUEUED)
+                  .order_by("created_at").values_list("id", flat=True).first())
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = TripJob.objects.filter(id=job_id, status=TripJob.QUEUED).update(
+            status=TripJob.RUNNING, worker=worker, started_at=now, heartbeat_at=now, stage="",
+            attempts=F("attempts") + 1
+        )
+        if claimed:
+            return TripJob.objects.get(id=job_id)
+        # Another worker got it first; try the next one.
+
+
+def recover_stale_jobs() -> int:
+    """Requeue running jobs whose worker stopped reporting (crash, restart).
+
+    A job that has already used ``MAX_ATTEMPTS`` fails instead.
+    """
+    config = _config()
+    cutoff = timezone.now() - timedelta(seconds=config["STALE_SECONDS"])
+    stale = TripJob.objects.filter(status=TripJob.RUNNING, heartbeat_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=config["MAX_ATTEMPTS"]).update(
+        status=TripJob.FAILED, error="Trip planning worker stopped responding", error_status=500,
+        finished_at=timezone.now()
+    )
+    requeued = stale.update(status=TripJob.QUEUED, worker="", stage="")
+    return failed + requeued
+
+
+def purge_expired_jobs() -> int:
+    cutoff = timezone.now() - timedelta(seconds=_config()["RETENTION_SECONDS"])
+    deleted, _ = TripJob.objects.filter(finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def work(worker: str, stop: Optional[threading.Event] = None) -> None:
+    """Worker loop: recover, purge, then run queued jobs until ``stop`` is set."""
+    poll_seconds = _config()["POLL_SECONDS"]
+    # Housekeeping runs a few times per stale period, not on every poll.
+    housekeeping_every = max(1, int(_config()["STALE_SECONDS"] / poll_seconds / 4))
+    polls = 0
+    while stop is None or not stop.is_set():
+        close_old_connections()
+        try:
+            if polls % housekeeping_every == 0:
+                recover_stale_jobs()
+                purge_expired_jobs()
+            polls += 1
+            job = claim_next_job(worker)
+            if job is not None:
+                run_job(job)
+                continue
+        except Exception:
+            # A locked or unavailable database; retry after the poll interval.
+            pass
+        _wakeup.wait(poll_seconds)
+        _wakeup.clear()
+
+
+def ensure_workers() -> None:
+    """Start the in-process worker threads once (``TRIP_JOBS['WORKERS']``, 0 for none)."""
+    if _workers:
+        return
+    with _workers_lock:
+        if _workers:
+            return
+        for index in range(_config()["WORKERS"]):
+            thread = threading.Thread(
+                target=work, args=(f"{os.getpid()}-{index}",), name=f"trip-job-{index}", daemon=True
+            )
+            thread.start()
+            _workers.append(thread)
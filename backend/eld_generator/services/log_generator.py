@@ -1,152 +1,201 @@
-from datetime import datetime, timedelta
-from typing import List, Dict
-from dateutil import tz
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+import numpy as np
+
 from .eld_calculator import parse_datetime, format_datetime
+from .hos_rules import DRIVING, DUTY_STATUS_CODES, DUTY_STATUS_NAMES, ON_DUTY_NOT_DRIVING
 
 MAX_CYCLE_HOURS = 70
 CYCLE_DAYS = 8
 
 
-def group_entries_by_day(log_entries: List[Dict]) -> Dict[str, List[Dict]]:
-    entries_by_day = {}
-    
-    for entry in log_entries:
-        start_time = parse_datetime(entry["start_time"])
-        day_key = start_time.date().isoformat()
-        
-        if day_key not in entries_by_day:
-            entries_by_day[day_key] = []
-        
-        entries_by_day[day_key].append(entry)
-        
-        end_time = parse_datetime(entry["end_time"])
-        end_day_key = end_time.date().isoformat()
-        
-        if end_day_key != day_key:
-            split_entry = entry.copy()
-            split_entry["start_time"] = format_datetime(end_time.replace(hour=0, minute=0, second=0, microsecond=0))
-            split_entry["miles"] = 0
-            
-            if end_day_key not in entries_by_day:
-                entries_by_day[end_day_key] = []
-            entries_by_day[end_day_key].append(split_entry)
-    
-    return entries_by_day
-
-
-def calculate_daily_totals(entries_for_day: List[Dict]) -> Dict[str, float]:
-    totals = {
-        "off_duty": 0,
-        "sleeper_berth": 0,
-        "driving": 0,
-        "on_duty_not_driving": 0,
-        "total_miles": 0
-    }
-    
-    for entry in entries_for_day:
-        status = entry.get("duty_status", "")
-        
-        start_time = parse_datetime(entry["start_time"])
-        end_time = parse_datetime(entry["end_time"])
-        duration = (end_time - start_time).total_seconds() / 3600
-        
-        if status == "off_duty":
-            totals["off_duty"] += duration
-        elif status == "sleeper_berth":
-            totals["sleeper_berth"] += duration
-        elif status == "driving":
-            totals["driving"] += duration
-            totals["total_miles"] += entry.get("miles", 0)
-        elif status == "on_duty_not_driving":
-            totals["on_duty_not_driving"] += duration
-    
-    totals["total_on_duty"] = totals["driving"] + totals["on_duty_not_driving"]
-    totals["total_hours"] = totals["off_duty"] + totals["sleeper_berth"] + totals["driving"] + totals["on_duty_not_driving"]
-    
-    return totals
-
-
-def calculate_recap(all_entries: List[Dict], current_date_str: str) -> Dict:
-    current_date = datetime.fromisoformat(current_date_str).date()
-    cutoff_date_7 = current_date - timedelta(days=7)
-    cutoff_date_5 = current_date - timedelta(days=4)
-    
-    total_last_7_days = 0
-    total_last_5_days = 0
-    
-    for entry in all_entries:
-        entry_date = parse_datetime(entry["start_time"]).date()
-        
-        if entry_date >= cutoff_date_7:
-            start_time = parse_datetime(entry["start_time"])
-            end_time = parse_datetime(entry["end_time"])
-            duration = (end_time - start_time).total_seconds() / 3600
-            
-            status = entry.get("duty_status", "")
-            if status in ["driving", "on_duty_not_driving"]:
-                total_last_7_days += duration
-        
-        if entry_date >= cutoff_date_5:
+class LogColumns:
+    """Log entries split into per-day rows, stored column-wise.
+
+    Every entry is parsed once. It keeps one row on the day it starts (with
+    its full duration) and gets a continuation row starting at each midnight
+    it crosses, ending at the next midnight or at the entry's own end; a
+    continuation carries no miles. Rows are kept in the order the per-day
+    lists have always been built in, which the daily totals sum in.
+    """
+
+    __slots__ = ("rows", "day", "status", "hours", "miles", "start", "continuation", "on_duty_day",
+                 "on_duty_hours", "on_duty_total")
+
+    def __init__(self, log_entries: List[Dict]):
+        # Per row: the entry dict (original or continuation copy).
+        self.rows: List[Dict] = []
+        day = []
+        status = []
+        hours = []
+        miles = []
+        start = []
+        continuation = []
+        on_duty_day = []
+        on_duty_hours = []
+
+        for entry in log_entries:
             start_time = parse_datetime(entry["start_time"])
             end_time = parse_datetime(entry["end_time"])
-            duration = (end_time - start_time).total_seconds() / 3600
-            
-            status = entry.get("duty_status", "")
-            if status in ["driving", "on_duty_not_driving"]:
-                total_last_5_days += duration
-    
-    return {
-        "total_on_duty_last_7_days": round(total_last_7_days, 2),
-        "total_on_duty_last_5_days": round(total_last_5_days, 2),
-        "hours_available_tomorrow_70hr": max(0, MAX_CYCLE_HOURS - total_last_7_days),
-        "hours_available_tomorrow_60hr": max(0, 60 - total_last_7_days)
-    }
-
-
-def generate_daily_logs(log_entries: List[Dict], current_location: str, pickup_location: str, 
-                        dropoff_location: str) -> List[Dict]:
+            start_day = start_time.date().toordinal()
+            end_day = end_time.date().toordinal()
+            code = DUTY_STATUS_CODES.get(entry.get("duty_status", ""), -1)
+            seconds = (end_time - start_time).total_seconds()
+
+            self.rows.append(entry)
+            day.append(start_day)
+            status.append(code)
+            hours.append(seconds / 3600)
+            miles.append(entry.get("miles", 0) if code == DRIVING else 0)
+            start.append(start_time.timestamp())
+            continuation.append(False)
+            if code in (DRIVING, ON_DUTY_NOT_DRIVING):
+                on_duty_day.append(start_day)
+                on_duty_hours.append(seconds / 3600)
+
+            end_midnight = end_time.replace(hour=0, minute=0, second=0, microsecond=0)
+            for offset in range(end_day - start_day - 1, -1, -1):
+                row_start = end_midnight - timedelta(days=offset)
+                row_end = end_time if offset == 0 else row_start + timedelta(days=1)
+                split_entry = entry.copy()
+                split_entry["start_time"] = format_datetime(row_start)
+                if offset:
+                    split_entry["end_time"] = format_datetime(row_end)
+                split_entry["miles"] = 0
+                self.rows.append(split_entry)
+                day.append(end_day - offset)
+                status.append(code)
+                hours.append((row_end - row_start).total_seconds() / 3600)
+                miles.append(0)
+                start.append(row_start.timestamp())
+                continuation.append(True)
+
+        self.day = np.array(day, dtype=np.int64)
+        self.status = np.array(status, dtype=np.int64)
+        self.hours = np.array(hours, dtype=np.float64)
+        self.miles = np.array(miles, dtype=np.float64)
+        self.start = np.array(start, dtype=np.float64)
+        self.continuation = np.array(continuation, dtype=bool)
+        self.on_duty_day = np.array(on_duty_day, dtype=np.int64)
+        self.on_duty_hours = np.array(on_duty_hours, dtype=np.float64)
+        # on_duty_total[i]: on-duty hours of the entries before on-duty entry i.
+        self.on_duty_total = np.concatenate(([0.0], np.cumsum(self.on_duty_hours)))
+
+    def on_duty_since(self, days):
+        """On-duty hours of every entry starting on or after each of ``days`` (no upper bound).
+
+        Entries come in time order, so each cutoff's first entry is found by
+        binary search and its total is a suffix of one prefix sum. A cutoff
+        with no entries gives integer 0. Takes a day ordinal or an array of
+        them and returns the same shape (an array as a list).
+        """
+        positions = np.searchsorted(self.on_duty_day, days, side="left")
+        totals = self.on_duty_total[-1] - self.on_duty_total[positions]
+        if np.ndim(positions) == 0:
+            return float(totals) if positions < len(self.on_duty_day) else 0
+        return [float(total) if position < len(self.on_duty_day) else 0
+                for total, position in zip(totals.tolist(), positions.tolist())]
+
+    def days(self) -> Iterator[Dict]:
+        """Per day, oldest first: its rows in time order plus totals and recap."""
+        if not self.rows:
+            return
+
+        days, day_index = np.unique(self.day, return_inverse=True)
+        n_days = len(days)
+        n_statuses = len(DUTY_STATUS_NAMES)
+
+        # bincount adds weights in row order, so each day's sums come out
+        # exactly as a running total over that day's entries would.
+        valid = self.status >= 0
+        totals = np.bincount(
+            day_index[valid] * n_statuses + self.status[valid],
+            weights=self.hours[valid],
+            minlength=n_days * n_statuses
+        ).reshape(n_days, n_statuses)
+        counts = np.bincount(
+            day_index[valid] * n_statuses + self.status[valid], minlength=n_days * n_statuses
+        ).reshape(n_days, n_statuses)
+        day_miles = np.bincount(day_index, weights=self.miles, minlength=n_days)
+        # Continuation rows add nothing to the mileage.
+        mileage_rows = np.bincount(
+            day_index[(self.status == DRIVING) & ~self.continuation], minlength=n_days
+        )
+
+        # The recap for day D covers every entry starting on or after D-7
+        # (D-4 for the 5-day figure).
+        on_duty_7_days = self.on_duty_since(days - 7)
+        on_duty_5_days = self.on_duty_since(days - 4)
+
+        # Rows grouped by day, in start-time order within the day (stable).
+        row_order = np.lexsort((self.start, day_index))
+        bounds = np.searchsorted(day_index[row_order], np.arange(n_days + 1), side="left")
+        first_rows = np.unique(day_index, return_index=True)[1]
+        last_rows = len(day_index) - 1 - np.unique(day_index[::-1], return_index=True)[1]
+
+        for index in range(n_days):
+            yield {
+                "ordinal": int(days[index]),
+                "first": self.rows[first_rows[index]],
+                "last": self.rows[last_rows[index]],
+                "entries": [self.rows[row] for row in row_order[bounds[index]:bounds[index + 1]].tolist()],
+                # Sums over no rows stay integer 0, as the API has always returned them.
+                "hours": [float(total) if count else 0 for total, count in zip(totals[index], counts[index])],
+                "miles": float(day_miles[index]) if mileage_rows[index] else 0,
+                "on_duty_7_days": on_duty_7_days[index],
+                "on_duty_5_days": on_duty_5_days[index],
+            }
+
+
+def iter_daily_logs(log_entries: List[Dict], current_location: str, pickup_location: str,
+                    dropoff_location: str) -> Iterator[Dict]:
+    """Yield the daily log sheets one day at a time, oldest first."""
     if not log_entries:
-        return []
-    
-    entries_by_day = group_entries_by_day(log_entries)
-    daily_logs = []
-    
-    sorted_days = sorted(entries_by_day.keys())
-    
-    for day_key in sorted_days:
-        day_entries = entries_by_day[day_key]
-        day_date = datetime.fromisoformat(day_key).date()
-        
-        first_entry = day_entries[0]
-        last_entry = day_entries[-1]
-        
-        from_location = first_entry.get("location", current_location)
-        to_location = last_entry.get("location", dropoff_location)
-        
-        totals = calculate_daily_totals(day_entries)
-        recap = calculate_recap(log_entries, day_key)
-        
-        sorted_entries = sorted(day_entries, key=lambda x: parse_datetime(x["start_time"]))
-        
-        daily_log = {
+        return
+
+    columns = LogColumns(log_entries)
+    off_duty_code = DUTY_STATUS_CODES["off_duty"]
+    sleeper_code = DUTY_STATUS_CODES["sleeper_berth"]
+    driving_code = DUTY_STATUS_CODES["driving"]
+    on_duty_code = DUTY_STATUS_CODES["on_duty_not_driving"]
+
+    for day in columns.days():
+        day_key = date.fromordinal(day["ordinal"]).isoformat()
+        hours = day["hours"]
+        off_duty = hours[off_duty_code]
+        sleeper_berth = hours[sleeper_code]
+        driving = hours[driving_code]
+        on_duty_not_driving = hours[on_duty_code]
+        total_on_duty = driving + on_duty_not_driving
+        total_hours = off_duty + sleeper_berth + driving + on_duty_not_driving
+        total_last_7_days = day["on_duty_7_days"]
+        total_last_5_days = day["on_duty_5_days"]
+
+        yield {
             "date": day_key,
-            "from": from_location,
-            "to": to_location,
-            "total_miles_driving": round(totals["total_miles"], 1),
-            "total_mileage": round(totals["total_miles"], 1),
-            "entries": sorted_entries,
+            "from": day["first"].get("location", current_location),
+            "to": day["last"].get("location", dropoff_location),
+            "total_miles_driving": round(day["miles"], 1),
+            "total_mileage": round(day["miles"], 1),
+            "entries": day["entries"],
             "totals": {
-                "off_duty": round(totals["off_duty"], 2),
-                "sleeper_berth": round(totals["sleeper_berth"], 2),
-                "driving": round(totals["driving"], 2),
-                "on_duty_not_driving": round(totals["on_duty_not_driving"], 2),
-                "total_on_duty": round(totals["total_on_duty"], 2),
-                "total_hours": round(totals["total_hours"], 2)
+                "off_duty": round(off_duty, 2),
+                "sleeper_berth": round(sleeper_berth, 2),
+                "driving": round(driving, 2),
+                "on_duty_not_driving": round(on_duty_not_driving, 2),
+                "total_on_duty": round(total_on_duty, 2),
+                "total_hours": round(total_hours, 2)
             },
-            "recap": recap
+            "recap": {
+                "total_on_duty_last_7_days": round(total_last_7_days, 2),
+                "total_on_duty_last_5_days": round(total_last_5_days, 2),
+                "hours_available_tomorrow_70hr": max(0, MAX_CYCLE_HOURS - total_last_7_days),
+                "hours_available_tomorrow_60hr": max(0, 60 - total_last_7_days)
+            }
         }
-        
-        daily_logs.append(daily_log)
-    
-    return daily_logs
 
+
+def generate_daily_logs(log_entries: List[Dict], current_location: str, pickup_location: str,
+                        dropoff_location: str) -> List[Dict]:
+    return list(iter_daily_logs(log_entries, current_location, pickup_location, dropoff_location))
@@ -0,0 +1,405 @@
+import zlib
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from .eld_calculator import parse_datetime
+from .hos_rules import DUTY_STATUS_CODES
+
+LOG_SHEET_FORMATS = ["pdf", "svg"]
+
+# A4 in PDF points. Layout coordinates below are measured from the top-left
+# corner, as in SVG; the PDF canvas flips them.
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN = 30
+CONTENT_RIGHT = PAGE_WIDTH - MARGIN
+
+GRID_LEFT = 150
+GRID_RIGHT = 530
+GRID_HEADER_TOP = 152
+GRID_TOP = 170
+ROW_HEIGHT = 24
+GRID_BOTTOM = GRID_TOP + 4 * ROW_HEIGHT
+HOUR_WIDTH = (GRID_RIGHT - GRID_LEFT) / 24
+
+ROW_LABELS = ["1. Off Duty", "2. Sleeper Berth", "3. Driving", "4. On Duty (not driving)"]
+TOTAL_LABELS = [
+    ("Off Duty:", "off_duty"),
+    ("Sleeper Berth:", "sleeper_berth"),
+    ("Driving:", "driving"),
+    ("On Duty (not driving):", "on_duty_not_driving"),
+]
+RECAP_LABELS = [
+    ("On duty hours today (Total lines 3 & 4):", "totals", "total_on_duty"),
+    ("A. Total hours on duty last 7 days including today:", "recap", "total_on_duty_last_7_days"),
+    ("B. Total hours available tomorrow (70 hr. minus A*):", "recap", "hours_available_tomorrow_70hr"),
+    ("C. Total hours on duty last 5 days including today:", "recap", "total_on_duty_last_5_days"),
+]
+VALUE_X = 470
+REMARKS_TOP = 396
+REMARKS_BOTTOM = 640
+REMARK_LINE_HEIGHT = 12
+MAX_REMARK_CHARS = 95
+
+DUTY_LINE_COLOR = (0.1, 0.2, 0.55)
+HEADER_FILL = 0.94
+
+
+def _num(value: float) -> str:
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return text if text != "-0" else "0"
+
+
+class PDFCanvas:
+    """Collects PDF content-stream operators (Helvetica as /F1, bold as /F2)."""
+
+    def __init__(self):
+        self.ops: List[str] = []
+
+    def text(self, x: float, y: float, text: str, size: float = 10, bold: bool = False) -> None:
+        escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        self.ops.append(
+            f"BT /{'F2' if bold else 'F1'} {_num(size)} Tf {_num(x)} {_num(PAGE_HEIGHT - y)} Td ({escaped}) Tj ET"
+        )
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float = 0.5) -> None:
+        self.ops.append(
+            f"{_num(width)} w {_num(x1)} {_num(PAGE_HEIGHT - y1)} m {_num(x2)} {_num(PAGE_HEIGHT - y2)} l S"
+        )
+
+    def rect(self, x: float, y: float, width: float, height: float, fill: Optional[float] = None) -> None:
+        box = f"{_num(x)} {_num(PAGE_HEIGHT - y - height)} {_num(width)} {_num(height)} re"
+        if fill is None:
+            self.ops.append(f"1 w {box} S")
+        else:
+            self.ops.append(f"{_num(fill)} g {box} f 0 g")
+
+    def polyline(self, points: Sequence[Tuple[float, float]], width: float,
+                 color: Tuple[float, float, float]) -> None:
+        path = " ".join(
+            f"{_num(x)} {_num(PAGE_HEIGHT - y)} {'m' if i == 0 else 'l'}" for i, (x, y) in enumerate(points)
+        )
+        self.ops.append(f"q {' '.join(_num(c) for c in color)} RG {_num(width)} w 1 J 1 j {path} S Q")
+
+    def stream(self) -> bytes:
+        return "\n".join(self.ops).encode("latin-1", "replace")
+
+
+class SVGCanvas:
+    def __init__(self):
+        self.elements: List[str] = []
+
+    def text(self, x: float, y: float, text: str, size: float = 10, bold: bool = False) -> None:
+        weight = ' font-weight="bold"' if bold else ""
+        self.elements.append(
+            f'<text x="{_num(x)}" y="{_num(y)}" font-size="{_num(size)}"{weight}>{escape(text)}</text>'
+        )
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float = 0.5) -> None:
+        self.elements.append(
+            f'<line x1="{_num(x1)}" y1="{_num(y1)}" x2="{_num(x2)}" y2="{_num(y2)}" stroke="black" stroke-width="{_num(width)}"/>'
+        )
+
+    def rect(self, x: float, y: float, width: float, height: float, fill: Optional[float] = None) -> None:
+        if fill is None:
+            style = 'fill="none" stroke="black" stroke-width="1"'
+        else:
+            shade = round(fill * 255)
+            style = f'fill="rgb({shade},{shade},{shade})"'
+        self.elements.append(
+            f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(width)}" height="{_num(height)}" {style}/>'
+        )
+
+    def polyline(self, points: Sequence[Tuple[float, float]], width: float,
+                 color: Tuple[float, float, float]) -> None:
+        rgb = ",".join(str(round(c * 255)) for c in color)
+        coords = " ".join(f"{_num(x)},{_num(y)}" for x, y in points)
+        self.elements.append(
+            f'<polyline points="{coords}" fill="none" stroke="rgb({rgb})" stroke-width="{_num(width)}" '
+            f'stroke-linecap="round" stroke-linejoin="round"/>'
+        )
+
+    def markup(self) -> str:
+        return "\n".join(self.elements)
+
+
+def _hour_label(hour: int) -> str:
+    if hour == 0:
+        return "Mid"
+    if hour == 12:
+        return "Noon"
+    return str(hour - 12 if hour > 12 else hour)
+
+
+def _row_center(code: int) -> float:
+    return GRID_TOP + code * ROW_HEIGHT + ROW_HEIGHT / 2
+
+
+def draw_template(canvas) -> None:
+    """Everything on a log sheet that does not depend on the day."""
+    canvas.text(MARGIN, 45, "Drivers Daily Log (24 hours)", 14, bold=True)
+    canvas.text(420, 45, "Date:")
+
+    canvas.rect(MARGIN, 60, CONTENT_RIGHT - MARGIN, 72)
+    for i, label in enumerate(["From:", "To:", "Total Miles Driving Today:", "Total Mileage Today:"]):
+        canvas.text(40, 78 + i * 16, label, bold=True)
+
+    # Duty status grid.
+    canvas.rect(MARGIN, GRID_HEADER_TOP, CONTENT_RIGHT - MARGIN, GRID_TOP - GRID_HEADER_TOP, fill=HEADER_FILL)
+    canvas.rect(MARGIN, GRID_HEADER_TOP, CONTENT_RIGHT - MARGIN, GRID_BOTTOM - GRID_HEADER_TOP)
+    canvas.text(35, GRID_TOP - 5, "Duty Status", 9)
+    for hour in range(24):
+        label = _hour_label(hour)
+        canvas.text(GRID_LEFT + hour * HOUR_WIDTH + HOUR_WIDTH / 2 - len(label) * 2.2, GRID_TOP - 5, label, 7)
+    canvas.text(GRID_RIGHT + 6, GRID_TOP - 5, "Total", 8)
+    canvas.line(MARGIN, GRID_TOP, CONTENT_RIGHT, GRID_TOP, 1)
+    for row, label in enumerate(ROW_LABELS):
+        top = GRID_TOP + row * ROW_HEIGHT
+        canvas.text(35, top + ROW_HEIGHT / 2 + 3, label, 9)
+        if row:
+            canvas.line(MARGIN, top, CONTENT_RIGHT, top, 1)
+        for quarter in range(1, 96):
+            if quarter % 4:
+                x = GRID_LEFT + quarter * HOUR_WIDTH / 4
+                canvas.line(x, top, x, top + (7 if quarter % 4 == 2 else 4), 0.3)
+    for hour in range(25):
+        x = GRID_LEFT + hour * HOUR_WIDTH
+        canvas.line(x, GRID_HEADER_TOP if hour in (0, 24) else GRID_TOP, x, GRID_BOTTOM, 0.5)
+
+    canvas.rect(MARGIN, 282, CONTENT_RIGHT - MARGIN, 100)
+    canvas.text(40, 298, "Total Hours", 12, bold=True)
+    for i, (label, _) in enumerate(TOTAL_LABELS):
+        canvas.text(40, 316 + i * 14, label)
+    canvas.line(40, 362, CONTENT_RIGHT - 10, 362)
+    canvas.text(40, 375, "Total On Duty (Lines 3 & 4):", bold=True)
+
+    canvas.rect(MARGIN, REMARKS_TOP, CONTENT_RIGHT - MARGIN, REMARKS_BOTTOM - REMARKS_TOP)
+    canvas.text(40, REMARKS_TOP + 16, "Remarks", 12, bold=True)
+
+    canvas.rect(MARGIN, 654, CONTENT_RIGHT - MARGIN, 106)
+    canvas.text(40, 670, "Recap: Complete at end of day", 12, bold=True)
+    canvas.text(40, 686, "70 Hour/8 Day Drivers", 10, bold=True)
+    for i, (label, _, _) in enumerate(RECAP_LABELS):
+        canvas.text(40, 704 + i * 14, label, 9)
+
+
+def duty_periods(daily_log: Dict) -> List[Tuple[float, float, int]]:
+    """``(start_minute, end_minute, status_code)`` for each entry, clipped to the log's day."""
+    periods = []
+    day = daily_log["date"]
+    for entry in daily_log.get("entries", []):
+        code = DUTY_STATUS_CODES.get(entry.get("duty_status"))
+        if code is None:
+            continue
+        start = parse_datetime(entry["start_time"])
+        end = parse_datetime(entry["end_time"])
+        if start.date().isoformat() > day or end.date().isoformat() < day:
+            continue
+        start_minute = start.hour * 60 + start.minute + start.second / 60 if start.date().isoformat() == day else 0
+        end_minute = end.hour * 60 + end.minute + end.second / 60 if end.date().isoformat() == day else 1440
+        if end_minute > start_minute:
+            periods.append((start_minute, end_minute, code))
+    periods.sort()
+    return periods
+
+
+def duty_line_paths(periods: List[Tuple[float, float, int]]) -> List[List[Tuple[float, float]]]:
+    """The graph-grid line: horizontal runs per period joined by vertical steps, split at gaps."""
+    paths: List[List[Tuple[float, float]]] = []
+    previous_end = None
+    for start, end, code in periods:
+        y = _row_center(code)
+        x_start = GRID_LEFT + start * HOUR_WIDTH / 60
+        x_end = GRID_LEFT + end * HOUR_WIDTH / 60
+        if previous_end is None or abs(start - previous_end) > 0.5:
+            paths.append([(x_start, y)])
+        else:
+            paths[-1].append((x_start, y))
+        paths[-1].append((x_end, y))
+        previous_end = end
+    return paths
+
+
+def _format_date(day: str) -> str:
+    date = parse_datetime(day).date()
+    return f"{date.strftime('%B')} {date.day}, {date.year}"
+
+
+def _format_time(value: str) -> str:
+    moment = parse_datetime(value)
+    return f"{(moment.hour % 12) or 12}:{moment.minute:02d} {'AM' if moment.hour < 12 else 'PM'}"
+
+
+def draw_day(canvas, daily_log: Dict) -> None:
+    """The per-day layer: header values, duty line, totals, remarks and recap."""
+    totals = daily_log.get("totals", {})
+    canvas.text(450, 45, _format_date(daily_log["date"]))
+    values = [
+        daily_log.get("from") or "N/A",
+        daily_log.get("to") or "N/A",
+        f"{daily_log.get('total_miles_driving') or 0:.1f}",
+        f"{daily_log.get('total_mileage') or 0:.1f}",
+    ]
+    for i, value in enumerate(values):
+        canvas.text(200, 78 + i * 16, value[:70])
+
+    for path in duty_line_paths(duty_periods(daily_log)):
+        canvas.polyline(path, 1.8, DUTY_LINE_COLOR)
+    for row, (_, key) in enumerate(TOTAL_LABELS):
+        canvas.text(GRID_RIGHT + 5, _row_center(row) + 3, f"{totals.get(key) or 0:.2f}", 8)
+
+    for i, (_, key) in enumerate(TOTAL_LABELS):
+        canvas.text(VALUE_X, 316 + i * 14, f"{totals.get(key) or 0:.2f}")
+    canvas.text(VALUE_X, 375, f"{totals.get('total_on_duty') or 0:.2f}", bold=True)
+
+    remarks = [
+        f"{_format_time(entry['start_time'])}: {entry['reason']} ({entry.get('location', '')})"
+        for entry in daily_log.get("entries", []) if entry.get("reason")
+    ] or ["No remarks"]
+    max_lines = int((REMARKS_BOTTOM - REMARKS_TOP - 30) // REMARK_LINE_HEIGHT)
+    if len(remarks) > max_lines:
+        remarks = remarks[:max_lines - 1] + [f"... {len(remarks) - max_lines + 1} more"]
+    for i, remark in enumerate(remarks):
+        if len(remark) > MAX_REMARK_CHARS:
+            remark = remark[:MAX_REMARK_CHARS - 3] + "..."
+        canvas.text(40, REMARKS_TOP + 32 + i * REMARK_LINE_HEIGHT, remark, 9)
+
+    for i, (_, section, key) in enumerate(RECAP_LABELS):
+        canvas.text(VALUE_X, 704 + i * 14, f"{(daily_log.get(section) or {}).get(key) or 0:.2f}", 9)
+
+
+@lru_cache(maxsize=None)
+def pdf_template_stream() -> bytes:
+    """The static grid as a compressed PDF form XObject stream, built once per process."""
+    canvas = PDFCanvas()
+    draw_template(canvas)
+    return zlib.compress(canvas.stream(), 6)
+
+
+@lru_cache(maxsize=None)
+def svg_template_symbol() -> str:
+    canvas = SVGCanvas()
+    draw_template(canvas)
+    return f'<symbol id="log-sheet-template">\n{canvas.markup()}\n</symbol>'
+
+
+def render_pdf_page(daily_log: Dict) -> bytes:
+    """Compressed content stream for one day: the cached template plus the day layer."""
+    canvas = PDFCanvas()
+    canvas.ops.append("/Tpl Do")
+    draw_day(canvas, daily_log)
+    return zlib.compress(canvas.stream(), 6)
+
+
+def render_svg(daily_log: Dict) -> str:
+    canvas = SVGCanvas()
+    draw_day(canvas, daily_log)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{_num(PAGE_WIDTH)}pt" height="{_num(PAGE_HEIGHT)}pt" '
+        f'viewBox="0 0 {_num(PAGE_WIDTH)} {_num(PAGE_HEIGHT)}" '
+        f'font-family="Helvetica, Arial, sans-serif">\n'
+        f'<rect width="100%" height="100%" fill="white"/>\n'
+        f'<defs>\n{svg_template_symbol()}\n</defs>\n'
+        f'<use href="#log-sheet-template" xlink:href="#log-sheet-template"/>\n'
+        f'{canvas.markup()}\n'
+        f'</svg>\n'
+    )
+
+
+def _pdf_stream_object(dictionary: str, data: bytes) -> bytes:
+    return (f"<< {dictionary} /Filter /FlateDecode /Length {len(data)} >>\nstream\n".encode()
+            + data + b"\nendstream")
+
+
+def build_pdf(page_streams: Iterable[bytes]) -> bytes:
+    """Assemble a PDF from per-page content streams that draw the shared template as /Tpl."""
+    fonts = "/Font << /F1 3 0 R /F2 4 0 R >>"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        _pdf_stream_object(
+            f"/Type /XObject /Subtype /Form /BBox [0 0 {_num(PAGE_WIDTH)} {_num(PAGE_HEIGHT)}] "
+            f"/Resources << {fonts} >>",
+            pdf_template_stream()
+        ),
+    ]
+    page_ids = []
+    for stream in page_streams:
+        objects.append(_pdf_stream_object("", stream))
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_num(PAGE_WIDTH)} {_num(PAGE_HEIGHT)}] "
+            f"/Resources << {fonts} /XObject << /Tpl 5 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+               f"startxref\n{xref_offset}\n%%EOF\n").encode()
+    return bytes(output)
+
+
+def render_pdf(daily_logs: List[Dict], mapper: Callable = map) -> bytes:
+    """One PDF page per daily log. ``mapper`` runs the per-page work, e.g. a pool's ``map``."""
+    return build_pdf(mapper(render_pdf_page, daily_logs))
+
+
+def render_svgs(daily_logs: List[Dict], mapper: Callable = map) -> List[str]:
+    return list(mapper(render_svg, daily_logs))
+
+
+def daily_logs_by_trip(payload) -> List[List[Dict]]:
+    """Daily logs grouped per trip from any of the shapes the API produces.
+
+    Accepts a list of daily logs, a ``calculate-route`` response (or anything
+    with ``daily_logs``), a batch response (``results``) or ``{"trips": [...]}``
+    of those. Raises ``ValueError`` when no daily log can be found.
+    """
+    if isinstance(payload, list):
+        if all(isinstance(item, dict) and "date" in item for item in payload):
+            return [payload] if payload else []
+        trips = payload
+    elif isinstance(payload, dict) and "daily_logs" in payload:
+        trips = [payload]
+    elif isinstance(payload, dict) and ("trips" in payload or "results" in payload):
+        trips = payload.get("trips") or payload.get("results") or []
+    else:
+        raise ValueError("Expected 'daily_logs', 'trips' or 'results'")
+
+    grouped = []
+    for trip in trips:
+        if isinstance(trip, dict) and isinstance(trip.get("result"), dict):
+            trip = trip["result"]
+        daily_logs = trip.get("daily_logs") if isinstance(trip, dict) else None
+        if not isinstance(daily_logs, list):
+            continue
+        for daily_log in daily_logs:
+            if not isinstance(daily_log, dict) or not isinstance(daily_log.get("date"), str):
+                raise ValueError("Every daily log needs a 'date'")
+        if daily_logs:
+            grouped.append(daily_logs)
+    if not grouped:
+        raise ValueError("No daily logs to render")
+    return grouped
+
+
+def svg_file_names(trips: List[List[Dict]]) -> List[str]:
+    prefix = len(trips) > 1
+    return [
+        f"{f'trip-{trip_index + 1}-' if prefix else ''}eld-log-{daily_log['date']}.svg"
+        for trip_index, daily_logs in enumerate(trips) for daily_log in daily_logs
+    ]
@@ -0,0 +1,232 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; request stages range from sub-millisecond cache hits to slow upstreams.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination, as Prometheus expects."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label key: [count per bucket (non-cumulative, last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(float(bound))
+                labels = _label_text(self.labelnames, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "eld_stage_duration_seconds", "Time spent per request stage.", ["stage"]
+)
+REQUEST_SECONDS = Histogram(
+    "eld_request_duration_seconds", "Time spent per instrumented view.", ["view"]
+)
+RESPONSES = Counter(
+    "eld_responses_total", "Responses per instrumented view and status code.", ["view", "status"]
+)
+EXTERNAL_SECONDS = Histogram(
+    "eld_external_request_duration_seconds", "External HTTP calls including retries.", ["service"]
+)
+EXTERNAL_REQUESTS = Counter(
+    "eld_external_requests_total", "External HTTP calls by outcome (ok, http_error, timeout, error).",
+    ["service", "outcome"]
+)
+EXTERNAL_ATTEMPTS = Counter(
+    "eld_external_attempts_total", "External HTTP attempts, retries included.", ["service"]
+)
+PLAN_CACHE_LOOKUPS = Counter(
+    "eld_plan_cache_lookups_total", "Plan cache lookups by result (hit, miss, bypass).", ["result"]
+)
+STAGE_ERRORS = Counter(
+    "eld_stage_errors_total", "Exceptions raised out of a request stage.", ["stage", "error"]
+)
+
+_METRICS = [STAGE_SECONDS, REQUEST_SECONDS, RESPONSES, EXTERNAL_SECONDS, EXTERNAL_REQUESTS,
+            EXTERNAL_ATTEMPTS, PLAN_CACHE_LOOKUPS, STAGE_ERRORS]
+
+# (stage, seconds) recorded during the current request, for Server-Timing.
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "eld_request_timings", default=None
+)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a block as ``stage``: into the histogram and the current request's Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=stage, error=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """``Server-Timing`` value: stages in first-seen order (repeats summed), then ``total``."""
+    durations: Dict[str, float] = {}
+    for stage, seconds in timings:
+        durations[stage] = durations.get(stage, 0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in durations.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _finish_request(view_name: str, response, timings: List[Tuple[str, float]], started: float):
+    total = time.perf_counter() - started
+    REQUEST_SECONDS.observe(total, view=view_name)
+    RESPONSES.inc(view=view_name, status=response.status_code)
+    # Streaming responses only report the stages done before the first byte.
+    response["Server-Timing"] = server_timing_header(timings, total)
+    return response
+
+
+def instrumented(view_name: str) -> Callable:
+    """View decorator: per-request stage timings in ``Server-Timing`` plus request metrics.
+
+    Works on sync and async views.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                timings: List[Tuple[str, float]] = []
+                token = _request_timings.set(timings)
+                started = time.perf_counter()
+                try:
+                    response = await view(request, *args, **kwargs)
+                finally:
+                    _request_timings.reset(token)
+                return _finish_request(view_name, response, timings, started)
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timings: List[Tuple[str, float]] = []
+            token = _request_timings.set(timings)
+            started = time.perf_counter()
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                _request_timings.reset(token)
+            return _finish_request(view_name, response, timings, started)
+        return wrapper
+    return decorator
+
+
+def _cache_lines() -> List[str]:
+    """Hit/miss counts kept by the geocode and route caches themselves."""
+    from .geocode_cache import get_geocode_cache
+    from .route_cache import get_route_cache
+
+    geocode = get_geocode_cache().stats()
+    route = get_route_cache().stats()
+    name = "eld_cache_lookups_total"
+    rows = [
+        ("geocode", "memory_hit", geocode.get("memory_hits", 0)),
+        ("geocode", "disk_hit", geocode.get("disk_hits", 0)),
+        ("geocode", "miss", geocode.get("misses", 0)),
+        ("route", "hit", route.get("hits", 0)),
+        ("route", "miss", route.get("misses", 0)),
+    ]
+    lines = [f"# HELP {name} Geocode and route cache lookups by result.", f"# TYPE {name} counter"]
+    for cache, result, value in rows:
+        lines.append(f'{name}{{cache="{cache}",result="{result}"}} {value}')
+    return lines
+
+
+def render_metrics() -> str:
+    """Everything in the Prometheus text exposition format. Values are per process."""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.expose())
+    lines.extend(_cache_lines())
+    return "\n".join(lines) + "\n"
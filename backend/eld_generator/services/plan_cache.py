@@ -0,0 +1,126 @@
+import hashlib
+import json
+import zlib
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.backends.base import BaseCache
+
+from .trip_planner import normalize_start_time
+
+DEFAULT_ALIAS = "plans"
+DEFAULT_MAX_ENTRY_BYTES = 1024 * 1024
+
+# Bump when the response shape changes so stale entries are never served.
+KEY_VERSION = 3
+
+CACHE_HEADER = "X-Plan-Cache"
+
+
+def canonical_trip(data: Dict) -> Dict:
+    """The validated trip reduced to what determines its response.
+
+    ``pickup_location``/``dropoff_location`` are already folded into ``stops``
+    by the serializer, and the start time is normalized, so equivalent
+    requests plan (and hash) identically. Plan from this dict, not from
+    ``data``, so the cached response matches its key.
+    """
+    map_zoom = data.get("map_zoom")
+    cycle_used = data.get("current_cycle_used")
+    return {
+        "current_location": data["current_location"],
+        "stops": [{"location": stop["location"], "type": stop["type"]} for stop in data["stops"]],
+        "current_cycle_used": None if cycle_used is None else float(cycle_used),
+        "start_time": normalize_start_time(data.get("start_time")),
+        "map_zoom": None if map_zoom is None else float(map_zoom),
+        "polyline_format": data["polyline_format"],
+        "hos_planner": data.get("hos_planner", "greedy"),
+        "hos_state": data.get("hos_state"),
+    }
+
+
+def plan_cache_key(trip: Dict) -> str:
+    canonical = json.dumps(trip, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return f"plan:v{KEY_VERSION}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+def _config() -> Dict:
+    return getattr(settings, "PLAN_CACHE", {})
+
+
+def get_plan_cache() -> Optional[BaseCache]:
+    """The Django cache holding plans, or ``None`` when its alias is not configured."""
+    try:
+        return caches[_config().get("ALIAS", DEFAULT_ALIAS)]
+    except InvalidCacheBackendError:
+        return None
+
+
+def _is_cacheable(response: Dict) -> bool:
+    # A leg that fell back to a straight line usually means OSRM was down;
+    # don't pin that answer for the whole TTL.
+    return all(
+        segment.get("route_source") != "straight_line"
+        for segment in response.get("route", {}).get("segments", [])
+    )
+
+
+def _encode(body: bytes, response: Dict) -> Optional[bytes]:
+    if not _is_cacheable(response):
+        return None
+    blob = zlib.compress(body, 6)
+    if len(blob) > _config().get("MAX_ENTRY_BYTES", DEFAULT_MAX_ENTRY_BYTES):
+        return None
+    return blob
+
+
+def get_cached_plan(key: str) -> Optional[bytes]:
+    """The rendered response body stored under ``key``, if any.
+
+    Cache errors (a Redis server going away) count as a miss.
+    """
+    cache = get_plan_cache()
+    if cache is None:
+        return None
+    try:
+        blob = cache.get(key)
+        return zlib.decompress(blob) if blob else None
+    except Exception:
+        return None
+
+
+def store_plan(key: str, body: bytes, response: Dict) -> bool:
+    """Store a rendered response body; returns whether it was cached."""
+    cache = get_plan_cache()
+    blob = _encode(body, response) if cache is not None else None
+    if blob is None:
+        return False
+    try:
+        cache.set(key, blob)
+    except Exception:
+        return False
+    return True
+
+
+async def get_cached_plan_async(key: str) -> Optional[bytes]:
+    cache = get_plan_cache()
+    if cache is None:
+        return None
+    try:
+        blob = await cache.aget(key)
+        return zlib.decompress(blob) if blob else None
+    except Exception:
+        return None
+
+
+async def store_plan_async(key: str, body: bytes, response: Dict) -> bool:
+    cache = get_plan_cache()
+    blob = _encode(body, response) if cache is not None else None
+    if blob is None:
+        return False
+    try:
+        await cache.aset(key, blob)
+    except Exception:
+        return False
+    return True
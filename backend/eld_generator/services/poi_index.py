@@ -0,0 +1,292 @@
+import csv
+import math
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .route_geometry import EARTH_RADIUS_MILES, RouteGeometry, segment_geometry
+
+MAGIC = b"ELDPOI01"
+
+# magic, facility count, cell size (degrees)
+HEADER = struct.Struct("<8sI4xd")
+
+COORD_SCALE = 1_000_000
+MILES_PER_DEGREE = math.pi * EARTH_RADIUS_MILES / 180
+
+DEFAULT_CELL_DEGREES = 0.1
+
+POI_KINDS = ["truck_stop", "fuel", "rest_area"]
+FUEL_KINDS = ("truck_stop", "fuel")
+REST_KINDS = ("truck_stop", "rest_area")
+BREAK_KINDS = ("truck_stop", "fuel", "rest_area")
+
+DEFAULT_SNAP = {
+    "WINDOW_MILES": 30,
+    "MAX_OFFSET_MILES": 2,
+}
+
+# (name, struct code); each array has one entry per facility, in cell order.
+COLUMNS = [
+    ("key", "q"),
+    ("lon", "i"),
+    ("lat", "i"),
+    ("name_offset", "I"),
+    ("name_length", "H"),
+    ("kind", "B"),
+]
+
+
+def _layout(count: int) -> Tuple[List[Tuple[str, str, int]], int]:
+    """``(name, code, offset)`` per column and where the strings start; columns are 8-byte aligned."""
+    arrays = []
+    offset = HEADER.size
+    for name, code in COLUMNS:
+        arrays.append((name, code, offset))
+        offset += -(-count * struct.calcsize(code) // 8) * 8
+    return arrays, offset
+
+
+def _cell_columns(cell_degrees: float) -> int:
+    return int(math.ceil(360 / cell_degrees))
+
+
+def _cell_key(lon: float, lat: float, cell_degrees: float) -> int:
+    return int((lat + 90) // cell_degrees) * _cell_columns(cell_degrees) + int((lon + 180) // cell_degrees)
+
+
+def build_poi_index(rows: Iterable[Dict], output_path: str, cell_degrees: float = DEFAULT_CELL_DEGREES) -> Dict:
+    """Write a facility index file from place rows.
+
+    Rows need ``kind`` (``truck_stop``, ``fuel`` or ``rest_area``), ``lon`` and
+    ``lat``; ``name`` and ``state`` make up the label. Rows of any other kind
+    are skipped, so a gazetteer CSV can be used as is.
+    """
+    facilities = []
+    for row in rows:
+        kind = (row.get("kind") or "").strip().lower()
+        if kind not in POI_KINDS:
+            continue
+        try:
+            lon = float(row["lon"])
+            lat = float(row["lat"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+            continue
+        name = ", ".join(
+            part for part in ((row.get("name") or "").strip(), (row.get("state") or "").strip()) if part
+        ) or kind.replace("_", " ").title()
+        facilities.append((_cell_key(lon, lat, cell_degrees), lon, lat, name, kind))
+    facilities.sort()
+
+    strings = bytearray()
+    columns = {name: [] for name, _ in COLUMNS}
+    for key, lon, lat, name, kind in facilities:
+        encoded = name.encode("utf-8")[:0xFFFF]
+        columns["key"].append(key)
+        columns["lon"].append(round(lon * COORD_SCALE))
+        columns["lat"].append(round(lat * COORD_SCALE))
+        columns["name_offset"].append(len(strings))
+        columns["name_length"].append(len(encoded))
+        columns["kind"].append(POI_KINDS.index(kind))
+        strings.extend(encoded)
+
+    layout, strings_offset = _layout(len(facilities))
+    buffer = bytearray(strings_offset)
+    HEADER.pack_into(buffer, 0, MAGIC, len(facilities), cell_degrees)
+    for name, code, offset in layout:
+        struct.pack_into(f"<{len(facilities)}{code}", buffer, offset, *columns[name])
+
+    # The default index paths live in backend/data/, which a fresh checkout does not have.
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(buffer)
+        f.write(strings)
+
+    return {"facilities": len(facilities), "bytes": strings_offset + len(strings)}
+
+
+def build_poi_index_from_csv(csv_path: str, output_path: str, cell_degrees: float = DEFAULT_CELL_DEGREES) -> Dict:
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return build_poi_index(csv.DictReader(f), output_path, cell_degrees)
+
+
+class PoiIndex:
+    """Read-only grid index of truck stops, fuel stations and rest areas.
+
+    Facilities are sorted by grid cell, so the facilities of a run of cells in
+    one row are a contiguous slice found by binary search. The file is
+    memory-mapped and the columns are numpy views over it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.cell_degrees = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a facility index")
+        layout, self._strings_offset = _layout(self.count)
+        for name, code, offset in layout:
+            setattr(self, f"_{name}s", np.frombuffer(self._mm, dtype=np.dtype(code), count=self.count, offset=offset))
+        self._columns = _cell_columns(self.cell_degrees)
+
+    def close(self) -> None:
+        for name, _ in COLUMNS:
+            setattr(self, f"_{name}s", None)
+        self._mm.close()
+
+    def _facility(self, index: int) -> Dict:
+        start = self._strings_offset + int(self._name_offsets[index])
+        return {
+            "name": self._mm[start:start + int(self._name_lengths[index])].decode("utf-8"),
+            "kind": POI_KINDS[self._kinds[index]],
+            "lon": int(self._lons[index]) / COORD_SCALE,
+            "lat": int(self._lats[index]) / COORD_SCALE,
+        }
+
+    def _in_box(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float,
+                kinds: Optional[Sequence[str]]) -> np.ndarray:
+        """Indexes of the facilities in the cells covering a bounding box."""
+        cell = self.cell_degrees
+        first_column = max(int((min_lon + 180) // cell), 0)
+        last_column = min(int((max_lon + 180) // cell), self._columns - 1)
+        rows = range(int((max(min_lat, -90) + 90) // cell), int((min(max_lat, 90) + 90) // cell) + 1)
+        bounds = np.array([[row * self._columns + first_column, row * self._columns + last_column + 1]
+                           for row in rows], dtype=np.int64)
+        starts = np.searchsorted(self._keys, bounds[:, 0])
+        ends = np.searchsorted(self._keys, bounds[:, 1])
+        indexes = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)] or [np.empty(0, int)])
+        if kinds is not None and len(indexes):
+            wanted = [POI_KINDS.index(kind) for kind in kinds]
+            indexes = indexes[np.isin(self._kinds[indexes], wanted)]
+        return indexes
+
+    def near(self, lon: float, lat: float, radius_miles: float,
+             kinds: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Facilities within ``radius_miles`` of a point, nearest first, with ``distance_miles``."""
+        lat_span = radius_miles / MILES_PER_DEGREE
+        lon_span = lat_span / max(math.cos(math.radians(lat)), 0.01)
+        indexes = self._in_box(lon - lon_span, lat - lat_span, lon + lon_span, lat + lat_span, kinds)
+        if not len(indexes):
+            return []
+        dx = (self._lons[indexes] / COORD_SCALE - lon) * math.cos(math.radians(lat)) * MILES_PER_DEGREE
+        dy = (self._lats[indexes] / COORD_SCALE - lat) * MILES_PER_DEGREE
+        distances = np.hypot(dx, dy)
+        found = []
+        for i in np.argsort(distances):
+            if distances[i] > radius_miles:
+                break
+            facility = self._facility(int(indexes[i]))
+            facility["distance_miles"] = float(distances[i])
+            found.append(facility)
+        return found
+
+    def along_route(self, geometry: RouteGeometry, start_mile: float, end_mile: float,
+                    max_offset_miles: float, kinds: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Facilities within ``max_offset_miles`` of the route between two of its miles.
+
+        Each comes with ``mile`` (its position projected onto the route) and
+        ``offset_miles`` (how far it is off the route), ordered by ``mile``.
+        """
+        if len(geometry) < 2 or end_mile < start_mile:
+            return []
+        cumulative = geometry.cumulative_miles
+        first = max(int(np.searchsorted(cumulative, start_mile, side="right")) - 1, 0)
+        last = min(int(np.searchsorted(cumulative, end_mile, side="left")), len(cumulative) - 1)
+        if last <= first:
+            last = first + 1
+        lons = geometry.lons[first:last + 1]
+        lats = geometry.lats[first:last + 1]
+        lat_span = max_offset_miles / MILES_PER_DEGREE
+        lon_span = lat_span / max(math.cos(math.radians(float(lats.mean()))), 0.01)
+        indexes = self._in_box(float(lons.min()) - lon_span, float(lats.min()) - lat_span,
+                               float(lons.max()) + lon_span, float(lats.max()) + lat_span, kinds)
+        if not len(indexes):
+            return []
+
+        # Local equirectangular projection in miles; exact enough for a few miles off the road.
+        scale_x = math.cos(math.radians(float(lats.mean()))) * MILES_PER_DEGREE
+        ax = lons[:-1] * scale_x
+        ay = lats[:-1] * MILES_PER_DEGREE
+        bx = lons[1:] * scale_x - ax
+        by = lats[1:] * MILES_PER_DEGREE - ay
+        px = (self._lons[indexes] / COORD_SCALE * scale_x)[:, None]
+        py = (self._lats[indexes] / COORD_SCALE * MILES_PER_DEGREE)[:, None]
+        lengths = bx * bx + by * by
+        t = np.clip(((px - ax) * bx + (py - ay) * by) / np.where(lengths > 0, lengths, 1), 0, 1)
+        offsets = np.hypot(ax + t * bx - px, ay + t * by - py)
+        nearest = np.argmin(offsets, axis=1)
+        rows = np.arange(len(indexes))
+        offset_miles = offsets[rows, nearest]
+        miles = (cumulative[first + nearest]
+                 + t[rows, nearest] * (cumulative[first + nearest + 1] - cumulative[first + nearest]))
+
+        found = []
+        for i in np.argsort(miles):
+            if offset_miles[i] <= max_offset_miles and start_mile <= miles[i] <= end_mile:
+                facility = self._facility(int(indexes[i]))
+                facility["mile"] = float(miles[i])
+                facility["offset_miles"] = float(offset_miles[i])
+                found.append(facility)
+        return found
+
+    def last_before(self, geometry: RouteGeometry, mile: float, kinds: Sequence[str],
+                    window_miles: float, max_offset_miles: float) -> Optional[Dict]:
+        """The facility a driver reaches last on the way to ``mile``, looking back ``window_miles``."""
+        found = self.along_route(geometry, max(mile - window_miles, 0.0), mile, max_offset_miles, kinds)
+        return found[-1] if found else None
+
+
+_poi_index = None
+_poi_index_lock = threading.Lock()
+
+
+def get_poi_index() -> Optional[PoiIndex]:
+    """The facility index (``POI_INDEX_PATH``), opened once per process; ``None`` without one."""
+    global _poi_index
+    if _poi_index is None:
+        with _poi_index_lock:
+            if _poi_index is None:
+                path = getattr(settings, "POI_INDEX_PATH", None)
+                index = False
+                try:
+                    index = PoiIndex(path) if path else False
+                except (OSError, ValueError):
+                    index = False
+                _poi_index = index
+    return _poi_index or None
+
+
+def snap_config() -> Dict:
+    config = dict(DEFAULT_SNAP)
+    config.update(getattr(settings, "STOP_SNAP", {}))
+    return config
+
+
+def snap_stop(segment: Dict, ratio: float, kinds: Sequence[str]) -> Optional[Dict]:
+    """The facility to stop at instead of ``ratio`` of ``segment``, if one is close enough.
+
+    Only facilities at or before the planned point qualify, so a stop that a
+    limit forces is never pushed past it. The result carries ``ratio``: where
+    the facility falls on the segment.
+    """
+    index = get_poi_index()
+    if index is None:
+        return None
+    geometry = segment_geometry(segment)
+    if geometry is None or not geometry.length_miles:
+        return None
+    config = snap_config()
+    facility = index.last_before(geometry, ratio * geometry.length_miles, kinds,
+                                 config["WINDOW_MILES"], config["MAX_OFFSET_MILES"])
+    if facility is not None:
+        facility["ratio"] = min(facility["mile"] / geometry.length_miles, ratio)
+    return facility
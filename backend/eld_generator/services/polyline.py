@@ -0,0 +1,144 @@
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .route_geometry import coordinate_array
+
+POLYLINE_FORMATS = ["geojson", "encoded", "flat"]
+
+# Web Mercator ground resolution at the equator for zoom 0, in meters per pixel.
+EQUATOR_METERS_PER_PIXEL = 156543.03392
+METERS_PER_DEGREE = 111320.0
+DEFAULT_TOLERANCE_PIXELS = 1.0
+
+
+def tolerance_for_zoom(zoom: float, latitude: float = 0.0,
+                       pixels: float = DEFAULT_TOLERANCE_PIXELS) -> float:
+    """Simplification tolerance in degrees of latitude for a map zoom level.
+
+    ``pixels`` is how far (in screen pixels at that zoom) a dropped vertex may
+    sit from the simplified line.
+    """
+    meters_per_pixel = EQUATOR_METERS_PER_PIXEL * math.cos(math.radians(latitude)) / (2 ** zoom)
+    return pixels * meters_per_pixel / METERS_PER_DEGREE
+
+
+def simplify_coordinates(coords: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker simplification of an ``(n, 2)`` lon/lat array.
+
+    Distances are measured on an equirectangular projection (longitude scaled
+    by the cosine of the mean latitude), which is accurate at map-display
+    tolerances. The perpendicular-distance scan of each span is vectorized;
+    spans are processed from an explicit stack, so there is no recursion limit.
+    """
+    n = len(coords)
+    if n < 3 or tolerance <= 0:
+        return coords
+
+    scale = math.cos(math.radians(float(np.mean(coords[:, 1]))))
+    xs = coords[:, 0] * scale
+    ys = coords[:, 1]
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    tolerance_sq = tolerance * tolerance
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        x0, y0 = xs[start], ys[start]
+        dx, dy = xs[end] - x0, ys[end] - y0
+        px = xs[start + 1:end] - x0
+        py = ys[start + 1:end] - y0
+        length_sq = dx * dx + dy * dy
+        if length_sq == 0:
+            dist_sq = px * px + py * py
+        else:
+            cross = px * dy - py * dx
+            dist_sq = cross * cross / length_sq
+        index = int(np.argmax(dist_sq))
+        if dist_sq[index] > tolerance_sq:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return coords[keep]
+
+
+def encode_polyline(coords: np.ndarray, precision: int = 5) -> str:
+    """Google encoded polyline (lat/lon order) for an ``(n, 2)`` lon/lat array."""
+    factor = 10 ** precision
+    scaled = np.round(coords[:, ::-1] * factor).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+
+    chunks = []
+    for value in deltas.tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def decode_polyline(text: str, precision: int = 5) -> np.ndarray:
+    """``(n, 2)`` lon/lat array from a Google encoded polyline; the inverse of :func:`encode_polyline`.
+
+    Decoded with array operations on the string's bytes: each value is at
+    most seven 5-bit chunks, so the chunks are gathered one position at a
+    time across all values instead of walking the string character by
+    character.
+    """
+    chunks = np.frombuffer(text.encode("ascii"), dtype=np.uint8) - np.uint8(63)
+    if len(chunks) == 0:
+        return np.empty((0, 2), dtype=np.float64)
+    # Zigzagged deltas of coordinates within +/-180 fit in 32 bits at precision 6.
+    ends = np.flatnonzero((chunks & 0x20) == 0).astype(np.int32)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    values = (chunks[starts] & 0x1F).astype(np.int32)
+    for position in range(1, 7):
+        index = starts + position
+        present = np.flatnonzero(index <= ends)
+        if len(present) == 0:
+            break
+        values[present] |= (chunks[index[present]] & 0x1F).astype(np.int32) << (5 * position)
+    sign = values & 1
+    values >>= 1
+    values ^= -sign
+    deltas = values.reshape(-1, 2)
+    return np.cumsum(deltas[:, ::-1], axis=0, dtype=np.int64) / 10 ** precision
+
+
+def format_polyline(geometry: Optional[Dict], polyline_format: str = "geojson",
+                    zoom: Optional[float] = None) -> Optional[Dict]:
+    """Simplify a GeoJSON LineString for ``zoom`` and emit it in ``polyline_format``.
+
+    With no zoom the line is left at full resolution. ``"geojson"`` keeps the
+    input shape; ``"encoded"`` and ``"flat"`` return compact alternatives.
+    """
+    if not geometry or geometry.get("coordinates") is None or len(geometry["coordinates"]) == 0:
+        return geometry
+
+    coords = coordinate_array(geometry["coordinates"])
+    if zoom is not None:
+        tolerance = tolerance_for_zoom(zoom, float(np.mean(coords[:, 1])))
+        coords = simplify_coordinates(coords, tolerance)
+
+    if polyline_format == "encoded":
+        return {"type": "EncodedPolyline", "precision": 5, "polyline": encode_polyline(coords)}
+    if polyline_format == "flat":
+        return {"type": "FlatLineString", "coordinates": np.round(coords, 6).ravel().tolist()}
+    if zoom is None:
+        return geometry
+    return {"type": "LineString", "coordinates": coords}
+
+
+def format_polylines(geometries: Sequence[Optional[Dict]], polyline_format: str = "geojson",
+                     zoom: Optional[float] = None) -> List[Optional[Dict]]:
+    return [format_polyline(geometry, polyline_format, zoom) for geometry in geometries]
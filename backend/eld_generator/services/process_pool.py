@@ -0,0 +1,76 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, Iterator, Optional
+
+from django.conf import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def worker_count() -> int:
+    return getattr(settings, "TRIP_PLANNER_WORKERS", None) or os.cpu_count() or 1
+
+
+def _init_worker() -> None:
+    import django
+    django.setup()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """The process pool shared by CPU-bound request work (planning, rendering).
+
+    Workers start from a forkserver rather than a fork of the web process:
+    that process runs thread pools, HTTP sessions and (under ASGI) an event
+    loop, and a fork taken while one of their threads holds a lock (a cache,
+    logging) would leave the worker deadlocked on it.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=worker_count(), mp_context=multiprocessing.get_context("forkserver"),
+                    initializer=_init_worker
+                )
+    return _pool
+
+
+def reset_process_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def map_in_pool(function: Callable, items: Iterable) -> Iterator:
+    """``map`` over the shared pool, in order; inline when there is no parallelism to gain.
+
+    Raises ``BrokenProcessPool`` (after resetting the pool) if a worker dies.
+    """
+    items = list(items)
+    workers = worker_count()
+    if workers <= 1 or len(items) <= 1:
+        return map(function, items)
+    chunksize = max(1, len(items) // (workers * 4))
+    return get_process_pool().map(function, items, chunksize=chunksize)
+
+
+async def run_in_pool(function: Callable, *args):
+    """Await ``function(*args)`` on the shared pool without blocking the event loop.
+
+    With a single worker there is no pool; the call goes to the loop's default
+    thread executor instead.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_process_pool() if worker_count() > 1 else None
+    try:
+        return await loop.run_in_executor(executor, function, *args)
+    except BrokenProcessPool:
+        reset_process_pool()
+        raise
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    ``acquire`` blocks only as long as needed for a token to become available,
+    so a caller that arrives after an idle period goes through immediately.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self) -> Tuple[float, float]:
+        """Take a token if one is available; return ``(now, seconds to wait)``, 0 on success."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return now, 0
+            return now, (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            now, wait = self._try_take()
+            if not wait:
+                return True
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """:meth:`acquire` that waits on the event loop; shares tokens with sync callers."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            now, wait = self._try_take()
+            if not wait:
+                return True
+            if deadline is not None and now + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+_nominatim_limiter: Optional[TokenBucket] = None
+_limiter_lock = threading.Lock()
+
+
+def get_nominatim_rate_limiter() -> TokenBucket:
+    """Process-wide limiter for Nominatim's 1 request/second usage policy."""
+    global _nominatim_limiter
+    if _nominatim_limiter is None:
+        with _limiter_lock:
+            if _nominatim_limiter is None:
+                _nominatim_limiter = TokenBucket(
+                    rate=getattr(settings, "NOMINATIM_RATE_PER_SECOND", 1.0),
+                    capacity=1
+                )
+    return _nominatim_limiter
@@ -0,0 +1,419 @@
+import csv
+import heapq
+import itertools
+import math
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"ELDRGR01"
+
+# magic, node count, edge count, shape point count, cell size (degrees), max speed (m/s)
+HEADER = struct.Struct("<8sIII4xdd")
+
+# Coordinates are stored as int32 microdegrees (about 0.1 m).
+COORD_SCALE = 1_000_000
+
+EARTH_RADIUS_METERS = 6_371_008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+METERS_PER_MILE = 1609.344
+
+DEFAULT_CELL_DEGREES = 0.05
+DEFAULT_SPEED_MPH = 60
+
+# (name, struct code, length as a function of node/edge/shape point counts).
+# Nodes are numbered in spatial cell order so a cell's nodes are contiguous.
+LAYOUT = [
+    ("node_key", "q", lambda n, m, s: n),
+    ("node_lon", "i", lambda n, m, s: n),
+    ("node_lat", "i", lambda n, m, s: n),
+    ("first_out", "I", lambda n, m, s: n + 1),
+    ("edge_head", "I", lambda n, m, s: m),
+    ("edge_tail", "I", lambda n, m, s: m),
+    ("edge_distance", "f", lambda n, m, s: m),
+    ("edge_duration", "f", lambda n, m, s: m),
+    ("first_in", "I", lambda n, m, s: n + 1),
+    ("in_edge", "I", lambda n, m, s: m),
+    ("shape_first", "I", lambda n, m, s: m + 1),
+    ("shape_lon", "i", lambda n, m, s: s),
+    ("shape_lat", "i", lambda n, m, s: s),
+]
+
+
+def _layout(node_count: int, edge_count: int, shape_count: int) -> Tuple[List[Tuple[str, str, int, int]], int]:
+    """``(name, code, offset, length)`` per array and the file size; arrays start 8-byte aligned."""
+    arrays = []
+    offset = HEADER.size
+    for name, code, length in LAYOUT:
+        count = length(node_count, edge_count, shape_count)
+        arrays.append((name, code, offset, count))
+        offset += -(-count * struct.calcsize(code) // 8) * 8
+    return arrays, offset
+
+
+def _haversine_meters(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    lat1_r = math.radians(lat1)
+    lat2_r = math.radians(lat2)
+    a = (math.sin((lat2_r - lat1_r) / 2) ** 2
+         + math.cos(lat1_r) * math.cos(lat2_r) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _polyline_meters(points: Sequence[Tuple[float, float]]) -> List[float]:
+    return [_haversine_meters(*points[i], *points[i + 1]) for i in range(len(points) - 1)]
+
+
+def _cell_columns(cell_degrees: float) -> int:
+    return int(math.ceil(360 / cell_degrees))
+
+
+def _cell_key(lon: float, lat: float, cell_degrees: float) -> int:
+    row = int((lat + 90) // cell_degrees)
+    column = int((lon + 180) // cell_degrees)
+    return row * _cell_columns(cell_degrees) + column
+
+
+def _parse_shape(text: str) -> List[Tuple[float, float]]:
+    """Intermediate edge vertices as ``"lon lat;lon lat"``."""
+    points = []
+    for pair in (text or "").split(";"):
+        if pair.strip():
+            lon, lat = pair.split()
+            points.append((float(lon), float(lat)))
+    return points
+
+
+def _is_oneway(value) -> bool:
+    return str(value or "").strip().lower() in ("1", "true", "yes", "y")
+
+
+def build_road_graph(nodes: Iterable[Dict], edges: Iterable[Dict], output_path: str,
+                     cell_degrees: float = DEFAULT_CELL_DEGREES) -> Dict:
+    """Write a road graph file from node and edge rows.
+
+    Nodes need ``id``, ``lon`` and ``lat``. Edges need ``source`` and
+    ``target`` node ids; ``geometry`` (intermediate ``"lon lat;lon lat"``
+    vertices), ``length_m`` (default: the geometry's length), ``speed_mph``
+    (default 60), ``duration_s`` (default: length over speed) and ``oneway``
+    are optional. Rows that reference unknown nodes are skipped.
+    """
+    positions: Dict[str, Tuple[float, float]] = {}
+    for row in nodes:
+        try:
+            lon = float(row["lon"])
+            lat = float(row["lat"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if -180 <= lon <= 180 and -90 <= lat <= 90:
+            positions[str(row["id"]).strip()] = (lon, lat)
+
+    node_ids = sorted(positions, key=lambda node_id: (_cell_key(*positions[node_id], cell_degrees), node_id))
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+    directed = []
+    for row in edges:
+        source = index.get(str(row.get("source", "")).strip())
+        target = index.get(str(row.get("target", "")).strip())
+        if source is None or target is None or source == target:
+            continue
+        try:
+            shape = _parse_shape(row.get("geometry", ""))
+            points = [positions[node_ids[source]]] + shape + [positions[node_ids[target]]]
+            length = float(row.get("length_m") or 0) or sum(_polyline_meters(points))
+            speed_mph = float(row.get("speed_mph") or DEFAULT_SPEED_MPH)
+            duration = float(row.get("duration_s") or 0) or length / (speed_mph * METERS_PER_MILE / 3600)
+        except (TypeError, ValueError):
+            continue
+        if duration <= 0:
+            continue
+        directed.append((source, target, length, duration, shape))
+        if not _is_oneway(row.get("oneway")):
+            directed.append((target, source, length, duration, shape[::-1]))
+
+    # Forward adjacency: edges grouped by tail; the reverse index lists them by head.
+    directed.sort(key=lambda edge: (edge[0], edge[1]))
+    node_count = len(node_ids)
+    edge_count = len(directed)
+    shape_count = sum(len(edge[4]) for edge in directed)
+
+    arrays = {
+        "node_key": [_cell_key(*positions[node_id], cell_degrees) for node_id in node_ids],
+        "node_lon": [round(positions[node_id][0] * COORD_SCALE) for node_id in node_ids],
+        "node_lat": [round(positions[node_id][1] * COORD_SCALE) for node_id in node_ids],
+        "edge_tail": [edge[0] for edge in directed],
+        "edge_head": [edge[1] for edge in directed],
+        "edge_distance": [edge[2] for edge in directed],
+        "edge_duration": [edge[3] for edge in directed],
+        "shape_lon": [round(lon * COORD_SCALE) for edge in directed for lon, _ in edge[4]],
+        "shape_lat": [round(lat * COORD_SCALE) for edge in directed for _, lat in edge[4]],
+    }
+    arrays["first_out"] = np.searchsorted(np.array(arrays["edge_tail"], dtype=np.int64),
+                                          np.arange(node_count + 1)).tolist()
+    in_edges = sorted(range(edge_count), key=lambda e: directed[e][1])
+    arrays["in_edge"] = in_edges
+    arrays["first_in"] = np.searchsorted(np.array([directed[e][1] for e in in_edges], dtype=np.int64),
+                                         np.arange(node_count + 1)).tolist()
+    arrays["shape_first"] = [0] + list(itertools.accumulate(len(edge[4]) for edge in directed))
+
+    # The A* heuristic divides straight-line distance by the fastest edge, so
+    # it never overestimates the remaining time.
+    max_speed = 0.0
+    for source, target, _, duration, _ in directed:
+        straight = _haversine_meters(*positions[node_ids[source]], *positions[node_ids[target]])
+        max_speed = max(max_speed, straight / duration)
+
+    layout, size = _layout(node_count, edge_count, shape_count)
+    buffer = bytearray(size)
+    HEADER.pack_into(buffer, 0, MAGIC, node_count, edge_count, shape_count, cell_degrees, max_speed)
+    for name, code, offset, count in layout:
+        struct.pack_into(f"<{count}{code}", buffer, offset, *arrays[name])
+
+    # The default index paths live in backend/data/, which a fresh checkout does not have.
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(buffer)
+
+    return {"nodes": node_count, "edges": edge_count, "shape_points": shape_count, "bytes": size}
+
+
+def build_road_graph_from_csv(nodes_path: str, edges_path: str, output_path: str,
+                              cell_degrees: float = DEFAULT_CELL_DEGREES) -> Dict:
+    with open(nodes_path, newline="", encoding="utf-8") as nodes_file, \
+            open(edges_path, newline="", encoding="utf-8") as edges_file:
+        return build_road_graph(csv.DictReader(nodes_file), csv.DictReader(edges_file),
+                                output_path, cell_degrees)
+
+
+class RoadGraph:
+    """Read-only road graph for offline routing.
+
+    The file is memory-mapped and its arrays are read in place, so worker
+    processes share one copy of the graph through the page cache. Routes are
+    fastest paths found by bidirectional A*, returned in the shape of an
+    OSRM ``route`` response.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.node_count, self.edge_count, self.shape_count,
+         self.cell_degrees, self.max_speed) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a road graph")
+        self._views = []
+        layout, _ = _layout(self.node_count, self.edge_count, self.shape_count)
+        for name, code, offset, count in layout:
+            view = memoryview(self._mm)[offset:offset + count * struct.calcsize(code)].cast(code)
+            self._views.append(view)
+            setattr(self, f"_{name}", view)
+        self._columns = _cell_columns(self.cell_degrees)
+        # numpy views over the same pages, for the vectorized nearest-node search.
+        self._keys = np.asarray(self._node_key)
+        self._lons = np.asarray(self._node_lon)
+        self._lats = np.asarray(self._node_lat)
+
+    def close(self) -> None:
+        self._keys = self._lons = self._lats = None
+        for view in self._views:
+            view.release()
+        self._mm.close()
+
+    def node_location(self, node: int) -> Tuple[float, float]:
+        return self._node_lon[node] / COORD_SCALE, self._node_lat[node] / COORD_SCALE
+
+    def nearest_node(self, lon: float, lat: float, max_meters: float) -> Optional[Tuple[int, float]]:
+        """The closest node within ``max_meters`` and its distance, or ``None``."""
+        if not self.node_count:
+            return None
+        lat_span = max_meters / METERS_PER_DEGREE
+        lon_span = lat_span / max(math.cos(math.radians(lat)), 0.01)
+        cell = self.cell_degrees
+        first_row = int((max(lat - lat_span, -90) + 90) // cell)
+        last_row = int((min(lat + lat_span, 90) + 90) // cell)
+        first_column = max(int((lon - lon_span + 180) // cell), 0)
+        last_column = min(int((lon + lon_span + 180) // cell), self._columns - 1)
+        scale_x = math.cos(math.radians(lat)) * METERS_PER_DEGREE / COORD_SCALE
+        scale_y = METERS_PER_DEGREE / COORD_SCALE
+        best = None
+        for row in range(first_row, last_row + 1):
+            # Within a row, consecutive cells hold consecutive nodes.
+            start, end = np.searchsorted(
+                self._keys, [row * self._columns + first_column, row * self._columns + last_column + 1]
+            )
+            if start == end:
+                continue
+            dx = (self._lons[start:end] - lon * COORD_SCALE) * scale_x
+            dy = (self._lats[start:end] - lat * COORD_SCALE) * scale_y
+            distances = dx * dx + dy * dy
+            i = int(np.argmin(distances))
+            if best is None or distances[i] < best[1]:
+                best = (start + i, float(distances[i]))
+        if best is None or best[1] > max_meters ** 2:
+            return None
+        # Equirectangular for the search; report the great-circle distance.
+        node = int(best[0])
+        return node, _haversine_meters(lon, lat, *self.node_location(node))
+
+    def shortest_path(self, source: int, target: int) -> Optional[List[int]]:
+        """Edge ids of the fastest path from ``source`` to ``target``.
+
+        Bidirectional A* with the averaged potential
+        ``p(v) = (h_target(v) - h_source(v)) / 2``, which keeps both searches
+        consistent so they can stop as soon as the two frontier keys add up
+        to the best meeting found.
+        """
+        if source == target:
+            return []
+        lons, lats = self._node_lon, self._node_lat
+        heads, tails, durations = self._edge_head, self._edge_tail, self._edge_duration
+        first_out, first_in, in_edge = self._first_out, self._first_in, self._in_edge
+        speed = self.max_speed or 1.0
+        source_lon, source_lat = self.node_location(source)
+        target_lon, target_lat = self.node_location(target)
+        potentials: Dict[int, float] = {}
+
+        def potential(node: int) -> float:
+            value = potentials.get(node)
+            if value is None:
+                lon, lat = lons[node] / COORD_SCALE, lats[node] / COORD_SCALE
+                value = (_haversine_meters(lon, lat, target_lon, target_lat)
+                         - _haversine_meters(source_lon, source_lat, lon, lat)) / (2 * speed)
+                potentials[node] = value
+            return value
+
+        forward_dist = {source: 0.0}
+        backward_dist = {target: 0.0}
+        forward_edge = {source: -1}
+        backward_edge = {target: -1}
+        forward_heap = [(potential(source), source)]
+        backward_heap = [(-potential(target), target)]
+        forward_done = set()
+        backward_done = set()
+        best = math.inf
+        meeting = None
+
+        while forward_heap and backward_heap:
+            if forward_heap[0][0] + backward_heap[0][0] >= best:
+                break
+            if len(forward_heap) <= len(backward_heap):
+                _, node = heapq.heappop(forward_heap)
+                if node in forward_done:
+                    continue
+                forward_done.add(node)
+                node_dist = forward_dist[node]
+                for edge in range(first_out[node], first_out[node + 1]):
+                    head = heads[edge]
+                    dist = node_dist + durations[edge]
+                    if dist < forward_dist.get(head, math.inf):
+                        forward_dist[head] = dist
+                        forward_edge[head] = edge
+                        heapq.heappush(forward_heap, (dist + potential(head), head))
+                        if head in backward_dist and dist + backward_dist[head] < best:
+                            best = dist + backward_dist[head]
+                            meeting = head
+            else:
+                _, node = heapq.heappop(backward_heap)
+                if node in backward_done:
+                    continue
+                backward_done.add(node)
+                node_dist = backward_dist[node]
+                for position in range(first_in[node], first_in[node + 1]):
+                    edge = in_edge[position]
+                    tail = tails[edge]
+                    dist = node_dist + durations[edge]
+                    if dist < backward_dist.get(tail, math.inf):
+                        backward_dist[tail] = dist
+                        backward_edge[tail] = edge
+                        heapq.heappush(backward_heap, (dist - potential(tail), tail))
+                        if tail in forward_dist and dist + forward_dist[tail] < best:
+                            best = dist + forward_dist[tail]
+                            meeting = tail
+
+        if meeting is None:
+            return None
+        path = []
+        node = meeting
+        while forward_edge[node] != -1:
+            path.append(forward_edge[node])
+            node = tails[forward_edge[node]]
+        path.reverse()
+        node = meeting
+        while backward_edge[node] != -1:
+            path.append(backward_edge[node])
+            node = heads[backward_edge[node]]
+        return path
+
+    def _leg(self, source: int, path: List[int]) -> Tuple[Dict, List[List[float]]]:
+        """OSRM-style leg (with per-segment distance and duration annotations) and its vertices."""
+        coordinates = [list(self.node_location(source))]
+        annotation = []
+        durations = []
+        for edge in path:
+            start, end = self._shape_first[edge], self._shape_first[edge + 1]
+            points = [(self._shape_lon[i] / COORD_SCALE, self._shape_lat[i] / COORD_SCALE)
+                      for i in range(start, end)]
+            points.append(self.node_location(self._edge_head[edge]))
+            pieces = _polyline_meters([tuple(coordinates[-1])] + points)
+            total = sum(pieces)
+            # Spread the edge's stored length over its vertices.
+            scale = self._edge_distance[edge] / total if total else 0.0
+            annotation.extend(piece * scale if total else self._edge_distance[edge] / len(pieces)
+                              for piece in pieces)
+            durations.extend(self._edge_duration[edge] * (piece / total if total else 1 / len(pieces))
+                             for piece in pieces)
+            coordinates.extend([lon, lat] for lon, lat in points)
+        if not path:
+            # A stop at the same node: keep one zero-length segment, as OSRM does.
+            coordinates.append(list(coordinates[0]))
+            annotation.append(0.0)
+            durations.append(0.0)
+        leg = {
+            "distance": sum(self._edge_distance[edge] for edge in path),
+            "duration": sum(self._edge_duration[edge] for edge in path),
+            "annotation": {"distance": annotation, "duration": durations},
+        }
+        return leg, coordinates
+
+    def route(self, coordinates: List[Tuple[float, float]], max_snap_meters: float) -> Dict:
+        """Route through ``coordinates`` (``(lon, lat)``) in order, like OSRM's ``route`` service.
+
+        Failures come back as OSRM does: ``code`` ``NoSegment`` when a
+        coordinate has no node within ``max_snap_meters``, ``NoRoute`` when
+        the graph does not connect two of them.
+        """
+        snapped = []
+        for i, (lon, lat) in enumerate(coordinates):
+            nearest = self.nearest_node(lon, lat, max_snap_meters)
+            if nearest is None:
+                return {"code": "NoSegment", "message": f"Could not find a matching segment for coordinate {i}"}
+            snapped.append(nearest)
+
+        legs = []
+        geometry: List[List[float]] = []
+        for (source, _), (target, _) in zip(snapped, snapped[1:]):
+            path = self.shortest_path(source, target)
+            if path is None:
+                return {"code": "NoRoute", "message": "Impossible route between points"}
+            leg, leg_coordinates = self._leg(source, path)
+            legs.append(leg)
+            # Consecutive legs share the waypoint vertex.
+            geometry.extend(leg_coordinates if not geometry else leg_coordinates[1:])
+
+        return {
+            "code": "Ok",
+            "routes": [{
+                "distance": sum(leg["distance"] for leg in legs),
+                "duration": sum(leg["duration"] for leg in legs),
+                "geometry": {"type": "LineString", "coordinates": geometry},
+                "legs": legs,
+            }],
+            "waypoints": [
+                {"location": list(self.node_location(node)), "distance": distance}
+                for node, distance in snapped
+            ],
+        }
@@ -0,0 +1,259 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .route_geometry import coordinate_array
+
+DEFAULT_PRECISION = 4
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+SCHEMA_VERSION = 3
+
+# OSRM emits GeoJSON coordinates with 6 decimals, so a 1e-6 grid is lossless.
+COORD_SCALE = 1_000_000
+
+
+def route_cache_key(coordinates: Sequence[Tuple[float, float]], precision: int) -> str:
+    return ";".join(f"{lon:.{precision}f},{lat:.{precision}f}" for lon, lat in coordinates)
+
+
+def pack_coordinates(coords: Sequence[Sequence[float]]) -> bytes:
+    """Delta-encode coordinates on a 1e-6 degree grid and zlib them.
+
+    The blob is the lon/lat deltas as interleaved native int64s.
+    """
+    grid = np.rint(coordinate_array(coords) * COORD_SCALE).astype(np.int64)
+    deltas = np.diff(grid, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return zlib.compress(deltas.tobytes(), 6)
+
+
+def unpack_coordinates(blob: bytes) -> np.ndarray:
+    """The ``(n, 2)`` coordinate array packed by :func:`pack_coordinates`."""
+    deltas = np.frombuffer(zlib.decompress(blob), dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / COORD_SCALE
+
+
+def pack_durations(legs: List[Dict]) -> bytes:
+    """Every leg's per-edge durations as one float32 run, or nothing when a leg has none."""
+    if not legs or any(leg.get("durations") is None or len(leg["durations"]) == 0 for leg in legs):
+        return b""
+    durations = np.concatenate([np.asarray(leg["durations"], dtype=np.float32) for leg in legs])
+    return zlib.compress(durations.tobytes(), 6)
+
+
+def unpack_durations(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    if not blob:
+        return None
+    return np.frombuffer(zlib.decompress(blob), dtype=np.float32)
+
+
+def _expand_route(distance: float, duration: float, coords: np.ndarray, legs: List[Dict],
+                  durations: Optional[np.ndarray] = None) -> Dict:
+    expanded_legs = []
+    start = 0
+    for leg in legs:
+        expanded_legs.append({
+            "distance": leg["distance"],
+            "duration": leg["duration"],
+            "geometry": {"type": "LineString", "coordinates": coords[start:leg["end"] + 1]},
+            "durations": None if durations is None else durations[start:leg["end"]]
+        })
+        start = leg["end"]
+    return {
+        "distance": distance,
+        "duration": duration,
+        "geometry": {"type": "LineString", "coordinates": coords},
+        "legs": expanded_legs
+    }
+
+
+class RouteCache:
+    """SQLite store of OSRM routes keyed on rounded waypoint coordinates.
+
+    Only what the route pipeline uses is kept: distance and duration as plain
+    columns, the overview geometry and per-edge durations as compressed blobs
+    and, per leg, its distance, duration and end vertex. The table is
+    trimmed to ``max_bytes`` of blobs by least-recent access.
+    """
+
+    def __init__(self, path: str, precision: int = DEFAULT_PRECISION,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.precision = precision
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._bytes_since_evict = 0
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "stores": 0,
+            "evictions": 0,
+            "bytes_stored": 0,
+            "disk_errors": 0,
+        }
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self.path:
+            try:
+                conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    conn.execute("DROP TABLE IF EXISTS route_cache")
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS route_cache ("
+                    "key TEXT PRIMARY KEY, distance REAL NOT NULL, duration REAL NOT NULL, "
+                    "geometry BLOB NOT NULL, durations BLOB NOT NULL, legs TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS route_cache_accessed ON route_cache (accessed_at)"
+                )
+                conn.commit()
+                self._conn = conn
+            except sqlite3.Error:
+                self._counters["disk_errors"] += 1
+                self.path = None
+        return self._conn
+
+    def key(self, coordinates: Sequence[Tuple[float, float]]) -> str:
+        return route_cache_key(coordinates, self.precision)
+
+    def get(self, coordinates: Sequence[Tuple[float, float]]) -> Optional[Dict]:
+        key = self.key(coordinates)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                self._counters["misses"] += 1
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT distance, duration, geometry, durations, legs, expires_at FROM route_cache WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None:
+                    distance, duration, blob, durations, legs, expires_at = row
+                    if expires_at > now:
+                        conn.execute("UPDATE route_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        conn.commit()
+                        self._counters["hits"] += 1
+                        return _expand_route(distance, duration, unpack_coordinates(blob), json.loads(legs),
+                                             unpack_durations(durations))
+                    conn.execute("DELETE FROM route_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    self._counters["expired"] += 1
+            except (sqlite3.Error, zlib.error):
+                self._counters["disk_errors"] += 1
+            self._counters["misses"] += 1
+        return None
+
+    def set(self, coordinates: Sequence[Tuple[float, float]], route: Dict) -> None:
+        geometry = route.get("geometry") or {}
+        coords = geometry.get("coordinates")
+        if coords is None or len(coords) == 0:
+            return
+        key = self.key(coordinates)
+        now = time.time()
+        blob = pack_coordinates(coords)
+        durations = pack_durations(route.get("legs", []))
+        legs = []
+        end = 0
+        for leg in route.get("legs", []):
+            end += max(len(leg["geometry"]["coordinates"]) - 1, 0)
+            legs.append({"distance": leg.get("distance", 0), "duration": leg.get("duration", 0), "end": end})
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO route_cache "
+                    "(key, distance, duration, geometry, durations, legs, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, route.get("distance", 0), route.get("duration", 0), blob, durations,
+                     json.dumps(legs, separators=(",", ":")), len(blob) + len(durations),
+                     now + self.ttl_seconds, now)
+                )
+                self._counters["stores"] += 1
+                self._counters["bytes_stored"] += len(blob) + len(durations)
+                self._bytes_since_evict += len(blob) + len(durations)
+                if self._bytes_since_evict >= self.max_bytes // 100:
+                    self._evict(conn, now)
+                conn.commit()
+            except sqlite3.Error:
+                self._counters["disk_errors"] += 1
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        self._bytes_since_evict = 0
+        removed = conn.execute("DELETE FROM route_cache WHERE expires_at <= ?", (now,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM route_cache").fetchone()[0]
+        if total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM route_cache ORDER BY accessed_at").fetchall()
+            doomed = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM route_cache WHERE key = ?", doomed)
+            removed += len(doomed)
+        self._counters["evictions"] += max(0, removed)
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    conn.execute("DELETE FROM route_cache")
+                    conn.commit()
+                except sqlite3.Error:
+                    self._counters["disk_errors"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    entries, size = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM route_cache"
+                    ).fetchone()
+                    counters["entries"] = entries
+                    counters["size_bytes"] = size
+                except sqlite3.Error:
+                    counters["disk_errors"] += 1
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+        return counters
+
+
+_cache: Optional[RouteCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_route_cache() -> RouteCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = getattr(settings, "ROUTE_CACHE", {})
+                _cache = RouteCache(
+                    path=config.get("PATH"),
+                    precision=config.get("PRECISION", DEFAULT_PRECISION),
+                    max_bytes=config.get("MAX_BYTES", DEFAULT_MAX_BYTES),
+                    ttl_seconds=config.get("TTL_SECONDS", DEFAULT_TTL_SECONDS),
+                )
+    return _cache
@@ -1,77 +1,43 @@
-import requests
+import asyncio
 import math
+import os
+import threading
 import time
-import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
 
+import numpy as np
+from django.conf import settings
+
+from .geocoders import get_geocoder
+from .http_client import FetchResult, fetch_json, fetch_json_async
+from .metrics import timed
+from .poi_index import FUEL_KINDS, snap_stop
+from .polyline import decode_polyline
+from .road_graph import METERS_PER_MILE, RoadGraph
+from .route_cache import get_route_cache
+from .route_geometry import RouteGeometry, coordinate_array, point_on_segment
+
 OSRM_BASE_URL = "https://router.project-osrm.org/route/v1/driving"
+# polyline6 sends the full overview geometry as one string rather than a list per
+# vertex; the per-edge durations also tell how many edges of it each leg has.
+OSRM_PARAMS = {"overview": "full", "geometries": "polyline6", "annotations": "duration"}
+# Only for legs without a routed duration (straight-line fallbacks).
 AVERAGE_SPEED_MPH = 60
 FUEL_STOP_INTERVAL_MILES = 1000
+DEFAULT_ROUTER_BACKENDS = ["local", "osrm"]
+DEFAULT_MAX_SNAP_MILES = 10
 
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
 
-def parse_coordinates(address: str) -> Optional[Tuple[float, float]]:
-    coords_pattern = r'(-?\d+\.?\d*),\s*(-?\d+\.?\d*)'
-    match = re.search(coords_pattern, address)
-    if match:
-        try:
-            val1 = float(match.group(1))
-            val2 = float(match.group(2))
-            
-            if -90 <= val1 <= 90 and -180 <= val2 <= 180:
-                return (val2, val1)
-            elif -180 <= val1 <= 180 and -90 <= val2 <= 90:
-                return (val1, val2)
-            elif abs(val1) <= 180 and abs(val2) <= 90:
-                if abs(val1) > abs(val2):
-                    return (val1, val2)
-                else:
-                    return (val2, val1)
-        except ValueError:
-            pass
-    return None
+# False once the road graph was found missing or unreadable, so it is not retried.
+_road_graph = None
+_road_graph_lock = threading.Lock()
 
 
 def geocode_address(address: str) -> Optional[Tuple[float, float]]:
-    if not address or not address.strip():
-        return None
-    
-    coords = parse_coordinates(address)
-    if coords:
-        lon, lat = coords
-        if -180 <= lon <= 180 and -90 <= lat <= 90:
-            return coords
-        else:
-            return None
-    
-    try:
-        time.sleep(1)
-        response = requests.get(
-            "https://nominatim.openstreetmap.org/search",
-            params={
-                "q": address.strip(),
-                "format": "json",
-                "limit": 1,
-                "addressdetails": 0
-            },
-            headers={
-                "User-Agent": "ELD-Log-Generator/1.0",
-                "Accept-Language": "en"
-            },
-            timeout=15
-        )
-        response.raise_for_status()
-        data = response.json()
-        if data and len(data) > 0:
-            lon = float(data[0]["lon"])
-            lat = float(data[0]["lat"])
-            return (lon, lat)
-    except requests.exceptions.RequestException as e:
-        pass
-    except (ValueError, KeyError, IndexError):
-        pass
-    except Exception:
-        pass
-    return None
+    return get_geocoder().geocode(address)
 
 
 def calculate_distance_haversine(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
@@ -83,198 +49,398 @@ def calculate_distance_haversine(lon1: float, lat1: float, lon2: float, lat2: fl
     return R * c
 
 
+def _leg_boundaries(route: Dict, coords: np.ndarray, waypoint_locations: List[List[float]]) -> List[int]:
+    """Vertex index in the overview geometry ``coords`` where each leg starts, plus the last vertex."""
+    legs = route.get("legs", [])
+    lengths = [len(_leg_annotation(leg, "duration") or ()) for leg in legs]
+    if legs and all(lengths) and sum(lengths) + 1 == len(coords):
+        boundaries = [0]
+        for length in lengths:
+            boundaries.append(boundaries[-1] + length)
+        return boundaries
+
+    # Without usable annotations, cut at the vertex nearest each snapped waypoint.
+    boundaries = [0]
+    start = 0
+    for location in waypoint_locations[1:-1]:
+        offsets = coords[start:] - np.asarray(location, dtype=np.float64)
+        best_index = start + int(np.argmin(np.einsum("ij,ij->i", offsets, offsets)))
+        boundaries.append(best_index)
+        start = best_index
+    boundaries.append(len(coords) - 1)
+    return boundaries
+
+
+def _leg_annotation(leg: Dict, key: str, edges: Optional[int] = None) -> Optional[List[float]]:
+    """The leg's per-edge ``annotation[key]``, or ``None`` when missing or (given ``edges``) the wrong length."""
+    values = (leg.get("annotation") or {}).get(key)
+    if not values or (edges is not None and len(values) != edges):
+        return None
+    return values
+
+
+def _overview_coordinates(geometry) -> np.ndarray:
+    """``(n, 2)`` lon/lat array of an OSRM overview geometry, encoded as polyline6 or GeoJSON."""
+    if isinstance(geometry, str):
+        return decode_polyline(geometry, precision=6)
+    return coordinate_array(geometry["coordinates"])
+
+
+def _normalize_osrm_route(data: Dict) -> Dict:
+    """The parts of an OSRM ``route`` response the pipeline uses, with the geometry in one buffer.
+
+    The overview coordinates are decoded into a single ``(n, 2)`` float64
+    array and each leg's geometry is a view of its slice of it, so the
+    route's vertices are stored once however many places refer to them.
+    """
+    route = data["routes"][0]
+    coords = _overview_coordinates(route["geometry"])
+    waypoint_locations = [waypoint.get("location") for waypoint in data.get("waypoints", [])]
+    boundaries = _leg_boundaries(route, coords, waypoint_locations)
+    legs = []
+    for leg_index, leg in enumerate(route.get("legs", [])):
+        start, end = boundaries[leg_index], boundaries[leg_index + 1]
+        durations = _leg_annotation(leg, "duration", end - start)
+        legs.append({
+            "distance": leg.get("distance", 0),
+            "duration": leg.get("duration", 0),
+            "geometry": {"type": "LineString", "coordinates": coords[start:end + 1]},
+            "durations": None if durations is None else np.asarray(durations, dtype=np.float64)
+        })
+    return {
+        "distance": route.get("distance", 0),
+        "duration": route.get("duration", 0),
+        "geometry": {"type": "LineString", "coordinates": coords},
+        "legs": legs
+    }
+
+
+def _osrm_url(coordinates: List[Tuple[float, float]]) -> str:
+    return f"{OSRM_BASE_URL}/" + ";".join(f"{lon},{lat}" for lon, lat in coordinates)
+
+
+def _osrm_result(coordinates: List[Tuple[float, float]], result: FetchResult) -> FetchResult:
+    """Normalize and cache a successful OSRM response, or explain why it failed."""
+    data = result.data
+    if result.ok and isinstance(data, dict) and data.get("code") == "Ok" and data.get("routes"):
+        result.data = _normalize_osrm_route(data)
+        get_route_cache().set(coordinates, result.data)
+        return result
+
+    # OSRM explains refusals (NoRoute, InvalidQuery...) in the JSON body.
+    if isinstance(data, dict) and (data.get("message") or data.get("code")):
+        result.error = data.get("message") or data.get("code")
+    elif result.ok:
+        result.error = "Unexpected OSRM response"
+    result.ok = False
+    result.data = None
+    return result
+
+
+def fetch_route_from_osrm(coordinates: List[Tuple[float, float]]) -> FetchResult:
+    """Fetch one OSRM route through all ``coordinates`` in order.
+
+    The returned route has one entry in ``legs`` per consecutive pair of
+    coordinates, each with its own slice of the overview geometry.
+    """
+    url = _osrm_url(coordinates)
+    cached_route = get_route_cache().get(coordinates)
+    if cached_route:
+        return FetchResult(url=url, ok=True, data=cached_route, cached=True)
+    return _osrm_result(coordinates, fetch_json(url, params=OSRM_PARAMS, service="osrm"))
+
+
+async def fetch_route_from_osrm_async(coordinates: List[Tuple[float, float]]) -> FetchResult:
+    """:func:`fetch_route_from_osrm` on the event loop.
+
+    The route cache (SQLite behind a thread lock, zlib) and normalizing the
+    response run on the loop's default executor, so a busy cache never
+    stalls other requests.
+    """
+    loop = asyncio.get_running_loop()
+    url = _osrm_url(coordinates)
+    cached_route = await loop.run_in_executor(None, get_route_cache().get, coordinates)
+    if cached_route:
+        return FetchResult(url=url, ok=True, data=cached_route, cached=True)
+    result = await fetch_json_async(url, params=OSRM_PARAMS, service="osrm")
+    return await loop.run_in_executor(None, _osrm_result, coordinates, result)
+
+
+def get_road_graph() -> Optional[RoadGraph]:
+    """The local road graph (``ROAD_GRAPH_PATH``), opened once per process."""
+    global _road_graph
+    if _road_graph is None:
+        with _road_graph_lock:
+            if _road_graph is None:
+                path = getattr(settings, "ROAD_GRAPH_PATH", None)
+                graph = False
+                if path and os.path.exists(path):
+                    try:
+                        graph = RoadGraph(path)
+                    except (OSError, ValueError):
+                        graph = False
+                _road_graph = graph
+    return _road_graph or None
+
+
+def fetch_route_local(coordinates: List[Tuple[float, float]]) -> FetchResult:
+    """:func:`fetch_route_from_osrm` answered from the local road graph, without any I/O."""
+    graph = get_road_graph()
+    if graph is None:
+        return FetchResult(url="local", ok=False, error="No road graph loaded")
+    started = time.monotonic()
+    max_snap_miles = getattr(settings, "ROAD_GRAPH_MAX_SNAP_MILES", DEFAULT_MAX_SNAP_MILES)
+    data = graph.route(coordinates, max_snap_miles * METERS_PER_MILE)
+    result = FetchResult(url=f"local:{graph.path}", ok=data["code"] == "Ok", attempts=1,
+                         elapsed=time.monotonic() - started)
+    if result.ok:
+        result.data = _normalize_osrm_route(data)
+        result.data["source"] = "local"
+    else:
+        result.error = data["message"]
+    return result
+
+
+ROUTERS = {
+    "local": fetch_route_local,
+    "osrm": fetch_route_from_osrm,
+}
+
+
+def _router_backends() -> List[str]:
+    names = getattr(settings, "ROUTER_BACKENDS", DEFAULT_ROUTER_BACKENDS)
+    for name in names:
+        if name not in ROUTERS:
+            raise ValueError(f"Unknown router backend: {name}")
+    return names
+
+
+def fetch_route(coordinates: List[Tuple[float, float]]) -> FetchResult:
+    """Route through ``coordinates`` with the first ``ROUTER_BACKENDS`` entry that succeeds.
+
+    A local graph that does not cover the trip falls through to OSRM; when
+    every backend fails the last failure is returned.
+    """
+    result = FetchResult(url="", ok=False, error="No routing backend configured")
+    for name in _router_backends():
+        result = ROUTERS[name](coordinates)
+        if result.ok:
+            return result
+    return result
+
+
+async def fetch_route_async(coordinates: List[Tuple[float, float]]) -> FetchResult:
+    result = FetchResult(url="", ok=False, error="No routing backend configured")
+    loop = asyncio.get_running_loop()
+    for name in _router_backends():
+        if name == "osrm":
+            result = await fetch_route_from_osrm_async(coordinates)
+        else:
+            # The graph search is CPU-bound; keep it off the event loop.
+            result = await loop.run_in_executor(None, ROUTERS[name], coordinates)
+        if result.ok:
+            return result
+    return result
+
+
 def get_route_from_osrm(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> Optional[Dict]:
-    try:
-        url = f"{OSRM_BASE_URL}/{coord1[0]},{coord1[1]};{coord2[0]},{coord2[1]}"
-        params = {"overview": "full", "geometries": "geojson", "steps": "true"}
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-        if data.get("code") == "Ok" and data.get("routes"):
-            return data["routes"][0]
-    except Exception:
-        pass
-    return None
+    result = fetch_route_from_osrm([coord1, coord2])
+    return result.data if result.ok else None
 
 
 def estimate_driving_time(distance_miles: float) -> float:
     return distance_miles / AVERAGE_SPEED_MPH
 
 
-def calculate_route(current: str, pickup: str, dropoff: str) -> Dict:
-    current_coords = geocode_address(current)
-    pickup_coords = geocode_address(pickup)
-    dropoff_coords = geocode_address(dropoff)
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "ROUTE_FANOUT_WORKERS", 8),
+                    thread_name_prefix="route-fanout"
+                )
+    return _executor
+
 
+def geocode_many(addresses: List[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+    """Geocode distinct addresses concurrently; duplicates are resolved once."""
+    unique = list(dict.fromkeys(addresses))
+    if len(unique) == 1:
+        return {unique[0]: geocode_address(unique[0])}
+    results = _get_executor().map(geocode_address, unique)
+    return dict(zip(unique, results))
+
+
+async def geocode_many_async(addresses: List[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+    """:func:`geocode_many` on the event loop instead of the thread pool."""
+    unique = list(dict.fromkeys(addresses))
+    results = await asyncio.gather(*(get_geocoder().geocode_async(address) for address in unique))
+    return dict(zip(unique, results))
+
+
+def _build_segment(from_label: str, to_label: str, from_coords: Tuple[float, float],
+                   to_coords: Tuple[float, float], leg: Optional[Dict], result: FetchResult) -> Dict:
+    if leg:
+        distance_km = leg.get("distance", 0) / 1000
+        distance_miles = distance_km * 0.621371
+        geometry = leg.get("geometry", {})
+        route_geometry = RouteGeometry.from_geometry(geometry, leg.get("durations"))
+        driving_time_hours = (leg.get("duration") or 0) / 3600 or estimate_driving_time(distance_miles)
+        route_source = "cache" if result.cached else result.data.get("source", "osrm")
+    else:
+        distance_miles = calculate_distance_haversine(
+            from_coords[0], from_coords[1],
+            to_coords[0], to_coords[1]
+        )
+        driving_time_hours = estimate_driving_time(distance_miles)
+        geometry = None
+        route_geometry = None
+        route_source = "straight_line"
+    return {
+        "from": from_label,
+        "to": to_label,
+        "distance_miles": distance_miles,
+        "driving_time_hours": driving_time_hours,
+        "coordinates": [from_coords, to_coords],
+        "geometry": geometry,
+        "route_geometry": route_geometry,
+        "route_source": route_source,
+        "route_error": result.error
+    }
+
+
+def fetch_routes_many(coordinate_lists: List[List[Tuple[float, float]]]) -> List[FetchResult]:
+    """Fetch routes for several waypoint lists concurrently; identical lanes are fetched once."""
+    lanes = list(dict.fromkeys(tuple(coordinates) for coordinates in coordinate_lists))
+    results = dict(zip(lanes, _get_executor().map(lambda lane: fetch_route(list(lane)), lanes)))
+    return [results[tuple(coordinates)] for coordinates in coordinate_lists]
+
+
+def check_geocoded(current: str, stops: List[Dict], coordinates: List[Optional[Tuple[float, float]]]) -> None:
+    """Raise ``ValueError`` naming every location that could not be geocoded."""
     failed_addresses = []
-    if not current_coords:
+    if not coordinates[0]:
         failed_addresses.append(f"Current location: '{current}'")
-    if not pickup_coords:
-        failed_addresses.append(f"Pickup location: '{pickup}'")
-    if not dropoff_coords:
-        failed_addresses.append(f"Dropoff location: '{dropoff}'")
+    for stop, coords in zip(stops, coordinates[1:]):
+        if not coords:
+            failed_addresses.append(f"{stop['type'].title()} location: '{stop['location']}'")
     
     if failed_addresses:
         error_msg = "Unable to geocode the following addresses:\n" + "\n".join(failed_addresses)
         error_msg += "\n\nPlease try:\n- Using more specific addresses (include city and state)\n- Using coordinates in format 'longitude, latitude'\n- Checking spelling"
         raise ValueError(error_msg)
 
-    segments = []
-    total_distance = 0
-    waypoints = [current_coords]
-    polylines = []
 
-    leg1_route = get_route_from_osrm(current_coords, pickup_coords)
-    if leg1_route:
-        distance_km = leg1_route.get("distance", 0) / 1000
-        distance_miles = distance_km * 0.621371
-        total_distance += distance_miles
-        segments.append({
-            "from": current,
-            "to": pickup,
-            "distance_miles": distance_miles,
-            "driving_time_hours": estimate_driving_time(distance_miles),
-            "coordinates": [current_coords, pickup_coords],
-            "geometry": leg1_route.get("geometry", {})
-        })
-        polylines.append(leg1_route.get("geometry", {}))
-        waypoints.append(pickup_coords)
-    else:
-        distance_miles = calculate_distance_haversine(
-            current_coords[0], current_coords[1],
-            pickup_coords[0], pickup_coords[1]
-        )
-        total_distance += distance_miles
-        segments.append({
-            "from": current,
-            "to": pickup,
-            "distance_miles": distance_miles,
-            "driving_time_hours": estimate_driving_time(distance_miles),
-            "coordinates": [current_coords, pickup_coords],
-            "geometry": None
-        })
-        waypoints.append(pickup_coords)
+def build_route_data(current: str, stops: List[Dict], coordinates: List[Tuple[float, float]],
+                     result: FetchResult) -> Dict:
+    """Turn a geocoded trip and its routing result into the route dict used downstream."""
+    locations = [current] + [stop["location"] for stop in stops]
+    legs = result.data["legs"] if result.ok else []
+    if len(legs) != len(stops):
+        legs = [None] * len(stops)
 
-    leg2_route = get_route_from_osrm(pickup_coords, dropoff_coords)
-    if leg2_route:
-        distance_km = leg2_route.get("distance", 0) / 1000
-        distance_miles = distance_km * 0.621371
-        total_distance += distance_miles
-        segments.append({
-            "from": pickup,
-            "to": dropoff,
-            "distance_miles": distance_miles,
-            "driving_time_hours": estimate_driving_time(distance_miles),
-            "coordinates": [pickup_coords, dropoff_coords],
-            "geometry": leg2_route.get("geometry", {})
-        })
-        polylines.append(leg2_route.get("geometry", {}))
-        waypoints.append(dropoff_coords)
-    else:
-        distance_miles = calculate_distance_haversine(
-            pickup_coords[0], pickup_coords[1],
-            dropoff_coords[0], dropoff_coords[1]
+    segments = []
+    for leg_index, stop in enumerate(stops):
+        segment = _build_segment(
+            locations[leg_index], stop["location"],
+            coordinates[leg_index], coordinates[leg_index + 1],
+            legs[leg_index], result
         )
-        total_distance += distance_miles
-        segments.append({
-            "from": pickup,
-            "to": dropoff,
-            "distance_miles": distance_miles,
-            "driving_time_hours": estimate_driving_time(distance_miles),
-            "coordinates": [pickup_coords, dropoff_coords],
-            "geometry": None
-        })
-        waypoints.append(dropoff_coords)
+        segment["stop_type"] = stop["type"]
+        segments.append(segment)
+
+    total_distance = sum(segment["distance_miles"] for segment in segments)
+    polylines = [segment["geometry"] for segment in segments if segment["geometry"] is not None]
 
     fuel_stops = calculate_fuel_stops(segments)
 
     return {
         "segments": segments,
         "total_distance_miles": total_distance,
-        "total_driving_time_hours": estimate_driving_time(total_distance),
-        "waypoints": waypoints,
+        "total_driving_time_hours": sum(segment["driving_time_hours"] for segment in segments),
+        "waypoints": coordinates,
+        "stops": stops,
         "polylines": polylines,
         "fuel_stops": fuel_stops
     }
 
 
+def calculate_route(current: str, stops: List[Dict]) -> Dict:
+    """Route from ``current`` through the ordered ``stops`` in one routing request.
+
+    Each stop is ``{"location": str, "type": "pickup" | "dropoff"}``; the
+    segment ending at a stop carries its type as ``stop_type``.
+    """
+    locations = [current] + [stop["location"] for stop in stops]
+    with timed("geocode"):
+        resolved = geocode_many(locations)
+    coordinates = [resolved[location] for location in locations]
+    check_geocoded(current, stops, coordinates)
+    with timed("routing"):
+        result = fetch_route(coordinates)
+    with timed("route_build"):
+        return build_route_data(current, stops, coordinates, result)
+
+
+async def resolve_route_async(current: str, stops: List[Dict]) -> Tuple[List[Tuple[float, float]], FetchResult]:
+    """The I/O half of :func:`calculate_route`: geocoded waypoints and the routing result.
+
+    Feed both to :func:`build_route_data` for the route dict.
+    """
+    locations = [current] + [stop["location"] for stop in stops]
+    with timed("geocode"):
+        resolved = await geocode_many_async(locations)
+    coordinates = [resolved[location] for location in locations]
+    check_geocoded(current, stops, coordinates)
+    with timed("routing"):
+        return coordinates, await fetch_route_async(coordinates)
+
+
 def get_point_along_geometry(geometry: Dict, ratio: float) -> Optional[Tuple[float, float]]:
     """Get a point along the route geometry at the given ratio (0.0 to 1.0)."""
-    if not geometry or "coordinates" not in geometry:
-        return None
-    
-    coords = geometry["coordinates"]
-    if not coords or len(coords) < 2:
+    route_geometry = RouteGeometry.from_geometry(geometry)
+    if route_geometry is None:
         return None
-    
-    total_distance = 0
-    segment_distances = []
-    
-    for i in range(len(coords) - 1):
-        lon1, lat1 = coords[i]
-        lon2, lat2 = coords[i + 1]
-        dist = calculate_distance_haversine(lon1, lat1, lon2, lat2)
-        segment_distances.append(dist)
-        total_distance += dist
-    
-    if total_distance == 0:
-        return None
-    
-    target_distance = total_distance * ratio
-    current_distance = 0
-    
-    for i, seg_dist in enumerate(segment_distances):
-        if current_distance + seg_dist >= target_distance:
-            seg_ratio = (target_distance - current_distance) / seg_dist if seg_dist > 0 else 0
-            lon1, lat1 = coords[i]
-            lon2, lat2 = coords[i + 1]
-            lon = lon1 + seg_ratio * (lon2 - lon1)
-            lat = lat1 + seg_ratio * (lat2 - lat1)
-            return (lon, lat)
-        current_distance += seg_dist
-    
-    return tuple(coords[-1])
+    return route_geometry.point_at_ratio(ratio)
 
 
 def calculate_fuel_stops(segments: List[Dict]) -> List[Dict]:
+    """A fuel stop every ``FUEL_STOP_INTERVAL_MILES``, counted from the previous stop.
+
+    With a facility index loaded, each stop moves back to the last truck stop
+    or fuel station within reach of its mile, and carries its ``facility``.
+    """
     fuel_stops = []
-    cumulative_distance = 0
+    next_stop_mile = FUEL_STOP_INTERVAL_MILES
+    segment_start_distance = 0
 
     for seg_idx, segment in enumerate(segments):
         segment_distance = segment["distance_miles"]
-        segment_start_distance = cumulative_distance
-        cumulative_distance += segment_distance
-
-        stops_needed = math.floor(cumulative_distance / FUEL_STOP_INTERVAL_MILES) - math.floor(segment_start_distance / FUEL_STOP_INTERVAL_MILES)
-
-        for i in range(stops_needed):
-            stop_mile = (math.floor(cumulative_distance / FUEL_STOP_INTERVAL_MILES)) * FUEL_STOP_INTERVAL_MILES
-            distance_into_segment = stop_mile - segment_start_distance
-
-            if 0 < distance_into_segment <= segment_distance:
-                ratio = distance_into_segment / segment_distance if segment_distance > 0 else 0
-                
-                geometry = segment.get("geometry")
-                if geometry and "coordinates" in geometry:
-                    point = get_point_along_geometry(geometry, ratio)
-                    if point:
-                        lon, lat = point
-                        fuel_stops.append({
-                            "location": {"lon": lon, "lat": lat},
-                            "mile_marker": stop_mile,
-                            "segment_index": seg_idx
-                        })
-                        continue
-                
-                coords = segment["coordinates"]
-                if len(coords) == 2:
-                    lon = coords[0][0] + ratio * (coords[1][0] - coords[0][0])
-                    lat = coords[0][1] + ratio * (coords[1][1] - coords[0][1])
-                    fuel_stops.append({
-                        "location": {"lon": lon, "lat": lat},
-                        "mile_marker": stop_mile,
-                        "segment_index": seg_idx
-                    })
 
-    return fuel_stops
+        while segment_distance > 0 and next_stop_mile <= segment_start_distance + segment_distance:
+            ratio = (next_stop_mile - segment_start_distance) / segment_distance
+            stop_mile = next_stop_mile
+            facility = snap_stop(segment, ratio, FUEL_KINDS)
+            if facility is not None and facility["ratio"] > 0:
+                ratio = facility["ratio"]
+                stop_mile = segment_start_distance + ratio * segment_distance
+                location = {"lon": facility["lon"], "lat": facility["lat"]}
+            else:
+                facility = None
+                location = point_on_segment(segment, ratio)
+            next_stop_mile = stop_mile + FUEL_STOP_INTERVAL_MILES
+            if location:
+                fuel_stop = {
+                    "location": location,
+                    "mile_marker": stop_mile,
+                    "segment_index": seg_idx
+                }
+                if facility is not None:
+                    fuel_stop["facility"] = facility["name"]
+                fuel_stops.append(fuel_stop)
 
+        segment_start_distance += segment_distance
+
+    return fuel_stops
@@ -0,0 +1,154 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3959
+
+
+def haversine_miles(lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+    """Distances between consecutive vertices, in miles."""
+    lon_r = np.radians(lons)
+    lat_r = np.radians(lats)
+    dlat = np.diff(lat_r)
+    dlon = np.diff(lon_r)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat_r[:-1]) * np.cos(lat_r[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
+
+
+def coordinate_array(coordinates: Sequence[Sequence[float]]) -> np.ndarray:
+    """``coordinates`` as an ``(n, 2)`` float64 lon/lat array; arrays already in that form are returned as is."""
+    return np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+
+
+class RouteGeometry:
+    """A polyline with precomputed cumulative distances and, when known, travel times.
+
+    Built once per route segment; every lookup afterwards is a binary search
+    over ``cumulative_miles`` (or ``cumulative_seconds``) plus one linear
+    interpolation. ``durations`` are the routing engine's seconds per edge,
+    one per pair of consecutive vertices; without them travel time is taken
+    to be proportional to distance.
+
+    Given an ``(n, 2)`` float64 array, such as a leg's slice of the route's
+    coordinate buffer, ``lons`` and ``lats`` are views into it, not copies.
+    """
+
+    __slots__ = ("lons", "lats", "cumulative_miles", "length_miles", "cumulative_seconds")
+
+    def __init__(self, coordinates: Sequence[Sequence[float]], durations: Optional[Sequence[float]] = None):
+        coords = coordinate_array(coordinates)
+        self.lons = coords[:, 0]
+        self.lats = coords[:, 1]
+        self.cumulative_miles = np.zeros(len(coords))
+        if len(coords) > 1:
+            np.cumsum(haversine_miles(self.lons, self.lats), out=self.cumulative_miles[1:])
+        self.length_miles = float(self.cumulative_miles[-1]) if len(coords) else 0.0
+
+        self.cumulative_seconds = None
+        if durations is not None and len(durations) == len(coords) - 1 and len(coords) > 1:
+            cumulative_seconds = np.zeros(len(coords))
+            np.cumsum(np.maximum(np.asarray(durations, dtype=np.float64), 0), out=cumulative_seconds[1:])
+            if cumulative_seconds[-1] > 0:
+                self.cumulative_seconds = cumulative_seconds
+
+    @classmethod
+    def from_geometry(cls, geometry: Optional[Dict],
+                      durations: Optional[Sequence[float]] = None) -> Optional["RouteGeometry"]:
+        coordinates = geometry.get("coordinates") if geometry else None
+        if coordinates is None or len(coordinates) < 2:
+            return None
+        return cls(coordinates, durations)
+
+    def __len__(self) -> int:
+        return len(self.lons)
+
+    def point_at_mile(self, mile: float) -> Optional[Tuple[float, float]]:
+        """Point ``mile`` miles along the polyline, clamped to its ends."""
+        if self.length_miles == 0:
+            return None
+        if mile >= self.length_miles:
+            return (float(self.lons[-1]), float(self.lats[-1]))
+        mile = max(mile, 0.0)
+        # First vertex whose cumulative distance reaches ``mile``; the point lies
+        # on the edge that ends there.
+        end = int(np.searchsorted(self.cumulative_miles, mile, side="left"))
+        if end == 0:
+            return (float(self.lons[0]), float(self.lats[0]))
+        start = end - 1
+        edge = self.cumulative_miles[end] - self.cumulative_miles[start]
+        t = (mile - self.cumulative_miles[start]) / edge if edge > 0 else 0.0
+        lon = self.lons[start] + t * (self.lons[end] - self.lons[start])
+        lat = self.lats[start] + t * (self.lats[end] - self.lats[start])
+        return (float(lon), float(lat))
+
+    def point_at_ratio(self, ratio: float) -> Optional[Tuple[float, float]]:
+        """Point at ``ratio`` (0.0 to 1.0) of the polyline's length."""
+        return self.point_at_mile(self.length_miles * ratio)
+
+    def ratio_at_time(self, time_ratio: float) -> float:
+        """Share of the length covered after ``time_ratio`` (0.0 to 1.0) of the travel time."""
+        if self.cumulative_seconds is None or self.length_miles == 0:
+            return time_ratio
+        return _interpolate(self.cumulative_seconds, self.cumulative_miles, time_ratio) / self.length_miles
+
+    def time_at_ratio(self, ratio: float) -> float:
+        """Share of the travel time spent reaching ``ratio`` of the length; the inverse of :meth:`ratio_at_time`."""
+        if self.cumulative_seconds is None or self.length_miles == 0:
+            return ratio
+        return _interpolate(self.cumulative_miles, self.cumulative_seconds, ratio) / self.cumulative_seconds[-1]
+
+
+def _interpolate(keys: np.ndarray, values: np.ndarray, ratio: float) -> float:
+    """``values`` where ``keys`` reaches ``ratio`` of its total; both are cumulative sums."""
+    key = min(max(ratio, 0.0), 1.0) * keys[-1]
+    end = int(np.searchsorted(keys, key, side="left"))
+    if end == 0:
+        return float(values[0])
+    start = end - 1
+    span = keys[end] - keys[start]
+    t = (key - keys[start]) / span if span > 0 else 0.0
+    return float(values[start] + t * (values[end] - values[start]))
+
+
+def segment_geometry(segment: Dict) -> Optional[RouteGeometry]:
+    """The segment's :class:`RouteGeometry`, built on first use and kept on the segment."""
+    if "route_geometry" not in segment:
+        segment["route_geometry"] = RouteGeometry.from_geometry(segment.get("geometry"))
+    return segment["route_geometry"]
+
+
+def ratio_at_seconds(segment: Dict, seconds: float, duration: float) -> float:
+    """Share of the segment's distance driven after ``seconds`` of its ``duration``."""
+    if duration <= 0:
+        return 0.0
+    geometry = segment_geometry(segment)
+    time_ratio = min(max(seconds / duration, 0.0), 1.0)
+    return time_ratio if geometry is None else geometry.ratio_at_time(time_ratio)
+
+
+def seconds_at_ratio(segment: Dict, ratio: float, duration: float) -> int:
+    """Seconds of driving into the segment at ``ratio`` of its distance; the inverse of :func:`ratio_at_seconds`."""
+    geometry = segment_geometry(segment)
+    ratio = min(max(ratio, 0.0), 1.0)
+    return round((ratio if geometry is None else geometry.time_at_ratio(ratio)) * duration)
+
+
+def point_on_segment(segment: Dict, ratio: float) -> Optional[Dict]:
+    """``{"lon", "lat"}`` at ``ratio`` of the segment, along its road geometry when known."""
+    geometry = segment_geometry(segment)
+    if geometry is not None:
+        point = geometry.point_at_ratio(ratio)
+        if point:
+            return {"lon": point[0], "lat": point[1]}
+
+    coords = segment.get("coordinates", [])
+    if len(coords) == 2:
+        lon = coords[0][0] + ratio * (coords[1][0] - coords[0][0])
+        lat = coords[0][1] + ratio * (coords[1][1] - coords[0][1])
+        return {"lon": lon, "lat": lat}
+    return None
+
+
+def point_at_seconds(segment: Dict, seconds: float, duration: float) -> Optional[Dict]:
+    """:func:`point_on_segment` after ``seconds`` of driving the segment's ``duration``."""
+    return point_on_segment(segment, ratio_at_seconds(segment, seconds, duration))
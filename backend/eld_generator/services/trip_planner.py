@@ -0,0 +1,458 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dateutil import tz
+
+from .departure_sweep import departure_times, sweep_departures
+from .eld_calculator import plan_eld_entries
+from .log_generator import generate_daily_logs, iter_daily_logs
+from .metrics import timed
+from .polyline import format_polylines
+from .process_pool import map_in_pool, reset_process_pool, run_in_pool
+from .route_calculator import (
+    build_route_data,
+    calculate_route,
+    check_geocoded,
+    fetch_routes_many,
+    geocode_address,
+    geocode_many,
+    resolve_route_async,
+)
+
+# Segment keys the HOS simulation reads; everything else stays in the parent.
+HOS_SEGMENT_KEYS = ("from", "to", "distance_miles", "driving_time_hours", "coordinates",
+                    "route_geometry", "stop_type")
+
+
+def normalize_start_time(start_time_str: Optional[str]) -> str:
+    """ISO start time for the logs; missing or unparseable input means now.
+
+    "Now" is rounded down to the minute, so requests without a start time
+    share a plan cache key for that minute instead of each writing an entry
+    that can never be hit.
+    """
+    now = datetime.now(tz.UTC).replace(second=0, microsecond=0)
+    if not start_time_str:
+        start_time = now
+    else:
+        try:
+            start_time = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
+            if start_time.tzinfo is None:
+                start_time = start_time.replace(tzinfo=tz.UTC)
+        except Exception:
+            start_time = now
+
+    return start_time.isoformat().replace('+00:00', 'Z')
+
+
+def _duration_hours(entry: Dict) -> float:
+    return (datetime.fromisoformat(entry["end_time"].replace('Z', '+00:00')) -
+            datetime.fromisoformat(entry["start_time"].replace('Z', '+00:00'))).total_seconds() / 3600
+
+
+def _stop_label(trip_stops: List[Dict], index: int) -> str:
+    stop_type = trip_stops[index]["type"]
+    same_type = [i for i, trip_stop in enumerate(trip_stops) if trip_stop["type"] == stop_type]
+    label = stop_type.title()
+    if len(same_type) > 1:
+        label += f" {same_type.index(index) + 1}"
+    return label
+
+
+def generate_logs(route_data: Dict, current_location: str, trip_stops: List[Dict],
+                  current_cycle_used: Optional[float], start_time_str: str, hos_planner: str = "greedy",
+                  hos_state: Optional[str] = None) -> Tuple[List[Dict], List[Dict], Dict]:
+    """ELD entries, daily log sheets and the ``hos_*`` response fields (see :func:`plan_eld_entries`)."""
+    with timed("eld_entries"):
+        log_entries, hos = plan_eld_entries(
+            route_data, current_cycle_used, start_time_str, hos_planner, hos_state
+        )
+    with timed("daily_logs"):
+        daily_logs = generate_daily_logs(
+            log_entries,
+            current_location,
+            trip_stops[0]["location"],
+            trip_stops[-1]["location"]
+        )
+    return log_entries, daily_logs, hos
+
+
+def _trip_stops(route_data: Dict, log_entries: List[Dict]) -> List[Dict]:
+    """Rest, break and fuel stops to show on the map."""
+    stops = []
+
+    for entry in log_entries:
+        if entry.get("reason"):
+            stop_type = "rest" if "rest" in entry.get("reason", "").lower() or "break" in entry.get("reason", "").lower() else "other"
+            if stop_type == "rest" or entry.get("duty_status") == "off_duty":
+                entry_coords = None
+
+                if "coordinates" in entry and entry["coordinates"]:
+                    entry_coords = entry["coordinates"]
+                elif "location" in entry:
+                    location_str = entry["location"]
+                    try:
+                        geocode_attempt = geocode_address(location_str)
+                        if geocode_attempt:
+                            entry_coords = {"lon": geocode_attempt[0], "lat": geocode_attempt[1]}
+                    except Exception:
+                        pass
+
+                if entry_coords:
+                    stops.append({
+                        "type": stop_type,
+                        "location": entry_coords,
+                        "time": entry["start_time"],
+                        "duration": _duration_hours(entry),
+                        "duty_status": entry["duty_status"],
+                        "reason": entry.get("reason", "")
+                    })
+
+    for fuel_stop in route_data.get("fuel_stops", []):
+        fuel_entry = None
+        for entry in log_entries:
+            if entry.get("location", "").startswith(f"Fuel Stop at {fuel_stop['mile_marker']:.0f} miles"):
+                fuel_entry = entry
+                break
+
+        if fuel_entry:
+            stop = {
+                "type": "fuel",
+                "location": fuel_stop["location"],
+                "time": fuel_entry["start_time"],
+                "duration": _duration_hours(fuel_entry),
+                "duty_status": "on_duty_not_driving",
+                "reason": "Fueling"
+            }
+            if fuel_stop.get("facility"):
+                stop["facility"] = fuel_stop["facility"]
+            stops.append(stop)
+
+    return stops
+
+
+def _route_summary(route_data: Dict) -> Dict:
+    route_segments = []
+    for segment in route_data.get("segments", []):
+        route_segments.append({
+            "from": segment.get("from", ""),
+            "to": segment.get("to", ""),
+            "distance_miles": round(segment.get("distance_miles", 0), 2),
+            "driving_time_hours": round(segment.get("driving_time_hours", 0), 2),
+            "coordinates": segment.get("coordinates", []),
+            "route_source": segment.get("route_source")
+        })
+
+    return {
+        "total_distance": round(route_data.get("total_distance_miles", 0), 2),
+        "total_driving_time": round(route_data.get("total_driving_time_hours", 0), 2),
+        "segments": route_segments
+    }
+
+
+def _waypoint_markers(route_data: Dict, trip_stops: List[Dict]) -> List[Dict]:
+    return [
+        {
+            "type": "start",
+            "location": route_data["waypoints"][0] if route_data.get("waypoints") else None,
+            "label": "Current Location"
+        }
+    ] + [
+        {
+            "type": trip_stop["type"],
+            "location": waypoint,
+            "label": _stop_label(trip_stops, index)
+        }
+        for index, (trip_stop, waypoint) in enumerate(zip(trip_stops, route_data["waypoints"][1:]))
+    ]
+
+
+def _stop_markers(stops: List[Dict]) -> List[Dict]:
+    return [
+        {
+            "type": stop["type"],
+            "location": stop["location"],
+            "label": stop.get("reason", stop["type"]).title()
+        }
+        for stop in stops
+    ]
+
+
+def build_trip_response(route_data: Dict, trip_stops: List[Dict], log_entries: List[Dict],
+                        daily_logs: List[Dict], polyline_format: str = "geojson",
+                        map_zoom: Optional[float] = None,
+                        polylines: Optional[List[Optional[Dict]]] = None,
+                        hos: Optional[Dict] = None) -> Dict:
+    """The ``calculate-route`` response body for a planned trip.
+
+    ``polylines`` are the already formatted map polylines, when the caller
+    produced them elsewhere. ``hos`` holds the ``hos_state`` checkpoint and,
+    from the optimized planner, ``hos_schedule``.
+    """
+    if polylines is None:
+        with timed("polylines"):
+            polylines = format_polylines(route_data.get("polylines", []), polyline_format, map_zoom)
+    with timed("stops"):
+        stops = _trip_stops(route_data, log_entries)
+
+    response = {
+        "route": _route_summary(route_data),
+        "stops": stops,
+        "log_entries": log_entries,
+        "daily_logs": daily_logs,
+        "map_data": {
+            "waypoints": route_data.get("waypoints", []),
+            "polylines": polylines,
+            "markers": _waypoint_markers(route_data, trip_stops) + _stop_markers(stops)
+        }
+    }
+    if hos:
+        response.update(hos)
+    return response
+
+
+def plan_trip(data: Dict) -> Dict:
+    """Route, log and render one validated :class:`TripRequestSerializer` payload."""
+    return plan_routed_trip(data, calculate_route(data["current_location"], data["stops"]))
+
+
+def plan_routed_trip(data: Dict, route_data: Dict) -> Dict:
+    current_location = data["current_location"]
+    trip_stops = data["stops"]
+    start_time_str = normalize_start_time(data.get("start_time"))
+
+    log_entries, daily_logs, hos = generate_logs(
+        route_data, current_location, trip_stops, data.get("current_cycle_used"), start_time_str,
+        data.get("hos_planner", "greedy"), data.get("hos_state")
+    )
+    return build_trip_response(
+        route_data, trip_stops, log_entries, daily_logs,
+        data["polyline_format"], data.get("map_zoom"), hos=hos
+    )
+
+
+def plan_resolved_trip(data: Dict, coordinates: List[Tuple[float, float]], result) -> Dict:
+    """:func:`plan_trip` from geocoded waypoints and the routing result, for executors."""
+    return plan_routed_trip(
+        data, build_route_data(data["current_location"], data["stops"], coordinates, result)
+    )
+
+
+def sweep_trip(data: Dict) -> Dict:
+    """Route a validated :class:`SweepRequestSerializer` payload once and sweep its departure times."""
+    route_data = calculate_route(data["current_location"], data["stops"])
+    start_times = departure_times(
+        normalize_start_time(data.get("start_time")), data["departures"], data["interval_minutes"]
+    )
+    with timed("sweep"):
+        sweep = sweep_departures(route_data, data.get("current_cycle_used"), start_times, data.get("hos_state"))
+    return {
+        "route": {
+            "total_distance": round(route_data.get("total_distance_miles", 0), 2),
+            "total_driving_time": round(route_data.get("total_driving_time_hours", 0), 2),
+        },
+        "interval_minutes": data["interval_minutes"],
+        "sweep": sweep,
+    }
+
+
+async def plan_trip_async(data: Dict) -> Dict:
+    """:func:`plan_trip` for async views.
+
+    Geocoding and routing are awaited on the event loop; building the route,
+    the HOS simulation and the log sheets run on the process pool, so the loop
+    keeps serving other trips meanwhile.
+    """
+    coordinates, result = await resolve_route_async(data["current_location"], data["stops"])
+    # Stages inside the pool are not visible here; report the pool call as one.
+    with timed("plan"):
+        return await run_in_pool(plan_resolved_trip, data, coordinates, result)
+
+
+async def route_trip_async(data: Dict) -> Dict:
+    """``route_data`` for a payload: I/O on the event loop, the route dict built on a thread."""
+    coordinates, result = await resolve_route_async(data["current_location"], data["stops"])
+    return await asyncio.get_running_loop().run_in_executor(
+        None, build_route_data, data["current_location"], data["stops"], coordinates, result
+    )
+
+
+def iter_trip_records(data: Dict, route_data: Optional[Dict] = None) -> Iterator[Dict]:
+    """The ``calculate-route`` response as a sequence of smaller records.
+
+    Yields, in order: ``route`` (summary, waypoints, polylines and waypoint
+    markers), one ``daily_log`` per day as it is built, ``stops`` (with their
+    markers and the flat ``log_entries``) and a final ``end``. Routing
+    errors surface as exceptions before the first record. Pass ``route_data``
+    when the trip has already been routed.
+    """
+    current_location = data["current_location"]
+    trip_stops = data["stops"]
+    start_time_str = normalize_start_time(data.get("start_time"))
+
+    if route_data is None:
+        route_data = calculate_route(current_location, trip_stops)
+    yield {
+        "type": "route",
+        "route": _route_summary(route_data),
+        "map_data": {
+            "waypoints": route_data.get("waypoints", []),
+            "polylines": format_polylines(
+                route_data.get("polylines", []), data["polyline_format"], data.get("map_zoom")
+            ),
+            "markers": _waypoint_markers(route_data, trip_stops)
+        }
+    }
+
+    log_entries, hos = plan_eld_entries(
+        route_data, data.get("current_cycle_used"), start_time_str, data.get("hos_planner", "greedy"),
+        data.get("hos_state")
+    )
+    days = 0
+    for daily_log in iter_daily_logs(
+        log_entries, current_location, trip_stops[0]["location"], trip_stops[-1]["location"]
+    ):
+        days += 1
+        yield {"type": "daily_log", "daily_log": daily_log}
+
+    stops = _trip_stops(route_data, log_entries)
+    record = {"type": "stops", "stops": stops, "markers": _stop_markers(stops), "log_entries": log_entries}
+    record.update(hos)
+    yield record
+    yield {"type": "end", "daily_logs": days}
+
+
+def _hos_route(route_data: Dict) -> Dict:
+    """The part of ``route_data`` the log workers need.
+
+    Road geometry travels as the segments' :class:`RouteGeometry` arrays, which
+    pickle as raw buffers; the GeoJSON coordinate lists stay behind.
+    """
+    return {
+        "segments": [{key: segment.get(key) for key in HOS_SEGMENT_KEYS} for segment in route_data["segments"]],
+        "fuel_stops": route_data["fuel_stops"],
+    }
+
+
+_JOB_FUNCTIONS = {
+    "logs": generate_logs,
+    "polylines": format_polylines,
+}
+
+
+def _run_job(job: Tuple[str, Tuple]) -> Tuple[int, object]:
+    """``(200, result)``, or ``(400, message)`` for invalid input (ValueError) and ``(500, message)`` otherwise."""
+    name, args = job
+    try:
+        return 200, _JOB_FUNCTIONS[name](*args)
+    except ValueError as e:
+        return 400, str(e)
+    except Exception as e:
+        return 500, str(e)
+
+
+def _iter_jobs(jobs: List[Tuple[str, Tuple]]) -> Iterator[Tuple[int, object]]:
+    """Run ``jobs`` and yield their ``(status, value)`` outcomes in order, each as soon as it is done."""
+    done = 0
+    try:
+        for outcome in map_in_pool(_run_job, jobs):
+            done += 1
+            yield outcome
+    except BrokenProcessPool:
+        # A worker died (OOM killer, signal); start a fresh pool next time.
+        reset_process_pool()
+        for _ in range(done, len(jobs)):
+            yield 500, "Trip planner worker pool crashed"
+
+
+def iter_plan_trips(trips: List[Dict]) -> Iterator[Tuple[int, Dict]]:
+    """Plan many validated trip payloads at once, yielding ``(index, result)``.
+
+    Distinct addresses across the batch are geocoded once and distinct lanes
+    (ordered coordinate lists) are routed once, both on the I/O thread pool.
+    The CPU-bound work, HOS simulation with daily logs per trip and polyline
+    simplification per distinct lane, runs on a process pool. Each result is
+    ``{"status": 200, "result": ...}`` or ``{"status": 4xx/5xx, "error": ...}``.
+    Trips that fail before routing come first; the rest follow in input
+    order as their jobs finish.
+    """
+    addresses = [trip["current_location"] for trip in trips]
+    for trip in trips:
+        addresses.extend(stop["location"] for stop in trip["stops"])
+    resolved = geocode_many(addresses) if addresses else {}
+
+    routable = []
+    for index, trip in enumerate(trips):
+        locations = [trip["current_location"]] + [stop["location"] for stop in trip["stops"]]
+        coordinates = [resolved[location] for location in locations]
+        try:
+            check_geocoded(trip["current_location"], trip["stops"], coordinates)
+        except ValueError as e:
+            yield index, {"status": 400, "error": str(e)}
+            continue
+        routable.append((index, coordinates))
+
+    fetched = fetch_routes_many([coordinates for _, coordinates in routable])
+
+    planned = []
+    jobs = []
+    polyline_jobs: Dict[Tuple, int] = {}
+    for (index, coordinates), fetch_result in zip(routable, fetched):
+        trip = trips[index]
+        try:
+            route_data = build_route_data(trip["current_location"], trip["stops"], coordinates, fetch_result)
+        except Exception as e:
+            yield index, {"status": 500, "error": "An error occurred processing your request", "details": str(e)}
+            continue
+        logs_job = len(jobs)
+        jobs.append(("logs", (
+            _hos_route(route_data), trip["current_location"], trip["stops"],
+            trip.get("current_cycle_used"), normalize_start_time(trip.get("start_time")),
+            trip.get("hos_planner", "greedy"), trip.get("hos_state")
+        )))
+        # Trips on the same lane share one simplified copy of its polylines.
+        polyline_key = (tuple(coordinates), trip["polyline_format"], trip.get("map_zoom"))
+        if polyline_key not in polyline_jobs:
+            polyline_jobs[polyline_key] = len(jobs)
+            jobs.append(("polylines", (route_data["polylines"], trip["polyline_format"], trip.get("map_zoom"))))
+        planned.append((index, route_data, logs_job, polyline_jobs[polyline_key]))
+
+    # A trip's polylines job is never queued after its logs job + 1, so trips
+    # become ready in order as outcomes arrive.
+    outcomes = []
+    next_trip = 0
+    for outcome in _iter_jobs(jobs):
+        outcomes.append(outcome)
+        while next_trip < len(planned) and max(planned[next_trip][2:]) < len(outcomes):
+            index, route_data, logs_job, polylines_job = planned[next_trip]
+            next_trip += 1
+            logs_outcome = outcomes[logs_job]
+            # Log sheets are per trip; drop them once the trip is rendered.
+            outcomes[logs_job] = None
+            failed = [job for job in (logs_outcome, outcomes[polylines_job]) if job[0] != 200]
+            if failed:
+                failed_status, message = failed[0]
+                if failed_status == 400:
+                    yield index, {"status": 400, "error": message}
+                else:
+                    yield index, {"status": 500, "error": "An error occurred processing your request", "details": message}
+                continue
+            trip = trips[index]
+            log_entries, daily_logs, hos = logs_outcome[1]
+            yield index, {
+                "status": 200,
+                "result": build_trip_response(
+                    route_data, trip["stops"], log_entries, daily_logs,
+                    polylines=outcomes[polylines_job][1], hos=hos
+                )
+            }
+
+
+def plan_trips(trips: List[Dict]) -> List[Dict]:
+    """:func:`iter_plan_trips` collected into a list in input order."""
+    results: List[Optional[Dict]] = [None] * len(trips)
+    for index, result in iter_plan_trips(trips):
+        results[index] = result
+    return results
@@ -0,0 +1,501 @@
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from .benchmarks.suite import synthetic_case
+from .services import hos_optimizer, poi_index, route_calculator
+from .services.departure_sweep import departure_times, simulate_departures
+from .services.eld_calculator import _initial_state, calculate_eld_entries, dump_hos_state, parse_datetime, plan_eld_entries
+from .services.hos_engine import RESTART_REASON, HOSState, serialize_events, simulate_trip
+from .services.hos_rules import (
+    BREAK_REQUIRED_AFTER_SECONDS,
+    CYCLE_DAYS,
+    DAY,
+    FUEL_STOP_SECONDS,
+    HOUR,
+    MAX_CYCLE_SECONDS,
+    MAX_DRIVING_SECONDS,
+    MAX_WINDOW_SECONDS,
+    MIN_OFF_DUTY_SECONDS,
+    OFF_DUTY,
+    PICKUP_DROPOFF_SECONDS,
+    REQUIRED_BREAK_SECONDS,
+    RESTART_SECONDS,
+    SLEEPER_BERTH,
+    SLEEPER_BERTH_SPLIT_SECONDS,
+)
+from .services.http_client import FetchResult
+from .services.log_generator import generate_daily_logs
+from .services.road_graph import METERS_PER_MILE, RoadGraph, _haversine_meters, build_road_graph_from_csv
+
+SAMPLE_GRAPH_DIR = os.path.join(os.path.dirname(__file__), "data", "sample_road_graph")
+
+DALLAS = (-96.797, 32.7767)
+OKLAHOMA_CITY = (-97.5164, 35.4676)
+DENVER = (-104.9903, 39.7392)
+NEW_YORK = (-74.006, 40.7128)
+MAX_SNAP_METERS = 10 * METERS_PER_MILE
+
+# Trips long enough for rests, splits and fuel stops, starting at different times of day.
+TRIP_MILES = (700, 1300, 2000)
+TRIP_VERTICES = 500
+TRIP_STARTS = ("2024-01-15T08:00:00Z", "2024-01-15T21:30:00-06:00")
+# 68 cycle hours over eight days, which roll off one by one as the trip goes on.
+WORKED_WEEK = [int(8.5 * HOUR)] * CYCLE_DAYS
+
+
+class SampleGraphTestCase(SimpleTestCase):
+    """Builds the bundled sample graph once per class."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        # A missing parent directory is created, as for the default ROAD_GRAPH_PATH.
+        cls.graph_path = os.path.join(cls.tmpdir.name, "data", "road_graph.idx")
+        build_road_graph_from_csv(
+            os.path.join(SAMPLE_GRAPH_DIR, "nodes.csv"), os.path.join(SAMPLE_GRAPH_DIR, "edges.csv"), cls.graph_path
+        )
+        cls.graph = RoadGraph(cls.graph_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.graph.close()
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+
+class SampleRoadGraphTests(SampleGraphTestCase):
+    """The local router over the bundled sample graph."""
+
+    def test_route_is_in_osrm_shape(self):
+        data = self.graph.route([DALLAS, OKLAHOMA_CITY, DENVER], MAX_SNAP_METERS)
+
+        self.assertEqual(data["code"], "Ok")
+        route = data["routes"][0]
+        legs = route["legs"]
+        coordinates = route["geometry"]["coordinates"]
+        self.assertEqual(route["geometry"]["type"], "LineString")
+        self.assertEqual(len(legs), 2)
+        self.assertEqual([waypoint["location"] for waypoint in data["waypoints"]],
+                         [list(DALLAS), list(OKLAHOMA_CITY), list(DENVER)])
+        self.assertEqual(coordinates[0], list(DALLAS))
+        self.assertEqual(coordinates[-1], list(DENVER))
+        # One annotation per edge of the overview geometry, legs sharing their waypoint vertex.
+        self.assertEqual(sum(len(leg["annotation"]["duration"]) for leg in legs) + 1, len(coordinates))
+        self.assertAlmostEqual(route["distance"], sum(leg["distance"] for leg in legs), places=3)
+        self.assertAlmostEqual(route["duration"], sum(leg["duration"] for leg in legs), places=3)
+        for leg in legs:
+            self.assertAlmostEqual(sum(leg["annotation"]["distance"]), leg["distance"], delta=1.0)
+            self.assertAlmostEqual(sum(leg["annotation"]["duration"]), leg["duration"], delta=1.0)
+
+    def test_distance_and_duration_follow_the_roads(self):
+        route = self.graph.route([DALLAS, DENVER], MAX_SNAP_METERS)["routes"][0]
+
+        straight_line = _haversine_meters(*DALLAS, *DENVER)
+        self.assertGreater(route["distance"], straight_line)
+        self.assertLess(route["distance"], 1.5 * straight_line)
+        # The sample edges are signed 60 to 75 mph.
+        miles = route["distance"] / METERS_PER_MILE
+        self.assertGreaterEqual(route["duration"], miles / 75 * 3600)
+        self.assertLessEqual(route["duration"], miles / 60 * 3600)
+
+    def test_unsnappable_coordinate_is_no_segment(self):
+        data = self.graph.route([DALLAS, NEW_YORK], MAX_SNAP_METERS)
+
+        self.assertEqual(data["code"], "NoSegment")
+
+
+@override_settings(ROUTER_BACKENDS=["local", "osrm"])
+class LocalRouterFallbackTests(SampleGraphTestCase):
+    """``fetch_route`` with ``ROUTER_BACKENDS = local, osrm``."""
+
+    def setUp(self):
+        self.osrm = mock.Mock(return_value=FetchResult(url="osrm", ok=True, data={"legs": [], "source": "osrm"}))
+        for patcher in (
+            mock.patch.object(route_calculator, "_road_graph", self.graph),
+            mock.patch.dict(route_calculator.ROUTERS, {"osrm": self.osrm}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_covered_trip_is_routed_locally(self):
+        result = route_calculator.fetch_route([DALLAS, OKLAHOMA_CITY, DENVER])
+
+        self.assertTrue(result.ok)
+        self.assertEqual(result.data["source"], "local")
+        self.assertEqual(len(result.data["legs"]), 2)
+        self.assertEqual(result.data["geometry"]["coordinates"].shape[1], 2)
+        self.osrm.assert_not_called()
+
+    def test_unsnappable_trip_falls_through_to_osrm(self):
+        result = route_calculator.fetch_route([DALLAS, NEW_YORK])
+
+        self.osrm.assert_called_once_with([DALLAS, NEW_YORK])
+        self.assertEqual(result.data["source"], "osrm")
+
+
+def _span(entry):
+    """``(start, end)`` of a log entry in Unix seconds."""
+    return (int(parse_datetime(entry["start_time"]).timestamp()),
+            int(parse_datetime(entry["end_time"]).timestamp()))
+
+
+def _split_pair(first, second):
+    """Whether two rests, as ``(seconds, sleeper berth seconds)``, make up a sleeper-berth split."""
+    return any(
+        (sleeper_rest[1] >= sleeper and other[0] >= off)
+        for sleeper, off in SLEEPER_BERTH_SPLIT_SECONDS
+        for sleeper_rest, other in ((first, second), (second, first))
+    )
+
+
+class HOSScheduleTestCase(SimpleTestCase):
+    """Plans trips without a facility index and checks them against the rules directly."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.routes = {miles: synthetic_case(miles, TRIP_VERTICES).route_data() for miles in TRIP_MILES}
+
+    def setUp(self):
+        patcher = mock.patch.object(poi_index, "_poi_index", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertHOSCompliant(self, entries):
+        """A fresh driver's log keeps to the 30-minute break and the 11- and 14-hour limits.
+
+        Back-to-back entries off the wheel count as one stop. The limits run
+        from the end of the last 10-hour rest or, once a sleeper-berth split
+        pairs up, from the end of its first half, with the second half left
+        out of the 14 hours.
+        """
+        trip_start = previous_end = _span(entries[0])[0]
+        rests = []  # [start, end, sleeper berth seconds] of each stop off duty
+        stop_start = None  # start of the current stop off the wheel
+        driving = []  # (start, end) of each stretch of driving
+        since_break = 0
+        for entry in entries:
+            start, end = _span(entry)
+            self.assertEqual(start, previous_end, entry)
+            previous_end = end
+            status = entry["duty_status"]
+            if status != "driving":
+                stop_start = start if stop_start is None else stop_start
+                if status in ("off_duty", "sleeper_berth"):
+                    if rests and rests[-1][1] == start:
+                        rests[-1][1] = end
+                    else:
+                        rests.append([start, end, 0])
+                    if status == "sleeper_berth":
+                        rests[-1][2] += end - start
+                continue
+
+            if stop_start is not None and start - stop_start >= REQUIRED_BREAK_SECONDS:
+                since_break = 0
+            stop_start = None
+            since_break += end - start
+            self.assertLessEqual(since_break, BREAK_REQUIRED_AFTER_SECONDS, entry)
+            driving.append((start, end))
+
+            anchor, excluded, last_half = trip_start, 0, None
+            for rest_start, rest_end, sleeper in rests:
+                rest = (rest_end - rest_start, sleeper)
+                if rest[0] >= MIN_OFF_DUTY_SECONDS:
+                    anchor, excluded, last_half = rest_end, 0, None
+                    continue
+                if last_half is not None and _split_pair(last_half[0], rest):
+                    anchor, excluded = last_half[1], rest[0]
+                last_half = (rest, rest_end)
+            self.assertLessEqual(sum(e - s for s, e in driving if s >= anchor), MAX_DRIVING_SECONDS, entry)
+            self.assertLessEqual(end - anchor - excluded, MAX_WINDOW_SECONDS, entry)
+
+
+class OptimizedPlannerTests(HOSScheduleTestCase):
+    """``plan_eld_entries`` with ``planner="optimized"``."""
+
+    def plans(self):
+        for miles, route_data in self.routes.items():
+            for start_time in TRIP_STARTS:
+                for cycle_used in (0, 40):
+                    with self.subTest(miles=miles, start_time=start_time, cycle_used=cycle_used):
+                        yield plan_eld_entries(route_data, cycle_used, start_time, "optimized")
+
+    def test_schedule_keeps_to_the_limits(self):
+        for entries, hos in self.plans():
+            self.assertHOSCompliant(entries)
+            self.assertHOSCompliant(hos["hos_schedule"]["greedy_log_entries"])
+
+    def test_split_rests_are_seven_three_or_eight_two(self):
+        sleeper_halves = {sleeper for sleeper, _ in SLEEPER_BERTH_SPLIT_SECONDS}
+        off_duty_halves = {off for _, off in SLEEPER_BERTH_SPLIT_SECONDS}
+        splits = 0
+        for entries, _ in self.plans():
+            for entry in entries:
+                if "(split)" not in (entry["reason"] or ""):
+                    continue
+                start, end = _span(entry)
+                halves = sleeper_halves if entry["duty_status"] == "sleeper_berth" else off_duty_halves
+                self.assertIn(end - start, halves, entry)
+                splits += 1
+        self.assertGreater(splits, 0)
+
+    def test_split_halves_pair_up_to_ten_hours(self):
+        search = hos_optimizer._Search(self.routes[TRIP_MILES[0]], float("inf"))
+        clock = int(parse_datetime(TRIP_STARTS[0]).timestamp())
+        for first, second, pairs in (
+            ((2 * HOUR, OFF_DUTY, False), (8 * HOUR, SLEEPER_BERTH, True), True),
+            ((7 * HOUR, SLEEPER_BERTH, True), (3 * HOUR, OFF_DUTY, False), True),
+            ((2 * HOUR, OFF_DUTY, False), (7 * HOUR, SLEEPER_BERTH, True), False),
+            ((2 * HOUR, OFF_DUTY, False), (3 * HOUR, OFF_DUTY, False), False),
+        ):
+            with self.subTest(first=first, second=second):
+                clocks = hos_optimizer._Clocks(clock, [0] * CYCLE_DAYS, clock // DAY, 0, shift_driving=6 * HOUR,
+                                               window_used=7 * HOUR, since_break=0)
+                search._rest(clocks, first, "")
+                search._rest(clocks, second, "")
+                if pairs:
+                    # Nothing happened between the halves, so the limits start over.
+                    self.assertEqual((clocks.shift_driving, clocks.window_used), (0, 0))
+                else:
+                    self.assertEqual(clocks.shift_driving, 6 * HOUR)
+                    self.assertEqual(clocks.window_used, 7 * HOUR + first[0] + second[0])
+
+    def test_never_arrives_after_the_greedy_plan(self):
+        for entries, hos in self.plans():
+            schedule = hos["hos_schedule"]
+            self.assertGreaterEqual(schedule["hours_saved"], 0)
+            self.assertLessEqual(parse_datetime(schedule["arrival"]), parse_datetime(schedule["greedy_arrival"]))
+
+    def test_on_duty_stop_at_the_end_of_the_window(self):
+        # The pickup runs the window out, so the driver must rest before driving on.
+        clock = int(parse_datetime(TRIP_STARTS[0]).timestamp())
+        hos_state = dump_hos_state(HOSState(clock, window_start=clock - 13 * HOUR))
+        route_data = synthetic_case(300, TRIP_VERTICES).route_data()
+
+        entries, hos = plan_eld_entries(route_data, None, TRIP_STARTS[0], "optimized", hos_state)
+
+        statuses = [entry["duty_status"] for entry in entries]
+        self.assertEqual(statuses[:3], ["driving", "on_duty_not_driving", "off_duty"])
+        self.assertEqual(entries[1]["reason"], "Pickup")
+        self.assertGreaterEqual(hos["hos_schedule"]["hours_saved"], 0)
+
+
+class GreedySimulationTests(HOSScheduleTestCase):
+    """``simulate_trip``, the greedy HOS schedule."""
+
+    def plans(self, cycle_used=0):
+        for miles, route_data in self.routes.items():
+            for start_time in TRIP_STARTS:
+                with self.subTest(miles=miles, start_time=start_time):
+                    yield route_data, calculate_eld_entries(route_data, cycle_used, start_time)
+
+    def test_schedule_keeps_to_the_limits(self):
+        reasons = set()
+        for _, entries in self.plans():
+            self.assertHOSCompliant(entries)
+            reasons.update(entry["reason"] for entry in entries if entry["duty_status"] == "off_duty")
+        self.assertEqual(reasons, {"30-minute break required", "11-hour driving limit reached"})
+
+    def test_14_hour_window_ends_the_shift(self):
+        # Seven hours into the window, the window runs out before the driving limit does.
+        clock = int(parse_datetime(TRIP_STARTS[0]).timestamp())
+        state = HOSState(clock, window_start=clock - 7 * HOUR)
+
+        entries = serialize_events(simulate_trip(self.routes[TRIP_MILES[0]], state))
+
+        rest = next(entry for entry in entries if _span(entry)[1] - _span(entry)[0] >= MIN_OFF_DUTY_SECONDS)
+        self.assertEqual(rest["reason"], "14-hour window exceeded")
+        self.assertEqual(_span(rest)[0], clock + 7 * HOUR)
+
+    def test_fuel_stop_every_1000_miles(self):
+        route_data = synthetic_case(2500, TRIP_VERTICES).route_data()
+
+        entries = calculate_eld_entries(route_data, 0, TRIP_STARTS[0])
+
+        driven = 0
+        fuel_stops = []
+        for entry in entries:
+            if entry["duty_status"] == "driving":
+                driven += entry["miles"]
+            elif entry["reason"] == "Fueling":
+                start, end = _span(entry)
+                self.assertEqual(end - start, FUEL_STOP_SECONDS)
+                fuel_stops.append(driven)
+        self.assertEqual(len(fuel_stops), 2)
+        for number, mile in enumerate(fuel_stops, 1):
+            self.assertAlmostEqual(mile, 1000 * number, delta=0.01)
+
+    def test_pickup_and_dropoff_are_an_hour_on_duty(self):
+        for route_data, entries in self.plans():
+            segments = route_data["segments"]
+            stops = [entry for entry in entries if entry["reason"] in ("Pickup", "Dropoff")]
+            self.assertEqual([stop["reason"] for stop in stops], ["Pickup", "Dropoff"])
+            self.assertIs(stops[-1], entries[-1])
+            for stop, segment in zip(stops, (segments[0], segments[-1])):
+                start, end = _span(stop)
+                self.assertEqual(stop["duty_status"], "on_duty_not_driving")
+                self.assertEqual(end - start, PICKUP_DROPOFF_SECONDS)
+                self.assertEqual(stop["location"], segment["to"])
+            before_pickup = entries[:entries.index(stops[0])]
+            self.assertAlmostEqual(sum(entry["miles"] for entry in before_pickup), segments[0]["distance_miles"],
+                                   delta=0.01)
+
+    def test_34_hour_restart_at_70_hours(self):
+        route_data = self.routes[TRIP_MILES[0]]
+        clock = int(parse_datetime(TRIP_STARTS[0]).timestamp())
+        state = HOSState(clock, cycle_used=69 * HOUR)
+
+        entries = serialize_events(simulate_trip(route_data, state))
+
+        drive, restart = entries[:2]
+        self.assertEqual(drive["duty_status"], "driving")
+        self.assertEqual(_span(drive), (clock, clock + HOUR))
+        self.assertEqual(restart["duty_status"], "off_duty")
+        self.assertEqual(restart["reason"], RESTART_REASON)
+        self.assertEqual(_span(restart), (clock + HOUR, clock + HOUR + RESTART_SECONDS))
+        self.assertEqual(restart["start_time"], "2024-01-15T09:00:00Z")
+        # The cycle starts over: only work after the restart counts.
+        worked = sum(_span(entry)[1] - _span(entry)[0] for entry in entries[2:]
+                     if entry["duty_status"] in ("driving", "on_duty_not_driving"))
+        self.assertEqual(state.cycle_used, worked)
+        self.assertLess(state.cycle_used, MAX_CYCLE_SECONDS)
+
+
+def _legacy_daily_totals(log_entries):
+    """Totals and recap per day as ``log_generator`` computed them before the columnar rewrite.
+
+    Each entry counts in full on its start day, and from midnight on the day
+    it ends; that only matches the rewrite for entries crossing one midnight.
+    """
+    def hours(entry):
+        return (parse_datetime(entry["end_time"]) - parse_datetime(entry["start_time"])).total_seconds() / 3600
+
+    by_day = {}
+    for entry in log_entries:
+        start_time, end_time = parse_datetime(entry["start_time"]), parse_datetime(entry["end_time"])
+        by_day.setdefault(start_time.date(), []).append(entry)
+        if end_time.date() != start_time.date():
+            split_entry = dict(entry, start_time=end_time.replace(hour=0, minute=0, second=0).isoformat(), miles=0)
+            by_day.setdefault(end_time.date(), []).append(split_entry)
+
+    days = {}
+    for day, entries in sorted(by_day.items()):
+        totals = dict.fromkeys(("off_duty", "sleeper_berth", "driving", "on_duty_not_driving"), 0)
+        miles = 0
+        for entry in entries:
+            totals[entry["duty_status"]] += hours(entry)
+            if entry["duty_status"] == "driving":
+                miles += entry.get("miles", 0)
+        last_7_days = last_5_days = 0
+        for entry in log_entries:
+            entry_day = parse_datetime(entry["start_time"]).date()
+            if entry["duty_status"] in ("driving", "on_duty_not_driving"):
+                if entry_day >= day - timedelta(days=7):
+                    last_7_days += hours(entry)
+                if entry_day >= day - timedelta(days=4):
+                    last_5_days += hours(entry)
+        total_on_duty = totals["driving"] + totals["on_duty_not_driving"]
+        days[day.isoformat()] = {
+            "total_miles_driving": round(miles, 1),
+            "totals": dict(
+                {status: round(value, 2) for status, value in totals.items()},
+                total_on_duty=round(total_on_duty, 2),
+                total_hours=round(totals["off_duty"] + totals["sleeper_berth"] + total_on_duty, 2),
+            ),
+            "recap": {
+                "total_on_duty_last_7_days": round(last_7_days, 2),
+                "total_on_duty_last_5_days": round(last_5_days, 2),
+                "hours_available_tomorrow_70hr": max(0, 70 - last_7_days),
+                "hours_available_tomorrow_60hr": max(0, 60 - last_7_days),
+            },
+        }
+    return days
+
+
+class DailyLogTests(HOSScheduleTestCase):
+    """``generate_daily_logs`` against the per-day loops it replaced."""
+
+    def test_totals_and_recaps_match_the_pre_rewrite_output(self):
+        routes = dict(self.routes)
+        routes[4000] = synthetic_case(4000, TRIP_VERTICES).route_data()
+        crossings = 0
+        for miles, route_data in routes.items():
+            for start_time in TRIP_STARTS:
+                for cycle_used in (0, 40):
+                    with self.subTest(miles=miles, start_time=start_time, cycle_used=cycle_used):
+                        entries, _ = plan_eld_entries(route_data, cycle_used, start_time, "optimized")
+                        crossings += sum(parse_datetime(entry["start_time"]).date()
+                                         != parse_datetime(entry["end_time"]).date() for entry in entries)
+
+                        logs = {log["date"]: log for log in generate_daily_logs(entries, "start", "pickup",
+                                                                                 "dropoff")}
+
+                        expected = _legacy_daily_totals(entries)
+                        for date, legacy in expected.items():
+                            log = logs[date]
+                            self.assertEqual(log["total_miles_driving"], legacy["total_miles_driving"])
+                            self.assertEqual(log["totals"], legacy["totals"])
+                            for key, value in legacy["recap"].items():
+                                self.assertAlmostEqual(log["recap"][key], value, places=9, msg=key)
+                        # Only the days a restart spans from midnight to midnight are new.
+                        for date in logs.keys() - expected.keys():
+                            self.assertEqual(len(logs[date]["entries"]), 1)
+                            self.assertEqual(logs[date]["totals"]["off_duty"], 24)
+        self.assertGreater(crossings, 0)
+
+    def test_entry_across_two_midnights_fills_the_day_between(self):
+        clock = int(parse_datetime("2024-01-15T22:00:00Z").timestamp())
+        state = HOSState(clock, cycle_used=69 * HOUR)
+        entries = serialize_events(simulate_trip(self.routes[TRIP_MILES[0]], state))
+
+        logs = generate_daily_logs(entries, "start", "pickup", "dropoff")
+
+        # The 34-hour restart runs from 23:00 on the 15th to 09:00 on the 17th.
+        self.assertEqual([log["date"] for log in logs[:3]], ["2024-01-15", "2024-01-16", "2024-01-17"])
+        between = logs[1]
+        self.assertEqual([entry["start_time"] for entry in between["entries"]], ["2024-01-16T00:00:00Z"])
+        self.assertEqual(between["entries"][0]["end_time"], "2024-01-17T00:00:00Z")
+        self.assertEqual(between["totals"]["off_duty"], 24)
+        self.assertEqual(between["totals"]["total_on_duty"], 0)
+        self.assertEqual(logs[2]["entries"][0]["start_time"], "2024-01-17T00:00:00Z")
+
+
+class DepartureSweepTests(HOSScheduleTestCase):
+    """``simulate_departures`` runs :func:`simulate_trip` for many departures in lockstep."""
+
+    def test_matches_simulate_trip(self):
+        restarts = 0
+        for miles, route_data in self.routes.items():
+            for start_time in TRIP_STARTS:
+                for cycle_used in (0, 40, 69, WORKED_WEEK):
+                    with self.subTest(miles=miles, start_time=start_time, cycle_used=cycle_used):
+                        states = [_initial_state(cycle_used, departure)
+                                  if cycle_used is not WORKED_WEEK else
+                                  HOSState(int(departure.timestamp()), history=WORKED_WEEK,
+                                           utc_offset=int(departure.utcoffset().total_seconds()))
+                                  for departure in departure_times(start_time, 12, 110)]
+
+                        totals = simulate_departures(route_data, [state.copy() for state in states])
+
+                        for index, state in enumerate(states):
+                            events = simulate_trip(route_data, state)
+                            off_duty = [event.end - event.start for event in events if event.status == OFF_DUTY]
+                            self.assertEqual(int(totals["arrival"][index]), state.clock)
+                            self.assertEqual(int(totals["cycle_used"][index]), state.cycle_used)
+                            self.assertEqual(int(totals["on_duty"][index]),
+                                             sum(event.end - event.start for event in events
+                                                 if event.status not in (OFF_DUTY, SLEEPER_BERTH)))
+                            self.assertEqual(
+                                (int(totals["rests"][index]), int(totals["breaks"][index]),
+                                 int(totals["restarts"][index])),
+                                (off_duty.count(MIN_OFF_DUTY_SECONDS), off_duty.count(REQUIRED_BREAK_SECONDS),
+                                 off_duty.count(RESTART_SECONDS))
+                            )
+                            restarts += off_duty.count(RESTART_SECONDS)
+        self.assertGreater(restarts, 0)
@@ -1,7 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# The ASGI entry point turns ASYNC_VIEWS on; WSGI keeps the DRF view.
+calculate_route_view = (
+    views.calculate_route_async_view if getattr(settings, 'ASYNC_VIEWS', False) else views.calculate_route_view
+)
+
 urlpatterns = [
-    path('calculate-route/', views.calculate_route_view, name='calculate_route'),
+    path('calculate-route/', calculate_route_view, name='calculate_route'),
+    path('calculate-route/sweep/', views.calculate_route_sweep_view, name='calculate_route_sweep'),
+    path('calculate-routes/batch/', views.calculate_routes_batch_view, name='calculate_routes_batch'),
+    path('jobs/', views.create_job_view, name='create_job'),
+    path('jobs/<uuid:job_id>/', views.job_detail_view, name='job_detail'),
+    path('log-sheets/', views.log_sheets_view, name='log_sheets'),
 ]
 
@@ -1,31 +1,113 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from django.http import HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from datetime import datetime
-from dateutil import tz
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import io
+import itertools
 import json
+import zipfile
 
-from .serializers import TripRequestSerializer
-from .services.route_calculator import calculate_route
-from .services.eld_calculator import calculate_eld_entries
-from .services.log_generator import generate_daily_logs
+from .renderers import NDJSON_MEDIA_TYPE, NDJSONRenderer, ndjson_line
+from .models import TripJob
+from .serializers import (
+    BatchTripRequestSerializer,
+    LogSheetRequestSerializer,
+    SweepRequestSerializer,
+    TripRequestSerializer,
+)
+from .services.job_queue import ensure_workers, job_result, submit_job
+from .services.log_sheet_renderer import render_pdf, render_svgs, svg_file_names
+from .services.metrics import PLAN_CACHE_LOOKUPS, PROMETHEUS_CONTENT_TYPE, instrumented, render_metrics, timed
+from .services.plan_cache import (
+    CACHE_HEADER,
+    canonical_trip,
+    get_cached_plan,
+    get_cached_plan_async,
+    get_plan_cache,
+    plan_cache_key,
+    store_plan,
+    store_plan_async,
+)
+from .services.process_pool import map_in_pool
+from .services.trip_planner import (
+    iter_plan_trips,
+    iter_trip_records,
+    plan_trip,
+    plan_trip_async,
+    route_trip_async,
+    sweep_trip,
+)
 
 
+def _preflight_response(response=None):
+    response = response if response is not None else Response(status=status.HTTP_200_OK)
+    response['Access-Control-Allow-Origin'] = '*'
+    response['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
+    response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With, Accept'
+    response['Access-Control-Max-Age'] = '86400'
+    return response
+
+
+def _wants_stream(request):
+    return request.accepted_renderer.format == NDJSONRenderer.format
+
+
+def _stream_error_line(error):
+    return ndjson_line({
+        "type": "error",
+        "error": "An error occurred processing your request",
+        "details": str(error)
+    })
+
+
+def _stream_response(records):
+    if hasattr(records, '__aiter__'):
+        async def lines():
+            try:
+                async for record in records:
+                    yield ndjson_line(record)
+            except Exception as e:
+                yield _stream_error_line(e)
+    else:
+        def lines():
+            try:
+                for record in records:
+                    yield ndjson_line(record)
+            except Exception as e:
+                yield _stream_error_line(e)
+
+    response = StreamingHttpResponse(lines(), content_type=NDJSON_MEDIA_TYPE)
+    # Keep proxies (nginx) from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+def _plan_response(body, cache_status):
+    PLAN_CACHE_LOOKUPS.inc(result=cache_status.lower())
+    response = HttpResponse(body, content_type='application/json')
+    response[CACHE_HEADER] = cache_status
+    return response
+
+
+@instrumented('calculate_route')
 @api_view(['POST', 'OPTIONS'])
 @permission_classes([AllowAny])
+@renderer_classes([JSONRenderer, NDJSONRenderer])
 @csrf_exempt
 def calculate_route_view(request):
     # Handle CORS preflight OPTIONS request
     if request.method == 'OPTIONS':
-        response = Response(status=status.HTTP_200_OK)
-        response['Access-Control-Allow-Origin'] = '*'
-        response['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With, Accept'
-        response['Access-Control-Max-Age'] = '86400'
-        return response
+        return _preflight_response()
     
     serializer = TripRequestSerializer(data=request.data)
     
@@ -35,142 +117,131 @@ def calculate_route_view(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    data = serializer.validated_data
+    try:
+        if _wants_stream(request):
+            records = iter_trip_records(serializer.validated_data)
+            # Route first, so geocoding failures still get a 400.
+            first = next(records)
+            response = _stream_response(itertools.chain([first], records))
+            response[CACHE_HEADER] = 'BYPASS'
+            PLAN_CACHE_LOOKUPS.inc(result='bypass')
+            return response
+        
+        trip = canonical_trip(serializer.validated_data)
+        key = plan_cache_key(trip)
+        with timed('plan_cache'):
+            body = get_cached_plan(key)
+        if body is not None:
+            return _plan_response(body, 'HIT')
+        result = plan_trip(trip)
+        with timed('render'):
+            body = JSONRenderer().render(result)
+        store_plan(key, body, result)
+        return _plan_response(body, 'MISS' if get_plan_cache() is not None else 'BYPASS')
     
-    current_location = data["current_location"]
-    pickup_location = data["pickup_location"]
-    dropoff_location = data["dropoff_location"]
-    current_cycle_used = data["current_cycle_used"]
+    except ValueError as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {"error": "An error occurred processing your request", "details": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+async def _records_on_thread(records):
+    """Advance a sync record generator on the default executor, one record at a time."""
+    loop = asyncio.get_running_loop()
+    done = object()
+    while True:
+        record = await loop.run_in_executor(None, next, records, done)
+        if record is done:
+            return
+        yield record
+
+
+@instrumented('calculate_route')
+async def calculate_route_async_view(request):
+    """:func:`calculate_route_view` for ASGI, with the same request and responses.
+
+    DRF's views are sync-only, so this is a plain Django async view: geocoding
+    and OSRM calls are awaited and the CPU-bound planning runs on an executor,
+    leaving the event loop free for other requests. Only JSON bodies are
+    accepted.
+    """
+    if request.method == 'OPTIONS':
+        return _preflight_response(HttpResponse())
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST', 'OPTIONS'])
     
-    start_time_str = data.get("start_time")
-    if not start_time_str:
-        start_time = datetime.now(tz.UTC)
-    else:
-        try:
-            start_time = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
-            if start_time.tzinfo is None:
-                start_time = start_time.replace(tzinfo=tz.UTC)
-        except Exception:
-            start_time = datetime.now(tz.UTC)
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError as e:
+        return _json_response({"detail": f"JSON parse error - {e}"}, status.HTTP_400_BAD_REQUEST)
     
-    start_time_str = start_time.isoformat().replace('+00:00', 'Z')
+    serializer = TripRequestSerializer(data=payload)
+    if not serializer.is_valid():
+        return _json_response(
+            {"error": "Invalid input", "details": serializer.errors},
+            status.HTTP_400_BAD_REQUEST
+        )
     
+    wants_stream = (request.GET.get('format') == NDJSONRenderer.format
+                    or NDJSON_MEDIA_TYPE in request.headers.get('Accept', ''))
     try:
-        route_data = calculate_route(current_location, pickup_location, dropoff_location)
+        if wants_stream:
+            # Route first, so geocoding failures still get a 400.
+            route_data = await route_trip_async(serializer.validated_data)
+            records = iter_trip_records(serializer.validated_data, route_data)
+            response = _stream_response(_records_on_thread(records))
+            response[CACHE_HEADER] = 'BYPASS'
+            PLAN_CACHE_LOOKUPS.inc(result='bypass')
+            return response
         
-        log_entries = calculate_eld_entries(
-            route_data,
-            current_cycle_used,
-            start_time_str
+        trip = canonical_trip(serializer.validated_data)
+        key = plan_cache_key(trip)
+        with timed('plan_cache'):
+            body = await get_cached_plan_async(key)
+        if body is not None:
+            return _plan_response(body, 'HIT')
+        result = await plan_trip_async(trip)
+        with timed('render'):
+            body = JSONRenderer().render(result)
+        await store_plan_async(key, body, result)
+        return _plan_response(body, 'MISS' if get_plan_cache() is not None else 'BYPASS')
+    
+    except ValueError as e:
+        return _json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return _json_response(
+            {"error": "An error occurred processing your request", "details": str(e)},
+            status.HTTP_500_INTERNAL_SERVER_ERROR
         )
-        
-        daily_logs = generate_daily_logs(
-            log_entries,
-            current_location,
-            pickup_location,
-            dropoff_location
+
+
+# csrf_exempt in Django 4.2 wraps views in a sync function; set its flag directly.
+calculate_route_async_view.csrf_exempt = True
+
+
+@instrumented('calculate_route_sweep')
+@api_view(['POST', 'OPTIONS'])
+@permission_classes([AllowAny])
+@csrf_exempt
+def calculate_route_sweep_view(request):
+    if request.method == 'OPTIONS':
+        return _preflight_response()
+    
+    serializer = SweepRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {"error": "Invalid input", "details": serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
         )
-        
-        stops = []
-        
-        for entry in log_entries:
-            if entry.get("reason"):
-                stop_type = "rest" if "rest" in entry.get("reason", "").lower() or "break" in entry.get("reason", "").lower() else "other"
-                if stop_type == "rest" or entry.get("duty_status") == "off_duty":
-                    entry_coords = None
-                    
-                    if "coordinates" in entry and entry["coordinates"]:
-                        entry_coords = entry["coordinates"]
-                    elif "location" in entry:
-                        location_str = entry["location"]
-                        try:
-                            from .services.route_calculator import geocode_address
-                            geocode_attempt = geocode_address(location_str)
-                            if geocode_attempt:
-                                entry_coords = {"lon": geocode_attempt[0], "lat": geocode_attempt[1]}
-                        except Exception:
-                            pass
-                    
-                    if entry_coords:
-                        stops.append({
-                            "type": stop_type,
-                            "location": entry_coords,
-                            "time": entry["start_time"],
-                            "duration": (datetime.fromisoformat(entry["end_time"].replace('Z', '+00:00')) - 
-                                       datetime.fromisoformat(entry["start_time"].replace('Z', '+00:00'))).total_seconds() / 3600,
-                            "duty_status": entry["duty_status"],
-                            "reason": entry.get("reason", "")
-                        })
-        
-        for fuel_stop in route_data.get("fuel_stops", []):
-            fuel_entry = None
-            for entry in log_entries:
-                if "Fuel" in entry.get("location", "") and str(int(fuel_stop["mile_marker"])) in entry.get("location", ""):
-                    fuel_entry = entry
-                    break
-            
-            if fuel_entry:
-                stops.append({
-                    "type": "fuel",
-                    "location": fuel_stop["location"],
-                    "time": fuel_entry["start_time"],
-                    "duration": (datetime.fromisoformat(fuel_entry["end_time"].replace('Z', '+00:00')) - 
-                               datetime.fromisoformat(fuel_entry["start_time"].replace('Z', '+00:00'))).total_seconds() / 3600,
-                    "duty_status": "on_duty_not_driving",
-                    "reason": "Fueling"
-                })
-        
-        route_segments = []
-        for segment in route_data.get("segments", []):
-            route_segments.append({
-                "from": segment.get("from", ""),
-                "to": segment.get("to", ""),
-                "distance_miles": round(segment.get("distance_miles", 0), 2),
-                "driving_time_hours": round(segment.get("driving_time_hours", 0), 2),
-                "coordinates": segment.get("coordinates", [])
-            })
-        
-        response_data = {
-            "route": {
-                "total_distance": round(route_data.get("total_distance_miles", 0), 2),
-                "total_driving_time": round(route_data.get("total_driving_time_hours", 0), 2),
-                "segments": route_segments
-            },
-            "stops": stops,
-            "log_entries": log_entries,
-            "daily_logs": daily_logs,
-            "map_data": {
-                "waypoints": route_data.get("waypoints", []),
-                "polylines": route_data.get("polylines", []),
-                "markers": [
-                    {
-                        "type": "start",
-                        "location": route_data["waypoints"][0] if route_data.get("waypoints") else None,
-                        "label": "Current Location"
-                    },
-                    {
-                        "type": "pickup",
-                        "location": route_data["waypoints"][1] if len(route_data.get("waypoints", [])) > 1 else None,
-                        "label": "Pickup"
-                    },
-                    {
-                        "type": "dropoff",
-                        "location": route_data["waypoints"][-1] if route_data.get("waypoints") else None,
-                        "label": "Dropoff"
-                    }
-                ] + [
-                    {
-                        "type": stop["type"],
-                        "location": stop["location"],
-                        "label": stop.get("reason", stop["type"]).title()
-                    }
-                    for stop in stops
-                ]
-            }
-        }
-        
-        return Response(response_data, status=status.HTTP_200_OK)
     
+    try:
+        return Response(sweep_trip(serializer.validated_data), status=status.HTTP_200_OK)
     except ValueError as e:
         return Response(
             {"error": str(e)},
@@ -182,3 +253,171 @@ def calculate_route_view(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+
+@instrumented('calculate_routes_batch')
+@api_view(['POST', 'OPTIONS'])
+@permission_classes([AllowAny])
+@renderer_classes([JSONRenderer, NDJSONRenderer])
+@csrf_exempt
+def calculate_routes_batch_view(request):
+    if request.method == 'OPTIONS':
+        return _preflight_response()
+    
+    payload = {"trips": request.data} if isinstance(request.data, list) else request.data
+    batch_serializer = BatchTripRequestSerializer(data=payload)
+    if not batch_serializer.is_valid():
+        return Response(
+            {"error": "Invalid input", "details": batch_serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Trips are validated one by one so a bad trip fails alone.
+    trips = batch_serializer.validated_data["trips"]
+    invalid = []
+    valid_indexes = []
+    valid_trips = []
+    for index, trip in enumerate(trips):
+        serializer = TripRequestSerializer(data=trip)
+        if serializer.is_valid():
+            valid_indexes.append(index)
+            valid_trips.append(serializer.validated_data)
+        else:
+            invalid.append((index, {"status": 400, "error": "Invalid input", "details": serializer.errors}))
+    
+    def results():
+        yield from invalid
+        for valid_index, result in iter_plan_trips(valid_trips):
+            yield valid_indexes[valid_index], result
+    
+    if _wants_stream(request):
+        def records():
+            succeeded = 0
+            for index, result in results():
+                succeeded += result["status"] == 200
+                yield {"type": "result", "index": index, **result}
+            yield {"type": "summary", "trips": len(trips), "succeeded": succeeded, "failed": len(trips) - succeeded}
+        return _stream_response(records())
+    
+    ordered = [None] * len(trips)
+    try:
+        for index, result in results():
+            ordered[index] = {"index": index, **result}
+    except Exception as e:
+        return Response(
+            {"error": "An error occurred processing your request", "details": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    succeeded = sum(1 for result in ordered if result["status"] == 200)
+    
+    return Response({
+        "results": ordered,
+        "summary": {
+            "trips": len(ordered),
+            "succeeded": succeeded,
+            "failed": len(ordered) - succeeded
+        }
+    }, status=status.HTTP_200_OK)
+
+
+@instrumented('log_sheets')
+@api_view(['POST', 'OPTIONS'])
+@permission_classes([AllowAny])
+@csrf_exempt
+def log_sheets_view(request):
+    if request.method == 'OPTIONS':
+        return _preflight_response()
+    
+    serializer = LogSheetRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {"error": "Invalid input", "details": serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    trips = serializer.validated_data["log_sheets"]
+    daily_logs = [daily_log for trip_logs in trips for daily_log in trip_logs]
+    
+    try:
+        if serializer.validated_data["output_format"] == "pdf":
+            response = HttpResponse(render_pdf(daily_logs, map_in_pool), content_type="application/pdf")
+            file_name = f"eld-log-{daily_logs[0]['date']}.pdf" if len(daily_logs) == 1 else "eld-logs.pdf"
+        elif len(daily_logs) == 1:
+            response = HttpResponse(render_svgs(daily_logs)[0], content_type="image/svg+xml")
+            file_name = svg_file_names(trips)[0]
+        else:
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                for name, svg in zip(svg_file_names(trips), render_svgs(daily_logs, map_in_pool)):
+                    zip_file.writestr(name, svg)
+            response = HttpResponse(archive.getvalue(), content_type="application/zip")
+            file_name = "eld-logs-svg.zip"
+    except (KeyError, TypeError, ValueError, BrokenProcessPool) as e:
+        return Response(
+            {"error": "Unable to render log sheets", "details": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    return response
+
+
+def _job_payload(request, job):
+    payload = {
+        "id": str(job.id),
+        "status": job.status,
+        "stage": job.stage or None,
+        "progress": job.progress,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "url": request.build_absolute_uri(f"/api/jobs/{job.id}/"),
+    }
+    if job.status == TripJob.SUCCEEDED:
+        payload["result"] = job_result(job)
+    elif job.status == TripJob.FAILED:
+        payload["error"] = job.error
+        payload["error_status"] = job.error_status
+    return payload
+
+
+@instrumented('create_job')
+@api_view(['POST', 'OPTIONS'])
+@permission_classes([AllowAny])
+@csrf_exempt
+def create_job_view(request):
+    if request.method == 'OPTIONS':
+        return _preflight_response()
+    
+    serializer = TripRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {"error": "Invalid input", "details": serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    job = submit_job(serializer.validated_data)
+    ensure_workers()
+    response = Response(_job_payload(request, job), status=status.HTTP_202_ACCEPTED)
+    response['Location'] = f"/api/jobs/{job.id}/"
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def job_detail_view(request, job_id):
+    try:
+        job = TripJob.objects.get(id=job_id)
+    except TripJob.DoesNotExist:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+    
+    # A restarted web process resumes its queue on the first poll.
+    ensure_workers()
+    return Response(_job_payload(request, job), status=status.HTTP_200_OK)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; counts cover this process only."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
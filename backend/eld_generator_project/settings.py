@@ -71,6 +71,90 @@ REST_FRAMEWORK = {
     'UNAUTHENTICATED_USER': None,
 }
 
+GEOCODE_CACHE = {
+    'PATH': os.environ.get('GEOCODE_CACHE_PATH', str(BASE_DIR / 'geocode_cache.sqlite3')),
+    'MEMORY_ENTRIES': int(os.environ.get('GEOCODE_CACHE_MEMORY_ENTRIES', 2048)),
+    'MAX_ENTRIES': int(os.environ.get('GEOCODE_CACHE_MAX_ENTRIES', 100000)),
+    'TTL_SECONDS': int(os.environ.get('GEOCODE_CACHE_TTL_SECONDS', 30 * 24 * 3600)),
+    'NEGATIVE_TTL_SECONDS': int(os.environ.get('GEOCODE_CACHE_NEGATIVE_TTL_SECONDS', 24 * 3600)),
+}
+
+GEOCODER_BACKENDS = [
+    name.strip()
+    for name in os.environ.get('GEOCODER_BACKENDS', 'coordinates,gazetteer,nominatim').split(',')
+    if name.strip()
+]
+GAZETTEER_PATH = os.environ.get('GAZETTEER_PATH', str(BASE_DIR / 'data' / 'gazetteer.idx'))
+# Routing backends tried in order; "local" needs a graph built with build_road_graph.
+ROUTER_BACKENDS = [
+    name.strip()
+    for name in os.environ.get('ROUTER_BACKENDS', 'local,osrm').split(',')
+    if name.strip()
+]
+ROAD_GRAPH_PATH = os.environ.get('ROAD_GRAPH_PATH', str(BASE_DIR / 'data' / 'road_graph.idx'))
+ROAD_GRAPH_MAX_SNAP_MILES = float(os.environ.get('ROAD_GRAPH_MAX_SNAP_MILES', 10))
+# Truck stops, fuel stations and rest areas that fuel and rest stops snap to.
+POI_INDEX_PATH = os.environ.get('POI_INDEX_PATH', str(BASE_DIR / 'data' / 'poi.idx'))
+STOP_SNAP = {
+    'WINDOW_MILES': float(os.environ.get('STOP_SNAP_WINDOW_MILES', 30)),
+    'MAX_OFFSET_MILES': float(os.environ.get('STOP_SNAP_MAX_OFFSET_MILES', 2)),
+}
+# Wall-clock budget of the optimizing HOS planner (hos_planner=optimized).
+HOS_OPTIMIZER_BUDGET_SECONDS = float(os.environ.get('HOS_OPTIMIZER_BUDGET_SECONDS', 0.25))
+ROUTE_CACHE = {
+    'PATH': os.environ.get('ROUTE_CACHE_PATH', str(BASE_DIR / 'route_cache.sqlite3')),
+    'PRECISION': int(os.environ.get('ROUTE_CACHE_PRECISION', 4)),
+    'MAX_BYTES': int(os.environ.get('ROUTE_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+    'TTL_SECONDS': int(os.environ.get('ROUTE_CACHE_TTL_SECONDS', 7 * 24 * 3600)),
+}
+# Whole-plan response cache: locmem (per process), file, redis or none.
+PLAN_CACHE_BACKEND = os.environ.get('PLAN_CACHE_BACKEND', 'locmem')
+_PLAN_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'eld-plans'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'plan_cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+if PLAN_CACHE_BACKEND in _PLAN_CACHE_BACKENDS:
+    _backend, _location = _PLAN_CACHE_BACKENDS[PLAN_CACHE_BACKEND]
+    CACHES['plans'] = {
+        'BACKEND': _backend,
+        'LOCATION': os.environ.get('PLAN_CACHE_LOCATION', _location),
+        'TIMEOUT': int(os.environ.get('PLAN_CACHE_TTL_SECONDS', 15 * 60)),
+        'KEY_PREFIX': 'eld',
+    }
+    if PLAN_CACHE_BACKEND != 'redis':
+        # Redis evicts by its own maxmemory policy instead.
+        CACHES['plans']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('PLAN_CACHE_MAX_ENTRIES', 1000))}
+PLAN_CACHE = {
+    'ALIAS': 'plans',
+    'MAX_ENTRY_BYTES': int(os.environ.get('PLAN_CACHE_MAX_ENTRY_BYTES', 1024 * 1024)),
+}
+HTTP_CLIENT = {
+    'POOL_CONNECTIONS': int(os.environ.get('HTTP_POOL_CONNECTIONS', 4)),
+    'POOL_MAXSIZE': int(os.environ.get('HTTP_POOL_MAXSIZE', 16)),
+    'CONNECT_TIMEOUT': float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5)),
+    'READ_TIMEOUT': float(os.environ.get('HTTP_READ_TIMEOUT', 15)),
+    'MAX_RETRIES': int(os.environ.get('HTTP_MAX_RETRIES', 2)),
+    'BACKOFF_BASE': float(os.environ.get('HTTP_BACKOFF_BASE', 0.5)),
+    'BACKOFF_MAX': float(os.environ.get('HTTP_BACKOFF_MAX', 8)),
+    'ASYNC_MAX_CONNECTIONS': int(os.environ.get('HTTP_ASYNC_MAX_CONNECTIONS', 100)),
+}
+NOMINATIM_RATE_PER_SECOND = float(os.environ.get('NOMINATIM_RATE_PER_SECOND', 1.0))
+ROUTE_FANOUT_WORKERS = int(os.environ.get('ROUTE_FANOUT_WORKERS', 8))
+TRIP_PLANNER_WORKERS = int(os.environ.get('TRIP_PLANNER_WORKERS', 0)) or None
+TRIP_JOBS = {
+    'WORKERS': int(os.environ.get('TRIP_JOB_WORKERS', 2)),
+    'POLL_SECONDS': float(os.environ.get('TRIP_JOB_POLL_SECONDS', 1)),
+    'STALE_SECONDS': int(os.environ.get('TRIP_JOB_STALE_SECONDS', 300)),
+    'HEARTBEAT_SECONDS': float(os.environ.get('TRIP_JOB_HEARTBEAT_SECONDS', 30)),
+    'MAX_ATTEMPTS': int(os.environ.get('TRIP_JOB_MAX_ATTEMPTS', 3)),
+    'RETENTION_SECONDS': int(os.environ.get('TRIP_JOB_RETENTION_SECONDS', 24 * 3600)),
+}
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 CORS_ORIGIN_ALLOW_ALL = True
@@ -1,6 +1,8 @@
 from django.urls import path, include
 
+from eld_generator.views import metrics_view
+
 urlpatterns = [
     path('api/', include('eld_generator.urls')),
+    path('metrics', metrics_view),
 ]
-
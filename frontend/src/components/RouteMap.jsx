@@ -1,6 +1,7 @@
 import React, { useEffect, useMemo } from 'react'
 import { MapContainer, TileLayer, Marker, Polyline, Popup, useMap } from 'react-leaflet'
 import L from 'leaflet'
+import { polylineToLatLngs } from '../utils/polyline'
 import './RouteMap.css'
 
 delete L.Icon.Default.prototype._getIconUrl
@@ -36,16 +37,8 @@ function RouteMapComponent({ mapData, stops, route }) {
     if (!mapData?.polylines) return []
     
     return mapData.polylines
-      .filter(polyline => polyline && polyline.coordinates)
-      .map(polyline => {
-        const coords = polyline.coordinates.map(coord => {
-          if (Array.isArray(coord)) {
-            return [coord[1] || coord[0], coord[0] || coord[1]]
-          }
-          return [coord.lat || coord[1], coord.lng || coord.lon || coord[0]]
-        })
-        return coords
-      })
+      .map(polylineToLatLngs)
+      .filter(coords => coords.length > 0)
   }, [mapData])
 
   const bounds = useMemo(() => {
@@ -23,8 +23,15 @@ api.interceptors.response.use(
   }
 )
 
+// The map never needs more detail than street level, so ask the backend for a
+// simplified, encoded route instead of the full-resolution GeoJSON.
+const ROUTE_DISPLAY_OPTIONS = {
+  polyline_format: 'encoded',
+  map_zoom: 12,
+}
+
 export const calculateRoute = async (tripData) => {
-  const response = await api.post('/api/calculate-route/', tripData)
+  const response = await api.post('/api/calculate-route/', { ...ROUTE_DISPLAY_OPTIONS, ...tripData })
   return response.data
 }
 
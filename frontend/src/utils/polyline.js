@@ -0,0 +1,55 @@
+export const decodePolyline = (encoded, precision = 5) => {
+  const factor = Math.pow(10, precision)
+  const coordinates = []
+  let index = 0
+  let lat = 0
+  let lng = 0
+
+  while (index < encoded.length) {
+    for (const axis of [0, 1]) {
+      let result = 0
+      let shift = 0
+      let byte
+      do {
+        byte = encoded.charCodeAt(index++) - 63
+        result |= (byte & 0x1f) << shift
+        shift += 5
+      } while (byte >= 0x20)
+      const delta = result & 1 ? ~(result >> 1) : result >> 1
+      if (axis === 0) {
+        lat += delta
+      } else {
+        lng += delta
+      }
+    }
+    coordinates.push([lat / factor, lng / factor])
+  }
+
+  return coordinates
+}
+
+// Returns [lat, lng] pairs for Leaflet from any polyline format the API emits.
+export const polylineToLatLngs = (polyline) => {
+  if (!polyline) return []
+
+  if (polyline.type === 'EncodedPolyline') {
+    return decodePolyline(polyline.polyline, polyline.precision)
+  }
+
+  if (polyline.type === 'FlatLineString') {
+    const latLngs = []
+    for (let i = 0; i + 1 < polyline.coordinates.length; i += 2) {
+      latLngs.push([polyline.coordinates[i + 1], polyline.coordinates[i]])
+    }
+    return latLngs
+  }
+
+  if (!polyline.coordinates) return []
+
+  return polyline.coordinates.map(coord => {
+    if (Array.isArray(coord)) {
+      return [coord[1] || coord[0], coord[0] || coord[1]]
+    }
+    return [coord.lat || coord[1], coord.lng || coord.lon || coord[0]]
+  })
+}